@@ -1,9 +1,13 @@
 import os
+import time
 from io import BytesIO
-from flask import Flask, render_template, request, send_file
+from flask import Flask, Response, before_render_template, g, jsonify, render_template, request, send_file, template_rendered
+from flask.json.provider import DefaultJSONProvider
 
 from smt.config import AppConfig
-from smt.engine import SMTTranslator
+from smt.engine import SMTTranslator, resolve_fields
+from smt.export import ExportError, check_options, file_name, iter_batch_records, iter_index_records, media_type, stream_export
+from smt.metrics import REGISTRY, REQUEST_SECONDS, STARTUP_SECONDS, SamplingProfiler, StageTimer
 
 
 LANGUAGE_LABELS = {
@@ -18,9 +22,75 @@ LANGUAGE_LABELS = {
     "pa": "Punjabi",
 }
 
+ALL_LANGUAGES = "all"
+GRID_FIELDS = ("source_tokens", "target_tokens", "target_text", "alignment_grid")
+CONCORDANCE_PAGE_SIZE = 20
+CONCORDANCE_MAX_LIMIT = 200
+
+
+class SMTJSONProvider(DefaultJSONProvider):
+    # Compact alignment types (AlignmentLinks, SparseGrid) serialize themselves.
+    @staticmethod
+    def default(o):
+        if hasattr(o, "to_json"):
+            return o.to_json()
+        return DefaultJSONProvider.default(o)
+
+
+def requested_fields(payload: dict):
+    # Optional "fields" list restricting each result to those payload keys; None keeps them all.
+    fields = payload.get("fields")
+    if fields is None:
+        return None
+    if not isinstance(fields, list) or not all(isinstance(f, str) for f in fields):
+        raise ValueError("'fields' must be a list of strings.")
+    return resolve_fields(fields)
+
+
+def fanout_options(payload: dict, codes: list) -> tuple:
+    # (languages, timeout) of an all-languages request; omitted values fall back to every configured
+    # language and SMT_FANOUT_TIMEOUT (timeout None).
+    languages = payload.get("languages") or codes
+    if not isinstance(languages, list) or not all(isinstance(l, str) for l in languages):
+        raise ValueError("'languages' must be a list of language codes.")
+    unsupported = [l for l in languages if l not in codes]
+    if unsupported:
+        raise ValueError(f"Unsupported target languages: {', '.join(unsupported)}")
+    timeout = payload.get("timeout")
+    if timeout is not None and (isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout <= 0):
+        raise ValueError("'timeout' must be a positive number of seconds.")
+    return languages, None if timeout is None else float(timeout)
+
+
+def warm_up(app: Flask | None = None) -> dict:
+    # Post-fork hook for pre-fork servers that load the app in the master (e.g. gunicorn --preload):
+    # builds the backend and loads models in the worker. Failures are logged, not fatal.
+    app = app or __getattr__("app")  # builds the lazy module app if nothing has yet
+    translator: SMTTranslator = app.extensions["smt_translator"]
+    try:
+        timings = translator.warm_up()
+    except Exception:
+        app.logger.exception("Warm-up failed; the first requests will load lazily.")
+        return {}
+    for phase, seconds in timings.items():
+        STARTUP_SECONDS.observe(seconds, phase=f"warm_up_{phase}")
+    app.extensions["smt_startup"].update({f"warm_up_{phase}": seconds for phase, seconds in timings.items()})
+    return timings
+
+
+def export_response(records, fmt: str, compression: str, phrases: bool, stem: str) -> Response:
+    # Streamed as it is encoded; the response never holds more than one output chunk.
+    return Response(
+        stream_export(records, fmt, compression, phrases),
+        content_type=media_type(fmt, compression),
+        headers={"Content-Disposition": f'attachment; filename="{file_name(stem, fmt, compression)}"'},
+    )
+
 
 def create_app() -> Flask:
+    started = time.perf_counter()
     app = Flask(__name__)
+    app.json = SMTJSONProvider(app)
     app.config.from_mapping(SECRET_KEY=os.environ.get("FLASK_SECRET_KEY", "dev"))
 
     cfg = AppConfig.from_env()
@@ -34,6 +104,38 @@ def create_app() -> Flask:
         for code in target_languages
     ]
     label_by_code = {item["code"]: item["label"] for item in language_options}
+    label_by_code[ALL_LANGUAGES] = "All languages"
+    profiler = SamplingProfiler(cfg.profile_every, cfg.profile_dir)
+
+    @app.before_request
+    def start_timing():
+        g.stage_timer = StageTimer()
+        g.profile = profiler.start()
+
+    def render_started(sender, template, context, **extra):
+        if "stage_timer" in g:
+            g.render_started = time.perf_counter()
+
+    def render_finished(sender, template, context, **extra):
+        started = g.pop("render_started", None)
+        if started is not None:
+            g.stage_timer.add("render", time.perf_counter() - started)
+
+    before_render_template.connect(render_started, app, weak=False)
+    template_rendered.connect(render_finished, app, weak=False)
+
+    @app.after_request
+    def finish_timing(response):
+        timer = g.pop("stage_timer", None)
+        if timer is None:
+            return response
+        total = timer.elapsed()
+        response.headers["Server-Timing"] = timer.server_timing(total)
+        timer.record()
+        endpoint = request.endpoint or "unknown"
+        REQUEST_SECONDS.observe(total, endpoint=endpoint, status=str(response.status_code))
+        profiler.stop(g.pop("profile", None), endpoint)
+        return response
 
     @app.get("/")
     def index():
@@ -54,7 +156,7 @@ def create_app() -> Flask:
         source_text = request.form.get("source_text", "").strip()
         target_language = request.form.get("target_language", cfg.default_target_language).strip().lower()
 
-        if target_language not in {l["code"] for l in language_options}:
+        if target_language not in {l["code"] for l in language_options} and target_language != ALL_LANGUAGES:
             target_language = cfg.default_target_language
 
         if not source_text:
@@ -70,8 +172,52 @@ def create_app() -> Flask:
                 error="Enter a sentence to translate.",
             )
 
+        document_mode = request.form.get("document_mode") == "1"
+        if document_mode:
+            if target_language == ALL_LANGUAGES:
+                error = "Document mode needs a single target language."
+                results = []
+            else:
+                try:
+                    results = translator.translate_document(source_text, target_language)
+                    error = None
+                except ValueError as exc:
+                    results, error = [], str(exc)
+            for item in results:
+                item["label"] = f"Paragraph {item['paragraph'] + 1}, sentence {item['sentence'] + 1}"
+            return render_template(
+                "index.html",
+                source_text=source_text,
+                selected_target_language=target_language,
+                selected_target_language_label=label_by_code.get(target_language, target_language.upper()),
+                target_languages=language_options,
+                document_mode=True,
+                result=None,
+                results=results,
+                error=error,
+            )
+
+        if target_language == ALL_LANGUAGES:
+            try:
+                results = translator.translate_all_languages(source_text, [l["code"] for l in language_options])
+                error = None
+            except Exception as exc:
+                results, error = [], f"Translation failed: {exc}"
+            for item in results:
+                item["label"] = label_by_code.get(item["target_language"], item["target_language"].upper())
+            return render_template(
+                "index.html",
+                source_text=source_text,
+                selected_target_language=target_language,
+                selected_target_language_label=label_by_code[ALL_LANGUAGES],
+                target_languages=language_options,
+                result=None,
+                results=results,
+                error=error,
+            )
+
         try:
-            result = translator.translate_with_alignment(source_text, target_language)
+            result = translator.translate_with_alignment(source_text, target_language, timer=g.stage_timer)
             return render_template(
                 "index.html",
                 source_text=source_text,
@@ -111,11 +257,269 @@ def create_app() -> Flask:
             mimetype="text/plain; charset=utf-8",
         )
 
+    @app.post("/api/translate/batch")
+    def translate_batch_api():
+        payload = request.get_json(silent=True) or {}
+        sentences = payload.get("sentences")
+        target_language = str(payload.get("target_language") or cfg.default_target_language).strip().lower()
+
+        if not isinstance(sentences, list) or not all(isinstance(s, str) for s in sentences):
+            return jsonify({"error": "'sentences' must be a list of strings."}), 400
+        if len(sentences) > cfg.batch_max_items:
+            return jsonify({"error": f"At most {cfg.batch_max_items} sentences per batch."}), 413
+        if target_language not in {l["code"] for l in language_options}:
+            return jsonify({"error": f"Unsupported target language: {target_language}"}), 400
+        try:
+            fields = requested_fields(payload)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+
+        results = translator.translate_batch(sentences, target_language, fields)
+        return jsonify(
+            {
+                "target_language": target_language,
+                "count": len(results),
+                "failed": sum(1 for r in results if not r["ok"]),
+                "results": results,
+            }
+        )
+
+    @app.post("/api/translate/grid")
+    def translate_grid_api():
+        # Sparse wire format for client-side matrix rendering: tokens plus the link list, O(n + m + links).
+        payload = request.get_json(silent=True) or {}
+        text = str(payload.get("text") or "").strip()
+        target_language = str(payload.get("target_language") or cfg.default_target_language).strip().lower()
+        if not text:
+            return jsonify({"error": "'text' must be a non-empty string."}), 400
+        if target_language not in {l["code"] for l in language_options}:
+            return jsonify({"error": f"Unsupported target language: {target_language}"}), 400
+        try:
+            result = translator.translate_with_alignment(
+                text,
+                target_language,
+                timer=g.stage_timer,
+                fields=GRID_FIELDS,
+            )
+        except Exception as exc:
+            return jsonify({"error": f"Translation failed: {exc}"}), 502
+        return jsonify(result)
+
+    @app.post("/api/translate/document")
+    def translate_document_api():
+        payload = request.get_json(silent=True) or {}
+        text = str(payload.get("text") or "").strip()
+        target_language = str(payload.get("target_language") or cfg.default_target_language).strip().lower()
+        if not text:
+            return jsonify({"error": "'text' must be a non-empty string."}), 400
+        if target_language not in {l["code"] for l in language_options}:
+            return jsonify({"error": f"Unsupported target language: {target_language}"}), 400
+        try:
+            fields = requested_fields(payload)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        try:
+            results = translator.translate_document(text, target_language, fields)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 413
+        return jsonify(
+            {
+                "target_language": target_language,
+                "count": len(results),
+                "failed": sum(1 for r in results if not r["ok"]),
+                "results": results,
+            }
+        )
+
+    @app.post("/api/translate/all")
+    def translate_all_api():
+        payload = request.get_json(silent=True) or {}
+        source_text = str(payload.get("text") or "").strip()
+        if not source_text:
+            return jsonify({"error": "'text' must be a non-empty string."}), 400
+        try:
+            languages, timeout = fanout_options(payload, [l["code"] for l in language_options])
+            fields = requested_fields(payload)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        results = translator.translate_all_languages(source_text, languages, timeout=timeout, fields=fields)
+        return jsonify({"source_text": source_text, "results": results})
+
+    def concordance_for(lang: str):
+        # Only configured languages map to index directories.
+        if lang not in label_by_code or lang == ALL_LANGUAGES:
+            return None
+        from smt.concordance import load_concordance
+
+        return load_concordance(cfg.concordance_dir_for(lang))
+
+    def missing_concordance(lang: str) -> str:
+        if lang not in label_by_code or lang == ALL_LANGUAGES:
+            return f"Unsupported target language: {lang}"
+        return (
+            f"No concordance index for '{lang}'. Build one with "
+            f"python -m smt.concordance build <corpus> <alignment> --target-language {lang}"
+        )
+
+    @app.get("/concordance")
+    def concordance():
+        lang = request.args.get("lang", cfg.default_target_language).strip().lower()
+        source_word = request.args.get("src", "").strip()
+        target_word = request.args.get("tgt", "").strip()
+        offset = max(0, request.args.get("offset", 0, type=int))
+        context = dict(
+            selected_target_language=lang,
+            target_languages=language_options,
+            source_word=source_word,
+            target_word=target_word,
+            offset=offset,
+            page_size=CONCORDANCE_PAGE_SIZE,
+            ranked=None,
+            hits=None,
+            total=0,
+            result=None,
+            error=None,
+        )
+        index = concordance_for(lang)
+        if index is None:
+            context["error"] = missing_concordance(lang)
+        elif source_word and target_word:
+            total, ids = index.pair_sentences(source_word, target_word, offset, CONCORDANCE_PAGE_SIZE)
+            context.update(total=total, hits=[index.hit(i, source_word, target_word) for i in ids])
+        elif source_word:
+            context["ranked"] = index.top_targets(source_word)
+        elif target_word:
+            context["ranked"] = index.top_sources(target_word)
+        return render_template("concordance.html", **context)
+
+    @app.get("/concordance/<lang>/<int:index>")
+    def concordance_sentence(lang: str, index: int):
+        concordance_index = concordance_for(lang)
+        result, error = None, None
+        if concordance_index is None:
+            error = missing_concordance(lang)
+        elif not 0 <= index < len(concordance_index):
+            error = f"Sentence {index} is not in the '{lang}' concordance."
+        else:
+            result = concordance_index.sentence_payload(index)
+        return render_template(
+            "concordance.html",
+            selected_target_language=lang,
+            selected_target_language_label=label_by_code.get(lang, lang.upper()),
+            target_languages=language_options,
+            source_word="",
+            target_word="",
+            ranked=None,
+            hits=None,
+            result=result,
+            error=error,
+        ), 200 if error is None else 404
+
+    @app.get("/api/concordance")
+    def concordance_api():
+        lang = request.args.get("lang", cfg.default_target_language).strip().lower()
+        source_word = request.args.get("src", "").strip()
+        target_word = request.args.get("tgt", "").strip()
+        offset = max(0, request.args.get("offset", 0, type=int))
+        limit = min(CONCORDANCE_MAX_LIMIT, max(1, request.args.get("limit", CONCORDANCE_PAGE_SIZE, type=int)))
+        if not source_word and not target_word:
+            return jsonify({"error": "Pass 'src', 'tgt' or both."}), 400
+        index = concordance_for(lang)
+        if index is None:
+            return jsonify({"error": missing_concordance(lang)}), 404
+        if source_word and target_word:
+            total, ids = index.pair_sentences(source_word, target_word, offset, limit)
+            return jsonify(
+                {
+                    "source_word": source_word,
+                    "target_word": target_word,
+                    "total": total,
+                    "offset": offset,
+                    "hits": [index.hit(i, source_word, target_word) for i in ids],
+                }
+            )
+        if source_word:
+            return jsonify({"source_word": source_word, "targets": index.top_targets(source_word, limit)})
+        return jsonify({"target_word": target_word, "sources": index.top_sources(target_word, limit)})
+
+    @app.get("/api/concordance/<lang>/<int:index>")
+    def concordance_sentence_api(lang: str, index: int):
+        concordance_index = concordance_for(lang)
+        if concordance_index is None:
+            return jsonify({"error": missing_concordance(lang)}), 404
+        if not 0 <= index < len(concordance_index):
+            return jsonify({"error": f"Sentence {index} is not in the '{lang}' concordance."}), 404
+        return jsonify(concordance_index.sentence_payload(index))
+
+    @app.post("/api/export")
+    def export_batch_api():
+        payload = request.get_json(silent=True) or {}
+        sentences = payload.get("sentences")
+        target_language = str(payload.get("target_language") or cfg.default_target_language).strip().lower()
+        fmt = str(payload.get("format") or "jsonl").strip().lower()
+        compression = str(payload.get("compression") or "none").strip().lower()
+        phrases = payload.get("phrases", True)
+
+        if not isinstance(sentences, list) or not all(isinstance(s, str) for s in sentences):
+            return jsonify({"error": "'sentences' must be a list of strings."}), 400
+        if not isinstance(phrases, bool):
+            return jsonify({"error": "'phrases' must be true or false."}), 400
+        if len(sentences) > cfg.batch_max_items:
+            return jsonify({"error": f"At most {cfg.batch_max_items} sentences per export."}), 413
+        if target_language not in label_by_code or target_language == ALL_LANGUAGES:
+            return jsonify({"error": f"Unsupported target language: {target_language}"}), 400
+        try:
+            check_options(fmt, compression)
+        except ExportError as exc:
+            return jsonify({"error": str(exc)}), 400
+        records = iter_batch_records(translator, sentences, target_language, phrases)
+        return export_response(records, fmt, compression, phrases, f"alignments.{target_language}")
+
+    @app.get("/api/export/<lang>")
+    def export_corpus_api(lang: str):
+        # Streams a language's indexed corpus alignment (see /concordance), optionally a [start, stop) slice.
+        fmt = request.args.get("format", "jsonl").strip().lower()
+        compression = request.args.get("compression", "none").strip().lower()
+        phrases = request.args.get("phrases", "1").strip().lower() not in {"0", "false", "no", "off"}
+        start = max(0, request.args.get("start", 0, type=int))
+        stop = request.args.get("stop", None, type=int)
+        index = concordance_for(lang)
+        if index is None:
+            return jsonify({"error": missing_concordance(lang)}), 404
+        try:
+            check_options(fmt, compression)
+        except ExportError as exc:
+            return jsonify({"error": str(exc)}), 400
+        records = iter_index_records(index, start, stop)
+        return export_response(records, fmt, compression, phrases, f"corpus.{index.meta['source_language']}-{lang}")
+
+    @app.get("/cache/stats")
+    def cache_stats():
+        if translator.cache is None:
+            return jsonify({"enabled": False})
+        return jsonify({"enabled": True, **translator.cache.stats()})
+
+    @app.get("/metrics")
+    def metrics():
+        return Response(REGISTRY.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+    app.extensions["smt_translator"] = translator
+    app.extensions["smt_languages"] = target_languages
+    app.extensions["smt_startup"] = {"create_app": time.perf_counter() - started}
+    STARTUP_SECONDS.observe(app.extensions["smt_startup"]["create_app"], phase="create_app")
+    if cfg.warm_up:
+        warm_up(app)
     return app
 
 
-app = create_app()
+def __getattr__(name: str):
+    # `app` is built on first access rather than at import, so importing this module stays cheap and
+    # servers that fork before touching it build one app per worker.
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=True)
@@ -0,0 +1,294 @@
+import asyncio
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from flask import Flask
+
+from app import ALL_LANGUAGES, create_app, fanout_options
+from smt.aio import AdmissionController, AdmissionRejected, AsyncSMTTranslator
+from smt.config import AppConfig
+from smt.tokenize import split_paragraphs, split_sentences
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+# Monitoring stays reachable while the server is saturated.
+UNMETERED_PATHS = ("/metrics", "/cache/stats", "/static/")
+SENTENCE_LIST_ROUTES = ("/api/translate/batch", "/api/export")
+SINGLE_TEXT_ROUTES = ("/api/translate/grid",)
+
+_END = object()
+
+PrefetchPlan = Tuple[List[str], List[str], Optional[float]]
+
+
+def document_sentences(text: str) -> List[str]:
+    # Same split as SMTTranslator.translate_document.
+    return [sentence for paragraph in split_paragraphs(text) for sentence in split_sentences(paragraph)]
+
+
+def prefetch_plan(cfg: AppConfig, codes: List[str], path: str, content_type: str, body: bytes) -> Optional[PrefetchPlan]:
+    # The backend translations a POST will ask for, as (sentences, languages, timeout), read from the
+    # body the way the view reads it. None when there is nothing to fetch or the request is invalid;
+    # the view then runs as usual and reports the error itself.
+    if path == "/translate":
+        if not content_type.startswith("application/x-www-form-urlencoded"):
+            return None
+        form = {k: v[0] for k, v in parse_qs(body.decode("utf-8", "replace")).items()}
+        text = form.get("source_text", "").strip()
+        lang = form.get("target_language", cfg.default_target_language).strip().lower()
+        if lang not in codes and lang != ALL_LANGUAGES:
+            lang = cfg.default_target_language
+        if not text:
+            return None
+        if form.get("document_mode") == "1":
+            sentences = document_sentences(text)
+            if lang == ALL_LANGUAGES or len(sentences) > cfg.document_max_sentences:
+                return None
+            return sentences, [lang], None
+        if lang == ALL_LANGUAGES:
+            return [text], codes, cfg.fanout_timeout
+        return [text], [lang], None
+
+    if not path.startswith("/api/"):
+        return None
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        return None
+    if not isinstance(payload, dict):
+        return None
+    lang = str(payload.get("target_language") or cfg.default_target_language).strip().lower()
+
+    if path == "/api/translate/all":
+        text = str(payload.get("text") or "").strip()
+        try:
+            languages, timeout = fanout_options(payload, codes)
+        except ValueError:
+            return None
+        if not text:
+            return None
+        return [text], languages, cfg.fanout_timeout if timeout is None else timeout
+    if lang not in codes:
+        return None
+    if path in SENTENCE_LIST_ROUTES:
+        sentences = payload.get("sentences")
+        if not isinstance(sentences, list) or not all(isinstance(s, str) for s in sentences):
+            return None
+        if len(sentences) > cfg.batch_max_items:
+            return None
+        return sentences, [lang], None
+    text = str(payload.get("text") or "").strip()
+    if not text:
+        return None
+    if path in SINGLE_TEXT_ROUTES:
+        return [text], [lang], None
+    if path == "/api/translate/document":
+        sentences = document_sentences(text)
+        return (sentences, [lang], None) if len(sentences) <= cfg.document_max_sentences else None
+    return None
+
+
+def wsgi_environ(scope: dict, body: bytes) -> dict:
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        # WSGI carries the raw path bytes as a latin-1 string.
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": BytesIO(body),
+        "wsgi.input_terminated": True,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").lower()
+        value = raw_value.decode("latin-1")
+        if name == "content-type":
+            environ["CONTENT_TYPE"] = value
+        elif name != "content-length":
+            key = "HTTP_" + name.upper().replace("-", "_")
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def start_wsgi(wsgi_app, environ: dict) -> tuple:
+    # Runs the view up to its first body chunk; returns (status, headers, response iterable, iterator, chunk).
+    started: dict = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"], started["headers"] = status, headers
+        return lambda data: None  # the write() callable; Flask never uses it
+
+    iterable = wsgi_app(environ, start_response)
+    iterator = iter(iterable)
+    first = next(iterator, _END)
+    return started["status"], started["headers"], iterable, iterator, first
+
+
+class ASGIApp:
+    # Serves the Flask app over ASGI. Each request is admitted (or queued, or turned away with 503),
+    # its backend translations are fetched concurrently on the event loop, and only then does the
+    # Flask view run, on a bounded thread pool, for the CPU part (EM, phrase extraction, rendering).
+    # A request waiting on the backend therefore costs a socket and a coroutine, not a thread.
+    def __init__(self, flask_app: Flask | None = None) -> None:
+        self.flask_app = flask_app or create_app()
+        self.translator = self.flask_app.extensions["smt_translator"]
+        self.cfg: AppConfig = self.translator.cfg
+        self.codes: List[str] = self.flask_app.extensions["smt_languages"]
+        # Built in the worker on startup (or first request), not at import.
+        self.async_translator: AsyncSMTTranslator | None = None
+        self.admission: AdmissionController | None = None
+        self.executor: ThreadPoolExecutor | None = None
+
+    def setup(self) -> None:
+        if self.executor is not None:
+            return
+        self.async_translator = AsyncSMTTranslator(self.translator)
+        self.admission = AdmissionController(
+            self.cfg.asgi_max_in_flight, self.cfg.asgi_queue_size, self.cfg.asgi_queue_timeout
+        )
+        self.executor = ThreadPoolExecutor(max_workers=self.cfg.asgi_threads, thread_name_prefix="smt-asgi")
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        if self.async_translator is not None:
+            self.async_translator.close()
+        self.translator.close()
+
+    async def __call__(self, scope: dict, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self.http(scope, receive, send)
+        else:
+            await send({"type": "websocket.close", "code": 1000})
+
+    async def lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    self.setup()
+                except Exception as exc:
+                    await send({"type": "lifespan.startup.failed", "message": str(exc)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def http(self, scope: dict, receive, send) -> None:
+        self.setup()
+        metered = not scope["path"].startswith(UNMETERED_PATHS)
+        if metered:
+            try:
+                await self.admission.acquire()
+            except AdmissionRejected as exc:
+                await send_json(send, 503, {"error": str(exc)}, [(b"retry-after", b"1")])
+                return
+        keys: list = []
+        try:
+            body = await read_body(receive)
+            if body is None:
+                await send_json(send, 413, {"error": f"Request body over {MAX_BODY_BYTES} bytes."})
+                return
+            if scope["method"] == "POST":
+                headers = dict(scope.get("headers", []))
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                plan = prefetch_plan(self.cfg, self.codes, scope["path"], content_type, body)
+                if plan is not None:
+                    keys = await self.async_translator.prefetch(*plan)
+            await self.respond(scope, body, send)
+        finally:
+            self.async_translator.release(keys)
+            if metered:
+                self.admission.release()
+
+    async def respond(self, scope: dict, body: bytes, send) -> None:
+        loop = asyncio.get_running_loop()
+        status, headers, iterable, iterator, chunk = await loop.run_in_executor(
+            self.executor, start_wsgi, self.flask_app.wsgi_app, wsgi_environ(scope, body)
+        )
+        try:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": int(status.split(" ", 1)[0]),
+                    "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+                }
+            )
+            # Streamed responses (exports) are pulled one chunk at a time off the loop.
+            while chunk is not _END:
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                chunk = await loop.run_in_executor(self.executor, next, iterator, _END)
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            close = getattr(iterable, "close", None)
+            if close is not None:
+                await loop.run_in_executor(self.executor, close)
+
+
+async def read_body(receive) -> Optional[bytes]:
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            return None
+        chunks.append(chunk)
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+async def send_json(send, status: int, payload: dict, headers: list | None = None) -> None:
+    body = json.dumps(payload).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+            + (headers or []),
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+def create_asgi_app(flask_app: Flask | None = None) -> ASGIApp:
+    return ASGIApp(flask_app)
+
+
+def __getattr__(name: str):
+    # Built on first access, like app.app, so each server worker builds its own.
+    if name == "app":
+        globals()["app"] = create_asgi_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if __name__ == "__main__":
+    import uvicorn  # optional; pip install uvicorn
+
+    uvicorn.run(create_asgi_app())
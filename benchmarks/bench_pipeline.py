@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import gc
+import hashlib
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from smt.alignment import (  # noqa: E402
+    em_word_align,
+    extract_phrase_pairs,
+    extract_phrase_pairs_fast,
+    matrix_for_viewer,
+    phrase_based_projection,
+)
+from smt.config import AppConfig  # noqa: E402
+from smt.engine import SMTTranslator  # noqa: E402
+from smt.tokenize import preprocess_for_alignment  # noqa: E402
+
+SIZES = (10, 50, 200, 1000)
+_VOCAB = (
+    "the a an cat dog bird man woman child house river tree city road book letter "
+    "runs sees writes reads gives takes walks sleeps quickly slowly very old new big small "
+    "red green blue on in under over with without near far and but or because"
+).split()
+_PUNCT = (",", ".", "?", "!", ";")
+
+
+class StubSentenceTranslator:
+    # Deterministic offline stand-in for LibrarySentenceTranslator: hashes each word to a pseudo-target
+    # word, swaps adjacent pairs and drops a few tokens so alignments are non-trivial.
+    def __init__(self, source_language: str = "en", latency: float = 0.0) -> None:
+        self.source_language = source_language
+        self.latency = latency
+        self.backend = "stub"
+
+    @staticmethod
+    def _word(token: str, target_language: str) -> str:
+        digest = hashlib.blake2b(f"{target_language}:{token}".encode("utf-8"), digest_size=4).hexdigest()
+        return f"w{digest}"
+
+    def translate(self, sentence: str, target_language: str) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        tokens = preprocess_for_alignment(sentence, lowercase=True)
+        out: List[str] = []
+        for i, tok in enumerate(tokens):
+            if tok in _PUNCT or not tok.isalnum():
+                out.append(tok)
+            elif len(tok) > 3 or i % 7:
+                out.append(self._word(tok, target_language))
+        for i in range(0, len(out) - 1, 4):
+            if out[i] not in _PUNCT and out[i + 1] not in _PUNCT:
+                out[i], out[i + 1] = out[i + 1], out[i]
+        return " ".join(out)
+
+
+def synthetic_sentence(size: int, seed: int) -> str:
+    rng = random.Random(seed)
+    tokens = []
+    for i in range(size):
+        if i and i % 9 == 8:
+            tokens.append(rng.choice(_PUNCT))
+        else:
+            tokens.append(rng.choice(_VOCAB))
+    return " ".join(tokens)
+
+
+def corpus_sentence(corpus: Path, size: int) -> str:
+    # Concatenates source sides of a 'src ||| tgt' corpus until the sentence reaches `size` tokens.
+    tokens: List[str] = []
+    while len(tokens) < size:
+        with corpus.open("r", encoding="utf-8") as fh:
+            before = len(tokens)
+            for line in fh:
+                src = line.split("|||", 1)[0]
+                tokens.extend(preprocess_for_alignment(src, lowercase=True))
+                if len(tokens) >= size:
+                    break
+            if len(tokens) == before:
+                raise SystemExit(f"No usable sentences in {corpus}")
+    return " ".join(tokens[:size])
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def measure(fn: Callable[[], object], min_time: float, max_runs: int, units: int) -> dict:
+    fn()  # warm-up
+    samples: List[float] = []
+    gc.collect()
+    started = time.perf_counter()
+    while len(samples) < max_runs and (len(samples) < 3 or time.perf_counter() - started < min_time):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    mean = statistics.fmean(samples)
+    return {
+        "runs": len(samples),
+        "mean_ms": mean * 1000,
+        "p50_ms": _percentile(samples, 50) * 1000,
+        "p90_ms": _percentile(samples, 90) * 1000,
+        "p99_ms": _percentile(samples, 99) * 1000,
+        "ops_per_s": 1.0 / mean if mean else 0.0,
+        "tokens_per_s": units / mean if mean else 0.0,
+        "peak_mem_kb": peak / 1024,
+    }
+
+
+def cases(
+    inputs: Dict[Tuple[str, int], Tuple[str, str]],
+    engines: List[str],
+    python_max: int,
+    band: int = 0,
+) -> Iterator[Tuple[str, str, int, Callable[[], object]]]:
+    translator = SMTTranslator(dataclasses.replace(AppConfig.from_env(), cache_enabled=False, batch_workers=1))
+    translator.library_translator = StubSentenceTranslator(translator.cfg.source_language)
+    lang = translator.cfg.default_target_language
+
+    for (source, size), (src_text, tgt_text) in inputs.items():
+        src = preprocess_for_alignment(src_text)
+        tgt = preprocess_for_alignment(tgt_text)
+        links = em_word_align(src, tgt, engine="numpy")
+        phrases = extract_phrase_pairs_fast(src, tgt, links)
+
+        for engine in engines:
+            if engine == "python" and size > python_max:
+                continue
+            yield f"em_word_align[{engine}]", source, size, lambda s=src, t=tgt, e=engine: em_word_align(s, t, engine=e)
+        if band:
+            yield "em_word_align[numpy-band]", source, size, lambda: em_word_align(src, tgt, engine="numpy", band=band)
+        yield "extract_phrase_pairs", source, size, lambda: extract_phrase_pairs(src, tgt, links)
+        yield "extract_phrase_pairs_fast", source, size, lambda: extract_phrase_pairs_fast(src, tgt, links)
+        yield "phrase_based_projection", source, size, lambda: phrase_based_projection(src, tgt, links, phrases)
+        yield "matrix_for_viewer", source, size, lambda: matrix_for_viewer(src, tgt, links)
+        yield "translate_with_alignment", source, size, lambda t=src_text: translator.translate_with_alignment(t, lang)
+
+
+def compare(results: List[dict], baseline: dict, tolerance: float) -> List[str]:
+    previous = {(r["name"], r["source"], r["size"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        old = previous.get((r["name"], r["source"], r["size"]))
+        if not old:
+            continue
+        r["baseline_p50_ms"] = old["p50_ms"]
+        r["change"] = r["p50_ms"] / old["p50_ms"] - 1.0 if old["p50_ms"] else 0.0
+        if r["change"] > tolerance:
+            regressions.append(
+                f"{r['name']} [{r['source']}, {r['size']} tokens]: p50 {old['p50_ms']:.3f}ms -> {r['p50_ms']:.3f}ms "
+                f"({r['change']:+.0%})"
+            )
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the alignment pipeline.")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)))
+    parser.add_argument("--engines", default="numpy,python")
+    parser.add_argument("--python-max-size", type=int, default=200, help="Skip the pure-Python engine above this size.")
+    parser.add_argument("--band", type=int, default=20, help="Diagonal window for the banded case; 0 skips it.")
+    parser.add_argument("--corpus", type=Path, default=None, help="'src ||| tgt' corpus for corpus-derived inputs.")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds to keep sampling each case.")
+    parser.add_argument("--max-runs", type=int, default=200)
+    parser.add_argument("--only", default="", help="Comma-separated benchmark names to run.")
+    parser.add_argument("--output", type=Path, default=Path("bench_output.json"))
+    parser.add_argument("--baseline", type=Path, default=None, help="Compare against this results file.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p50 slowdown before failing.")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    engines = [e for e in args.engines.split(",") if e]
+    only = {n for n in args.only.split(",") if n}
+    stub = StubSentenceTranslator()
+    inputs: Dict[Tuple[str, int], Tuple[str, str]] = {}
+    for size in sizes:
+        text = synthetic_sentence(size, seed=size)
+        inputs[("synthetic", size)] = (text, stub.translate(text, "hi"))
+        if args.corpus:
+            text = corpus_sentence(args.corpus, size)
+            inputs[("corpus", size)] = (text, stub.translate(text, "hi"))
+
+    results: List[dict] = []
+    for name, source, size, fn in cases(inputs, engines, args.python_max_size, args.band):
+        if only and name not in only:
+            continue
+        stats = measure(fn, args.min_time, args.max_runs, units=size)
+        results.append({"name": name, "source": source, "size": size, **stats})
+        print(
+            f"{name:<28} {source:<9} {size:>5}  p50 {stats['p50_ms']:9.3f}ms  p99 {stats['p99_ms']:9.3f}ms  "
+            f"{stats['ops_per_s']:9.1f} ops/s  peak {stats['peak_mem_kb']:9.1f} KiB",
+            flush=True,
+        )
+
+    regressions: List[str] = []
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "min_time": args.min_time,
+        },
+        "results": results,
+        "regressions": regressions,
+    }
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Wrote {len(results)} results to {args.output}")
+
+    for line in regressions:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import argparse
+import html
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+from urllib.parse import parse_qs, urlsplit
+
+from bench_pipeline import StubSentenceTranslator
+
+# Local stand-in for the Google endpoint, for exercising the pooled client without the network:
+#   python benchmarks/stub_backend.py --port 8765 --latency 0.05 --slow-rate 0.05 --error-rate 0.1
+#   SMT_BACKEND_URL=http://127.0.0.1:8765 python app.py
+
+
+class StubBackendServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # room for load runs that open hundreds of connections at once
+
+    def __init__(self, address, options: argparse.Namespace) -> None:
+        super().__init__(address, StubBackendHandler)
+        self.options = options
+        self.translator = StubSentenceTranslator()
+        self.rng = random.Random(options.seed)
+        self.stats: Dict[str, int] = {"requests": 0, "connections": 0, "ok": 0, "errors": 0, "resets": 0, "slow": 0}
+        self.lock = threading.Lock()
+
+    def handle_error(self, request, client_address) -> None:
+        # Clients cancelling hedged or timed-out requests hang up mid-response; that is expected here.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def count(self, name: str) -> int:
+        with self.lock:
+            self.stats[name] += 1
+            return self.stats[name]
+
+    def roll(self, rate: float) -> bool:
+        with self.lock:
+            return self.rng.random() < rate
+
+
+class StubBackendHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so the client's connection reuse is visible in the stats
+    disable_nagle_algorithm = True  # headers and body are separate writes
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.count("connections")
+
+    def do_GET(self) -> None:
+        server: StubBackendServer = self.server  # type: ignore[assignment]
+        opts = server.options
+        # The --*-first options script the first requests exactly, for tests; the rates are random.
+        n = server.count("requests")
+        if n <= opts.reset_first or server.roll(opts.reset_rate):
+            server.count("resets")
+            self.close_connection = True
+            return
+
+        delay = opts.latency + (server.rng.uniform(0.0, opts.jitter) if opts.jitter else 0.0)
+        if n <= opts.slow_first or server.roll(opts.slow_rate):
+            server.count("slow")
+            delay += opts.slow_latency
+        time.sleep(delay)
+
+        if n <= opts.fail_first or server.roll(opts.error_rate):
+            server.count("errors")
+            self._send(503, b"unavailable")
+            return
+        query = parse_qs(urlsplit(self.path).query)
+        text = query.get("q", [""])[0]
+        target = query.get("tl", ["hi"])[0]
+        translated = server.translator.translate(text, target)
+        body = f'<html><body><div class="result-container">{html.escape(translated)}</div></body></html>'
+        server.count("ok")
+        self._send(200, body.encode("utf-8"), "text/html; charset=utf-8")
+
+    def _send(self, status: int, body: bytes, content_type: str = "text/plain") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.options.verbose:
+            super().log_message(format, *args)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Stub translation backend with injected latency and failures.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Base delay per request in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra uniform random delay, up to this many seconds.")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of requests given --slow-latency on top.")
+    parser.add_argument("--slow-latency", type=float, default=2.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 503.")
+    parser.add_argument("--reset-rate", type=float, default=0.0, help="Fraction of connections dropped without a reply.")
+    parser.add_argument("--reset-first", type=int, default=0, help="Drop the first N requests without a reply.")
+    parser.add_argument("--slow-first", type=int, default=0, help="Give the first N requests --slow-latency.")
+    parser.add_argument("--fail-first", type=int, default=0, help="Answer the first N requests with HTTP 503.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    server = StubBackendServer((args.host, args.port), args)
+    print(f"Stub backend on http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(server.stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from smt.toolkit import ToolkitError, fast_align_bidirectional  # noqa: E402
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Run forward and reverse fast_align in parallel, then symmetrize with atools."
+    )
+    parser.add_argument("--fast-align", required=True, help="Path to the fast_align executable.")
+    parser.add_argument(
+        "--atools",
+        default=None,
+        help="Path to the atools executable; symmetrizes in-process when omitted.",
+    )
+    parser.add_argument("--parallel-corpus", required=True, type=Path, help="Corpus in 'src ||| tgt' format.")
+    parser.add_argument("--out-dir", type=Path, default=None, help="Defaults to the corpus directory.")
+    parser.add_argument("--heuristic", default="grow-diag-final-and")
+    parser.add_argument("--quiet", action="store_true", help="Only print the final summary.")
+    args = parser.parse_args(argv)
+
+    if not args.parallel_corpus.exists():
+        parser.error(f"Parallel corpus not found: {args.parallel_corpus}")
+
+    out_dir = args.out_dir or args.parallel_corpus.resolve().parent
+    out_dir.mkdir(parents=True, exist_ok=True)
+    fwd = out_dir / "forward.align"
+    rev = out_dir / "reverse.align"
+    sym = out_dir / "sym.align"
+
+    def progress(stage: str, message: str) -> None:
+        if not args.quiet:
+            print(f"[{stage}] {message}", file=sys.stderr, flush=True)
+
+    try:
+        timings = fast_align_bidirectional(
+            args.fast_align,
+            args.atools,
+            args.parallel_corpus,
+            fwd,
+            rev,
+            sym,
+            heuristic=args.heuristic,
+            progress=progress,
+        )
+    except (ToolkitError, OSError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+
+    print(f"Forward alignment: {fwd} ({timings['forward']:.2f}s)")
+    print(f"Reverse alignment: {rev} ({timings['reverse']:.2f}s)")
+    print(f"Symmetrized alignment: {sym} ({timings['symmetrize']:.2f}s)")
+    print(f"Total: {timings['total']:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
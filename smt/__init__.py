@@ -1,3 +1,12 @@
-from .engine import SMTTranslator
+from __future__ import annotations
 
 __all__ = ["SMTTranslator"]
+
+
+def __getattr__(name: str):
+    # Resolved on first access, so `import smt.config` or `python -m smt.cache` does not load the engine.
+    if name == "SMTTranslator":
+        from .engine import SMTTranslator
+
+        return SMTTranslator
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional
+
+from .cache import CacheKey, make_cache_key, translation_model
+from .engine import SMTTranslator
+from .metrics import REGISTRY
+from .singleflight import AsyncSingleFlight
+
+ADMISSION = REGISTRY.counter(
+    "smt_admission_total",
+    "ASGI requests by admission outcome: admitted at once, queued then admitted, rejected (queue full) or timeout.",
+)
+ADMISSION_WAIT = REGISTRY.histogram("smt_admission_wait_seconds", "Time ASGI requests spent in the admission queue.")
+PREFETCHED = REGISTRY.counter("smt_prefetch_total", "Backend translations fetched on the event loop, by outcome.")
+
+
+class AdmissionRejected(RuntimeError):
+    pass
+
+
+class AdmissionController:
+    # At most `limit` requests run at once and up to `queue_size` more wait, first come first served,
+    # for at most `timeout` seconds. Everything beyond that is turned away straight away, so under
+    # overload latency stays bounded instead of growing with the backlog. Used from one event loop.
+    def __init__(self, limit: int, queue_size: int, timeout: float) -> None:
+        self.limit = max(1, limit)
+        self.queue_size = max(0, queue_size)
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> None:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            ADMISSION.inc(outcome="admitted")
+            return
+        if len(self._waiters) >= self.queue_size:
+            ADMISSION.inc(outcome="rejected")
+            raise AdmissionRejected("Server busy: admission queue is full.")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+        except asyncio.TimeoutError:
+            ADMISSION.inc(outcome="timeout")
+            raise AdmissionRejected(f"Server busy: not admitted within {self.timeout:g}s.") from None
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # the slot was handed over as the client went away; pass it on
+            raise
+        finally:
+            ADMISSION_WAIT.observe(time.perf_counter() - started)
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        ADMISSION.inc(outcome="queued")
+
+    def release(self) -> None:
+        # A freed slot goes straight to the oldest waiter, so `active` only drops when nobody waits.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {"active": self.active, "queued": len(self._waiters), "limit": self.limit}
+
+
+class PrefetchedSentenceTranslator:
+    # Outermost translator layer in ASGI mode. The event loop registers the backend outcomes a request
+    # needs before its view runs; the view's synchronous translate() calls then return them (or re-raise
+    # their error) without touching the backend. Anything not registered falls through.
+    def __init__(self, translator) -> None:
+        self.translator = translator
+        self.source_language = translator.source_language
+        # key -> [translation or exception, number of requests holding it]
+        self._entries: Dict[CacheKey, list] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self) -> str:
+        return self.translator.backend
+
+    def model_id(self, target_language: str) -> str:
+        return translation_model(self.translator, target_language)
+
+    def add(self, key: CacheKey, outcome: str | BaseException) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = [outcome, 1]
+            else:
+                entry[0] = outcome
+                entry[1] += 1
+
+    def discard(self, keys: Iterable[CacheKey]) -> None:
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry[1] -= 1
+                    if entry[1] <= 0:
+                        del self._entries[key]
+
+    def translate(self, sentence: str, target_language: str) -> str:
+        key = make_cache_key(self.model_id(target_language), self.source_language, target_language, sentence)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return self.translator.translate(sentence, target_language)
+        if isinstance(entry[0], BaseException):
+            raise entry[0]
+        return entry[0]
+
+
+class AsyncSMTTranslator:
+    # Event-loop front of an SMTTranslator for the ASGI app: backend calls for a request are made
+    # concurrently on the loop (through the cache and an async single-flight) instead of holding a
+    # thread each, and their outcomes are handed to the synchronous views through the prefetch layer.
+    def __init__(self, translator: SMTTranslator) -> None:
+        self.translator = translator
+        self.source_language = translator.cfg.source_language
+        self.backend = translator.sentence_backend
+        self.cache = translator.cache
+        self.prefetched = PrefetchedSentenceTranslator(translator.library_translator)
+        translator.library_translator = self.prefetched
+        self._flight: AsyncSingleFlight[str] | None = AsyncSingleFlight("translate") if translator.cfg.coalesce else None
+
+    async def _cache_call(self, fn, *args):
+        # The in-memory tier is cheap enough for the loop; SQLite goes to the I/O pool.
+        if self.cache.disk is None:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.translator.io_executor(), fn, *args)
+
+    def _key(self, sentence: str, target_language: str) -> CacheKey:
+        # Same key as the prefetch layer and the cache below it compute for the view's calls.
+        return make_cache_key(self.prefetched.model_id(target_language), self.source_language, target_language, sentence)
+
+    async def translate(self, sentence: str, target_language: str) -> str:
+        key = self._key(sentence, target_language)
+        if self.cache is not None:
+            cached = await self._cache_call(self.cache.get, key)
+            if cached is not None:
+                return cached
+        if self._flight is None:
+            return await self._fetch(key, sentence, target_language)
+        translated, _ = await self._flight.do(key, lambda: self._fetch(key, sentence, target_language))
+        return translated
+
+    async def _fetch(self, key: CacheKey, sentence: str, target_language: str) -> str:
+        translate_async = getattr(self.backend, "translate_async", None)
+        if translate_async is not None:
+            translated = await translate_async(sentence, target_language)
+        else:
+            # Backends without async I/O (the decoder pool, the phrase table) keep their thread.
+            loop = asyncio.get_running_loop()
+            translated = await loop.run_in_executor(
+                self.translator.io_executor(), self.backend.translate, sentence, target_language
+            )
+        if self.cache is not None:
+            await self._cache_call(self.cache.put, key, translated)
+        return translated
+
+    async def prefetch(
+        self,
+        sentences: Iterable[str],
+        languages: Iterable[str],
+        timeout: Optional[float] = None,
+    ) -> List[CacheKey]:
+        # Fetches every (sentence, language) pair concurrently and registers the outcomes; calls still
+        # running after `timeout` are registered as timed out. Returns the keys to pass to release().
+        langs = list(languages)
+        pairs: Dict[CacheKey, tuple] = {}
+        for sentence in sentences:
+            for lang in langs:
+                key = self._key(sentence, lang)
+                if sentence.strip() and key not in pairs:
+                    pairs[key] = (sentence, lang)
+        if not pairs:
+            return []
+        tasks = {key: asyncio.ensure_future(self.translate(*pair)) for key, pair in pairs.items()}
+        try:
+            _, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+        except asyncio.CancelledError:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        for task in pending:
+            task.cancel()  # a coalesced call carries on for its other waiters and still fills the cache
+        for key, task in tasks.items():
+            if task in pending:
+                outcome: str | BaseException = TimeoutError(f"timed out after {timeout:g}s")
+                PREFETCHED.inc(outcome="timeout")
+            elif task.exception() is not None:
+                outcome = task.exception()
+                PREFETCHED.inc(outcome="error")
+            else:
+                outcome = task.result()
+                PREFETCHED.inc(outcome="ok")
+            self.prefetched.add(key, outcome)
+        return list(tasks)
+
+    def release(self, keys: Iterable[CacheKey]) -> None:
+        self.prefetched.discard(keys)
+
+    def close(self) -> None:
+        client = getattr(self.backend, "async_client", None)
+        if client is not None:
+            client.close()
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 import math
+from array import array
 from collections import defaultdict
 from dataclasses import dataclass
-from typing import Dict, List, Set, Tuple
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
-from .tokenize import is_punctuation
+from .vocab import PUNCT, TokenInput, Vocab, as_ids, as_tokens
 
 
 @dataclass
@@ -14,87 +15,358 @@ class AlignmentPoint:
     tgt_index: int
 
 
+class SparseGrid:
+    # Row -> aligned target columns; `tgt_i in grid[src_i]` replaces the dense n x m bool matrix.
+    __slots__ = ("n_src", "n_tgt", "rows")
+
+    _EMPTY: FrozenSet[int] = frozenset()
+
+    def __init__(self, n_src: int, n_tgt: int, rows: Dict[int, FrozenSet[int]]) -> None:
+        self.n_src = n_src
+        self.n_tgt = n_tgt
+        self.rows = rows
+
+    def __getitem__(self, src_index: int) -> FrozenSet[int]:
+        return self.rows.get(src_index, self._EMPTY)
+
+    def __len__(self) -> int:
+        return self.n_src
+
+    def to_json(self) -> dict:
+        return {
+            "rows": self.n_src,
+            "cols": self.n_tgt,
+            "links": [[si, ti] for si in sorted(self.rows) for ti in sorted(self.rows[si])],
+        }
+
+
+class AlignmentLinks:
+    # Compact alignment: parallel int arrays sorted by (src, tgt). Iterating still yields AlignmentPoint
+    # so code written against List[AlignmentPoint] keeps working.
+    __slots__ = ("src", "tgt")
+
+    def __init__(self, src: Iterable[int] = (), tgt: Iterable[int] = ()) -> None:
+        self.src = array("i", src)
+        self.tgt = array("i", tgt)
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[Tuple[int, int]]) -> "AlignmentLinks":
+        ordered = sorted(set(pairs))
+        return cls((si for si, _ in ordered), (ti for _, ti in ordered))
+
+    @classmethod
+    def from_pharaoh(cls, line: str, n_src: int | None = None, n_tgt: int | None = None) -> "AlignmentLinks":
+        # Links outside an n_src x n_tgt sentence are dropped; malformed items raise ValueError.
+        pairs = []
+        for item in line.split():
+            si, sep, ti = item.partition("-")
+            if not sep:
+                raise ValueError(f"Malformed alignment link: {item!r}")
+            pair = (int(si), int(ti))
+            if (n_src is None or pair[0] < n_src) and (n_tgt is None or pair[1] < n_tgt):
+                pairs.append(pair)
+        return cls.from_pairs(pairs)
+
+    @classmethod
+    def coerce(cls, points: "Points") -> "AlignmentLinks":
+        if isinstance(points, cls):
+            return points
+        return cls.from_pairs((p.src_index, p.tgt_index) for p in points)
+
+    def __len__(self) -> int:
+        return len(self.src)
+
+    def __iter__(self) -> Iterator[AlignmentPoint]:
+        for si, ti in zip(self.src, self.tgt):
+            yield AlignmentPoint(src_index=si, tgt_index=ti)
+
+    def __getitem__(self, index: int) -> AlignmentPoint:
+        return AlignmentPoint(src_index=self.src[index], tgt_index=self.tgt[index])
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, AlignmentLinks):
+            return self.src == other.src and self.tgt == other.tgt
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"AlignmentLinks({self.to_pharaoh()!r})"
+
+    def pairs(self) -> Iterator[Tuple[int, int]]:
+        return zip(self.src, self.tgt)
+
+    def to_pharaoh(self) -> str:
+        return " ".join(f"{si}-{ti}" for si, ti in zip(self.src, self.tgt))
+
+    def grid(self, n_src: int, n_tgt: int) -> SparseGrid:
+        rows: Dict[int, Set[int]] = defaultdict(set)
+        for si, ti in zip(self.src, self.tgt):
+            rows[si].add(ti)
+        return SparseGrid(n_src, n_tgt, {si: frozenset(tis) for si, tis in rows.items()})
+
+    def word_pairs(self, source_tokens: List[str], target_tokens: List[str]) -> List[dict]:
+        return [
+            {
+                "source_word": source_tokens[si],
+                "target_word": target_tokens[ti],
+                "source_index": si,
+                "target_index": ti,
+            }
+            for si, ti in zip(self.src, self.tgt)
+            if si < len(source_tokens) and ti < len(target_tokens)
+        ]
+
+    def to_json(self) -> List[dict]:
+        return [{"src_index": si, "tgt_index": ti} for si, ti in zip(self.src, self.tgt)]
+
+
+Points = Union[AlignmentLinks, List[AlignmentPoint]]
+
+
 @dataclass
 class TranslationResult:
     source_tokens: List[str]
     target_tokens: List[str]
     target_text: str
-    alignments: List[AlignmentPoint]
+    alignments: AlignmentLinks
     backend: str
 
 
 def matrix_for_viewer(
     source_tokens: List[str],
     target_tokens: List[str],
-    points: List[AlignmentPoint],
+    points: Points,
 ) -> List[List[bool]]:
-    aligned = {(p.src_index, p.tgt_index) for p in points}
+    aligned = set(AlignmentLinks.coerce(points).pairs())
     return [
         [(si, ti) in aligned for ti in range(len(target_tokens))]
         for si in range(len(source_tokens))
     ]
 
 
+@dataclass
+class EMStats:
+    iterations: int = 0
+    converged: bool = False
+    max_delta: float = 0.0
+    log_likelihood: float = 0.0
+
+    def record(self, iterations: int, converged: bool, max_delta: float, log_likelihood: float) -> None:
+        # Accumulates across EM runs (e.g. both directions of a symmetrized alignment).
+        first = self.iterations == 0
+        self.iterations += iterations
+        self.converged = converged if first else self.converged and converged
+        self.max_delta = max_delta if first else max(self.max_delta, max_delta)
+        self.log_likelihood += log_likelihood
+
+
+# Warm-start weights below PRIOR_MIN are not kept; unseen pairs get PRIOR_FLOOR.
+PRIOR_MIN = 0.05
+PRIOR_FLOOR = 0.1
+
+
+class AlignmentPrior:
+    # Word-pair weights carried over from earlier EM runs, e.g. previous sentences of the same
+    # document, keyed by IDs in the given vocabularies. Passing the same prior to successive
+    # em_word_align calls warm-starts each one from what the previous ones converged to.
+    def __init__(self, source_vocab: Vocab, target_vocab: Vocab, decay: float = 0.5, max_pairs: int = 100_000) -> None:
+        self.source_vocab = source_vocab
+        self.target_vocab = target_vocab
+        self.decay = decay
+        self.max_pairs = max_pairs
+        self.weights: Dict[int, Dict[int, float]] = {}
+        self._size = 0
+
+    def check_vocabs(self, source_vocab: Vocab | None, target_vocab: Vocab | None) -> Tuple[Vocab, Vocab]:
+        if source_vocab not in (None, self.source_vocab) or target_vocab not in (None, self.target_vocab):
+            raise ValueError("AlignmentPrior was built for different vocabularies.")
+        return self.source_vocab, self.target_vocab
+
+    def entries(self, src_ids: List[int], tgt_ids: List[int]) -> Iterator[Tuple[int, int, float]]:
+        # (si, ti, weight) for every sentence position pair the prior has a weight for.
+        tgt_positions: Dict[int, List[int]] = defaultdict(list)
+        for ti, t_id in enumerate(tgt_ids):
+            tgt_positions[t_id].append(ti)
+        for si, s_id in enumerate(src_ids):
+            row = self.weights.get(s_id)
+            if not row:
+                continue
+            for t_id, weight in row.items():
+                for ti in tgt_positions.get(t_id, ()):
+                    yield si, ti, weight
+
+    def matrix(self, src_ids: List[int], tgt_ids: List[int]) -> List[List[float]]:
+        rows = [[PRIOR_FLOOR] * len(tgt_ids) for _ in src_ids]
+        for si, ti, weight in self.entries(src_ids, tgt_ids):
+            rows[si][ti] = PRIOR_FLOOR + weight
+        return rows
+
+    def update(self, src_ids: List[int], tgt_ids: List[int], links: Iterable[Tuple[int, int, float]]) -> None:
+        # Exponential moving average of each pair's final EM weight; oldest rows go first when full.
+        for si, ti, value in links:
+            if value < PRIOR_MIN:
+                continue
+            row = self.weights.setdefault(src_ids[si], {})
+            t_id = tgt_ids[ti]
+            old = row.get(t_id)
+            if old is None:
+                self._size += 1
+                row[t_id] = value
+            else:
+                row[t_id] = self.decay * old + (1.0 - self.decay) * value
+        while self._size > self.max_pairs and self.weights:
+            oldest = next(iter(self.weights))
+            self._size -= len(self.weights.pop(oldest))
+
+
+def band_bounds(src_n: int, tgt_n: int, window: int = 0) -> List[Tuple[int, int]]:
+    # Inclusive target range per source position: `window` cells either side of the relative-position
+    # diagonal, or every target when window <= 0 or the band would not be narrower than the sentence.
+    if window <= 0 or 2 * window + 1 >= tgt_n:
+        return [(0, tgt_n - 1)] * src_n
+    bounds = []
+    for si in range(src_n):
+        center = round((si + 1) * (tgt_n + 1) / (src_n + 1)) - 1
+        bounds.append((max(0, center - window), min(tgt_n - 1, center + window)))
+    return bounds
+
+
 def _init_translation_table(
-    source_tokens: List[str],
-    target_tokens: List[str],
+    src_punct: List[bool],
+    tgt_punct: List[bool],
+    src_codes: List[int],
+    tgt_codes: List[int],
+    cells: List[Tuple[int, int]],
+    lexical_weights: Optional[List[float]] = None,
 ) -> Dict[Tuple[int, int], float]:
-    src_n = max(1, len(source_tokens))
-    tgt_n = max(1, len(target_tokens))
+    # Only `cells` are stored; lexical_weights, when given, is aligned with them.
+    src_n = max(1, len(src_punct))
+    tgt_n = max(1, len(tgt_punct))
     table: Dict[Tuple[int, int], float] = {}
 
-    for si, s_tok in enumerate(source_tokens):
-        for ti, t_tok in enumerate(target_tokens):
-            pos_src = (si + 1) / (src_n + 1)
-            pos_tgt = (ti + 1) / (tgt_n + 1)
-            pos_prior = math.exp(-8.0 * abs(pos_src - pos_tgt))
-            punct_match = 1.0
-            if is_punctuation(s_tok) or is_punctuation(t_tok):
-                punct_match = 4.0 if s_tok == t_tok else 0.05
-            table[(si, ti)] = (0.15 + pos_prior) * punct_match
+    for k, (si, ti) in enumerate(cells):
+        pos_src = (si + 1) / (src_n + 1)
+        pos_tgt = (ti + 1) / (tgt_n + 1)
+        pos_prior = math.exp(-8.0 * abs(pos_src - pos_tgt))
+        punct_match = 1.0
+        if src_punct[si] or tgt_punct[ti]:
+            punct_match = 4.0 if src_codes[si] == tgt_codes[ti] else 0.05
+        table[(si, ti)] = (0.15 + pos_prior) * punct_match
+        if lexical_weights is not None:
+            table[(si, ti)] *= lexical_weights[k]
     return table
 
 
 def em_word_align(
-    source_tokens: List[str],
-    target_tokens: List[str],
+    source_tokens: TokenInput,
+    target_tokens: TokenInput,
     iterations: int = 8,
-) -> List[AlignmentPoint]:
-    if not source_tokens or not target_tokens:
-        return []
-
-    table = _init_translation_table(source_tokens, target_tokens)
-
+    engine: str = "python",
+    lexical_model=None,
+    source_vocab: Vocab | None = None,
+    target_vocab: Vocab | None = None,
+    tolerance: float = 0.0,
+    prior: AlignmentPrior | None = None,
+    stats: EMStats | None = None,
+    band: int = 0,
+) -> AlignmentLinks:
+    # Tokens may be strings or int IDs encoded with source_vocab/target_vocab (see smt.vocab).
+    # With tolerance > 0, `iterations` is an upper bound: EM stops once no table entry moves by more
+    # than `tolerance`. `prior` warm-starts EM and is updated with the result; `stats` is filled in.
+    # band > 0 only stores and updates cells within `band` targets of the diagonal: O(n*band), not O(n*m).
+    if engine == "numpy":
+        from .alignment_numpy import em_word_align_numpy
+
+        return em_word_align_numpy(
+            source_tokens,
+            target_tokens,
+            iterations=iterations,
+            lexical_model=lexical_model,
+            source_vocab=source_vocab,
+            target_vocab=target_vocab,
+            tolerance=tolerance,
+            prior=prior,
+            stats=stats,
+            band=band,
+        )
+    if engine != "python":
+        raise ValueError(f"Unknown alignment engine: {engine}")
+
+    if len(source_tokens) == 0 or len(target_tokens) == 0:
+        return AlignmentLinks()
+
+    if prior is not None:
+        source_vocab, target_vocab = prior.check_vocabs(source_vocab, target_vocab)
+    src_ids, source_vocab = as_ids(source_tokens, source_vocab)
+    tgt_ids, target_vocab = as_ids(target_tokens, target_vocab)
+    src_punct: List[bool] = source_vocab.has_flag(src_ids, PUNCT).tolist()
+    tgt_punct: List[bool] = target_vocab.has_flag(tgt_ids, PUNCT).tolist()
+    src_codes: List[int] = source_vocab.punct_codes(src_ids).tolist()
+    tgt_codes: List[int] = target_vocab.punct_codes(tgt_ids).tolist()
+    src_n = len(src_punct)
+    tgt_n = len(tgt_punct)
+    rows = [range(lo, hi + 1) for lo, hi in band_bounds(src_n, tgt_n, band)]
+    cells = [(si, ti) for si in range(src_n) for ti in rows[si]]
+
+    # A trained corpus model (see smt.ibm_model) sharpens the positional prior with t(t|s).
+    lexical_weights = None
+    if lexical_model:
+        lexical_weights = lexical_model.score_cells(
+            as_tokens(source_tokens, source_vocab),
+            as_tokens(target_tokens, target_vocab),
+            cells,
+        )
+    table = _init_translation_table(src_punct, tgt_punct, src_codes, tgt_codes, cells, lexical_weights)
+    if prior is not None:
+        boosts = {(si, ti): PRIOR_FLOOR + w for si, ti, w in prior.entries(src_ids.tolist(), tgt_ids.tolist())}
+        for cell in cells:
+            table[cell] *= boosts.get(cell, PRIOR_FLOOR)
+
+    done = 0
+    converged = False
+    max_delta = 0.0
+    log_likelihood = 0.0
     for _ in range(max(1, iterations)):
-        count: Dict[Tuple[int, int], float] = defaultdict(float)
+        z: Dict[int, float] = defaultdict(float)
+        count: Dict[Tuple[int, int], float] = {}
         total_s: Dict[int, float] = defaultdict(float)
         total_t: Dict[int, float] = defaultdict(float)
 
-        for ti in range(len(target_tokens)):
-            z = 0.0
-            for si in range(len(source_tokens)):
-                z += table[(si, ti)]
-            if z <= 0.0:
+        for cell in cells:
+            z[cell[1]] += table[cell]
+        log_likelihood = sum(math.log(v) for v in z.values() if v > 0.0)
+        for cell in cells:
+            si, ti = cell
+            if z[ti] <= 0.0:
+                count[cell] = 0.0
                 continue
-            for si in range(len(source_tokens)):
-                posterior = table[(si, ti)] / z
-                count[(si, ti)] += posterior
-                total_s[si] += posterior
-                total_t[ti] += posterior
+            posterior = table[cell] / z[ti]
+            count[cell] = posterior
+            total_s[si] += posterior
+            total_t[ti] += posterior
 
         # Agreement-style update: source-normalized * target-normalized.
-        for si in range(len(source_tokens)):
-            for ti in range(len(target_tokens)):
-                p_t_given_s = count[(si, ti)] / total_s[si] if total_s[si] > 0 else 0.0
-                p_s_given_t = count[(si, ti)] / total_t[ti] if total_t[ti] > 0 else 0.0
-                table[(si, ti)] = max(1e-12, p_t_given_s * p_s_given_t)
-
+        max_delta = 0.0
+        for cell in cells:
+            si, ti = cell
+            p_t_given_s = count[cell] / total_s[si] if total_s[si] > 0 else 0.0
+            p_s_given_t = count[cell] / total_t[ti] if total_t[ti] > 0 else 0.0
+            value = max(1e-12, p_t_given_s * p_s_given_t)
+            max_delta = max(max_delta, abs(value - table[cell]))
+            table[cell] = value
+        done += 1
+        if tolerance > 0 and max_delta < tolerance:
+            converged = True
+            break
+
+    if stats is not None:
+        stats.record(done, converged, max_delta, log_likelihood)
+    if prior is not None:
+        prior.update(src_ids.tolist(), tgt_ids.tolist(), ((si, ti, v) for (si, ti), v in table.items()))
+
+    # Enforce punctuation-only matching.
     raw_links: Set[Tuple[int, int]] = set()
-    for si, s_tok in enumerate(source_tokens):
-        # Enforce punctuation-only matching.
-        punct_targets = [ti for ti, t_tok in enumerate(target_tokens) if is_punctuation(t_tok)]
-        non_punct_targets = [ti for ti, t_tok in enumerate(target_tokens) if not is_punctuation(t_tok)]
-        candidates = punct_targets if is_punctuation(s_tok) else non_punct_targets
+    for si in range(src_n):
+        candidates = [ti for ti in rows[si] if tgt_punct[ti] == src_punct[si]]
         if not candidates:
             continue
 
@@ -111,17 +383,38 @@ def em_word_align(
                 raw_links.add((si, ti))
 
     # Ensure punctuation marks with exact match are linked when possible.
+    punct_targets = [ti for ti in range(tgt_n) if tgt_punct[ti]]
     used_targets = {ti for _, ti in raw_links}
-    for si, s_tok in enumerate(source_tokens):
-        if not is_punctuation(s_tok):
+    for si in range(src_n):
+        if not src_punct[si]:
             continue
-        exact = [ti for ti, t_tok in enumerate(target_tokens) if t_tok == s_tok and ti not in used_targets]
+        exact = [ti for ti in punct_targets if tgt_codes[ti] == src_codes[si] and ti not in used_targets]
         if exact:
             closest = min(exact, key=lambda ti: abs(ti - si))
             raw_links.add((si, closest))
             used_targets.add(closest)
 
-    return [AlignmentPoint(src_index=si, tgt_index=ti) for si, ti in sorted(raw_links)]
+    return AlignmentLinks.from_pairs(raw_links)
+
+
+def _phrase_pair(
+    source_tokens: List[str],
+    target_tokens: List[str],
+    s_start: int,
+    s_end: int,
+    t_start: int,
+    t_end: int,
+) -> dict:
+    return {
+        "source_phrase": " ".join(source_tokens[s_start : s_end + 1]),
+        "target_phrase": " ".join(target_tokens[t_start : t_end + 1]),
+        "source_span": f"{s_start}-{s_end}",
+        "target_span": f"{t_start}-{t_end}",
+        "source_start": s_start,
+        "source_end": s_end,
+        "target_start": t_start,
+        "target_end": t_end,
+    }
 
 
 def extract_phrase_pairs(
@@ -175,26 +468,89 @@ def extract_phrase_pairs(
             if key in seen:
                 continue
             seen.add(key)
-            phrases.append(
-                {
-                    "source_phrase": " ".join(source_tokens[s_start : s_end + 1]),
-                    "target_phrase": " ".join(target_tokens[t_start : t_end + 1]),
-                    "source_span": f"{s_start}-{s_end}",
-                    "target_span": f"{t_start}-{t_end}",
-                    "source_start": s_start,
-                    "source_end": s_end,
-                    "target_start": t_start,
-                    "target_end": t_end,
-                }
-            )
+            phrases.append(_phrase_pair(source_tokens, target_tokens, s_start, s_end, t_start, t_end))
 
     return phrases
 
 
+def extract_phrase_spans(
+    src_len: int,
+    tgt_len: int,
+    points: Points,
+    max_phrase_len: int = 4,
+    extend_unaligned: bool = False,
+) -> List[Tuple[int, int, int, int]]:
+    if not src_len or not tgt_len or not points:
+        return []
+
+    # Per-position min/max linked index and link counts, computed once.
+    src_min = [tgt_len] * src_len
+    src_max = [-1] * src_len
+    src_links = [0] * src_len
+    tgt_links = [0] * tgt_len
+    for si, ti in AlignmentLinks.coerce(points).pairs():
+        if si >= src_len or ti >= tgt_len:
+            continue
+        src_min[si] = min(src_min[si], ti)
+        src_max[si] = max(src_max[si], ti)
+        src_links[si] += 1
+        tgt_links[ti] += 1
+    tgt_prefix = [0] * (tgt_len + 1)
+    for ti, n in enumerate(tgt_links):
+        tgt_prefix[ti + 1] = tgt_prefix[ti] + n
+
+    spans: List[Tuple[int, int, int, int]] = []
+    for s_start in range(src_len):
+        t_start, t_end, span_links = tgt_len, -1, 0
+        for s_end in range(s_start, min(src_len, s_start + max_phrase_len)):
+            t_start = min(t_start, src_min[s_end])
+            t_end = max(t_end, src_max[s_end])
+            span_links += src_links[s_end]
+            if t_end < 0 or (t_end - t_start + 1) > max_phrase_len:
+                continue
+            # Every link of the source span lands inside [t_start, t_end]; the box is consistent
+            # exactly when those targets carry no other links.
+            if tgt_prefix[t_end + 1] - tgt_prefix[t_start] != span_links:
+                continue
+            if not extend_unaligned:
+                spans.append((s_start, s_end, t_start, t_end))
+                continue
+            lo = t_start
+            while lo - 1 >= 0 and tgt_links[lo - 1] == 0 and t_end - (lo - 1) + 1 <= max_phrase_len:
+                lo -= 1
+            for ts in range(t_start, lo - 1, -1):
+                te = t_end
+                while True:
+                    spans.append((s_start, s_end, ts, te))
+                    if te + 1 >= tgt_len or tgt_links[te + 1] != 0 or te + 1 - ts + 1 > max_phrase_len:
+                        break
+                    te += 1
+    return spans
+
+
+def extract_phrase_pairs_fast(
+    source_tokens: List[str],
+    target_tokens: List[str],
+    points: Points,
+    max_phrase_len: int = 4,
+    extend_unaligned: bool = False,
+) -> List[dict]:
+    # Same pairs as extract_phrase_pairs (plus unaligned-target extensions when requested),
+    # without re-scanning target back-links for every span.
+    spans = extract_phrase_spans(
+        len(source_tokens),
+        len(target_tokens),
+        points,
+        max_phrase_len=max_phrase_len,
+        extend_unaligned=extend_unaligned,
+    )
+    return [_phrase_pair(source_tokens, target_tokens, *span) for span in spans]
+
+
 def phrase_based_projection(
     source_tokens: List[str],
     target_tokens: List[str],
-    points: List[AlignmentPoint],
+    points: Points,
     phrase_pairs: List[dict],
 ) -> str:
     if not source_tokens or not target_tokens:
@@ -212,8 +568,8 @@ def phrase_based_projection(
         )
 
     align_by_src: Dict[int, List[int]] = defaultdict(list)
-    for ap in points:
-        align_by_src[ap.src_index].append(ap.tgt_index)
+    for si, ti in AlignmentLinks.coerce(points).pairs():
+        align_by_src[si].append(ti)
     for si in align_by_src:
         align_by_src[si].sort()
 
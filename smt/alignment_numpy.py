@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+from typing import Set, Tuple
+
+import numpy as np
+
+from .alignment import PRIOR_FLOOR, PRIOR_MIN, AlignmentLinks, AlignmentPrior, EMStats
+from .vocab import PUNCT, TokenInput, Vocab, as_ids, as_tokens
+
+
+def _init_translation_array(
+    src_punct: np.ndarray,
+    tgt_punct: np.ndarray,
+    src_codes: np.ndarray,
+    tgt_codes: np.ndarray,
+) -> np.ndarray:
+    src_n = max(1, len(src_punct))
+    tgt_n = max(1, len(tgt_punct))
+    pos_src = (np.arange(len(src_punct), dtype=np.float64) + 1) / (src_n + 1)
+    pos_tgt = (np.arange(len(tgt_punct), dtype=np.float64) + 1) / (tgt_n + 1)
+    pos_prior = np.exp(-8.0 * np.abs(pos_src[:, None] - pos_tgt[None, :]))
+
+    # Shared punctuation codes stand in for string equality; they only matter where a side is punctuation.
+    exact = src_codes[:, None] == tgt_codes[None, :]
+    any_punct = src_punct[:, None] | tgt_punct[None, :]
+    punct_match = np.where(any_punct, np.where(exact, 4.0, 0.05), 1.0)
+    return (0.15 + pos_prior) * punct_match
+
+
+def _encoded_table(
+    source_tokens: TokenInput,
+    target_tokens: TokenInput,
+    lexical_model,
+    source_vocab: Vocab | None,
+    target_vocab: Vocab | None,
+    prior: AlignmentPrior | None = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    if prior is not None:
+        source_vocab, target_vocab = prior.check_vocabs(source_vocab, target_vocab)
+    src_ids, source_vocab = as_ids(source_tokens, source_vocab)
+    tgt_ids, target_vocab = as_ids(target_tokens, target_vocab)
+    src_punct = source_vocab.has_flag(src_ids, PUNCT)
+    tgt_punct = target_vocab.has_flag(tgt_ids, PUNCT)
+    src_codes = source_vocab.punct_codes(src_ids)
+    tgt_codes = target_vocab.punct_codes(tgt_ids)
+    table = _init_translation_array(src_punct, tgt_punct, src_codes, tgt_codes)
+    if lexical_model is not None:
+        weights = lexical_model.score_matrix(
+            as_tokens(source_tokens, source_vocab),
+            as_tokens(target_tokens, target_vocab),
+        )
+        table *= np.asarray(weights, dtype=np.float64)
+    if prior is not None:
+        table *= np.asarray(prior.matrix(src_ids.tolist(), tgt_ids.tolist()), dtype=np.float64).reshape(table.shape)
+    return table, src_ids, tgt_ids, src_punct, tgt_punct, src_codes, tgt_codes
+
+
+def _update_prior(prior: AlignmentPrior | None, src_ids: np.ndarray, tgt_ids: np.ndarray, table: np.ndarray) -> None:
+    if prior is None:
+        return
+    rows, cols = np.nonzero(table >= PRIOR_MIN)
+    prior.update(src_ids.tolist(), tgt_ids.tolist(), zip(rows.tolist(), cols.tolist(), table[rows, cols].tolist()))
+
+
+def _safe_divide(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    out = np.zeros_like(num)
+    np.divide(num, den, out=out, where=np.broadcast_to(den > 0, num.shape))
+    return out
+
+
+def em_directional_table(
+    source_tokens: TokenInput,
+    target_tokens: TokenInput,
+    iterations: int = 8,
+    lexical_model=None,
+    source_vocab: Vocab | None = None,
+    target_vocab: Vocab | None = None,
+    tolerance: float = 0.0,
+    stats: EMStats | None = None,
+) -> np.ndarray:
+    # Sentence-local IBM Model 1 in one direction: returns p(a_j = i) with columns normalized per target token.
+    table = _encoded_table(source_tokens, target_tokens, lexical_model, source_vocab, target_vocab)[0]
+
+    done = 0
+    converged = False
+    max_delta = 0.0
+    log_likelihood = 0.0
+    for _ in range(max(1, iterations)):
+        z = table.sum(axis=0)
+        log_likelihood = float(np.log(z[z > 0]).sum())
+        count = _safe_divide(table, z[None, :])
+        new_table = np.maximum(1e-12, _safe_divide(count, count.sum(axis=1)[:, None]))
+        max_delta = float(np.abs(new_table - table).max())
+        table = new_table
+        done += 1
+        if tolerance > 0 and max_delta < tolerance:
+            converged = True
+            break
+    if stats is not None:
+        stats.record(done, converged, max_delta, log_likelihood)
+    return _safe_divide(table, table.sum(axis=0)[None, :])
+
+
+def em_word_align_numpy(
+    source_tokens: TokenInput,
+    target_tokens: TokenInput,
+    iterations: int = 8,
+    lexical_model=None,
+    source_vocab: Vocab | None = None,
+    target_vocab: Vocab | None = None,
+    tolerance: float = 0.0,
+    prior: AlignmentPrior | None = None,
+    stats: EMStats | None = None,
+    band: int = 0,
+) -> AlignmentLinks:
+    if len(source_tokens) == 0 or len(target_tokens) == 0:
+        return AlignmentLinks()
+    if band > 0 and 2 * band + 1 < len(target_tokens):
+        return _em_word_align_banded(
+            source_tokens, target_tokens, iterations, lexical_model, source_vocab, target_vocab, tolerance, prior, stats, band
+        )
+
+    table, src_ids, tgt_ids, src_punct, tgt_punct, src_codes, tgt_codes = _encoded_table(
+        source_tokens, target_tokens, lexical_model, source_vocab, target_vocab, prior
+    )
+    src_n = len(src_punct)
+
+    done = 0
+    converged = False
+    max_delta = 0.0
+    log_likelihood = 0.0
+    for _ in range(max(1, iterations)):
+        z = table.sum(axis=0)
+        log_likelihood = float(np.log(z[z > 0]).sum())
+        count = _safe_divide(table, z[None, :])
+        total_s = count.sum(axis=1)
+        total_t = count.sum(axis=0)
+
+        # Agreement-style update: source-normalized * target-normalized.
+        p_t_given_s = _safe_divide(count, total_s[:, None])
+        p_s_given_t = _safe_divide(count, total_t[None, :])
+        new_table = np.maximum(1e-12, p_t_given_s * p_s_given_t)
+        max_delta = float(np.abs(new_table - table).max())
+        table = new_table
+        done += 1
+        if tolerance > 0 and max_delta < tolerance:
+            converged = True
+            break
+
+    if stats is not None:
+        stats.record(done, converged, max_delta, log_likelihood)
+    _update_prior(prior, src_ids, tgt_ids, table)
+
+    # Enforce punctuation-only matching.
+    candidates = np.where(src_punct[:, None], tgt_punct[None, :], ~tgt_punct[None, :])
+    has_candidate = candidates.any(axis=1)
+    masked = np.where(candidates, table, -np.inf)
+    best_ti = masked.argmax(axis=1)
+    best_score = masked[np.arange(src_n), best_ti]
+
+    # Keep strong secondary links for one-to-many mappings.
+    ratio = _safe_divide(table, best_score[:, None])
+    keep = candidates & (ratio >= 0.92) & (best_score[:, None] > 0)
+    keep[np.arange(src_n), best_ti] = True
+    keep &= has_candidate[:, None]
+
+    raw_links: Set[Tuple[int, int]] = set(zip(*(idx.tolist() for idx in np.nonzero(keep))))
+
+    _link_exact_punctuation(raw_links, src_punct, tgt_punct, src_codes, tgt_codes)
+    return AlignmentLinks.from_pairs(raw_links)
+
+
+def _link_exact_punctuation(
+    raw_links: Set[Tuple[int, int]],
+    src_punct: np.ndarray,
+    tgt_punct: np.ndarray,
+    src_codes: np.ndarray,
+    tgt_codes: np.ndarray,
+) -> None:
+    # Ensure punctuation marks with exact match are linked when possible.
+    used_targets = {ti for _, ti in raw_links}
+    punct_targets = np.flatnonzero(tgt_punct).tolist()
+    tgt_code_list = tgt_codes.tolist()
+    for si in np.flatnonzero(src_punct).tolist():
+        code = int(src_codes[si])
+        exact = [ti for ti in punct_targets if tgt_code_list[ti] == code and ti not in used_targets]
+        if exact:
+            closest = min(exact, key=lambda ti: abs(ti - si))
+            raw_links.add((si, closest))
+            used_targets.add(closest)
+
+
+def _band_columns(src_n: int, tgt_n: int, window: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # (src_n, 2*window+1) target column per band cell, centred like alignment.band_bounds, plus
+    # validity and each row's (unclipped) first column.
+    first = np.rint((np.arange(src_n) + 1) * (tgt_n + 1) / (src_n + 1)).astype(np.int64) - 1 - window
+    cols = first[:, None] + np.arange(2 * window + 1)[None, :]
+    valid = (cols >= 0) & (cols < tgt_n)
+    return np.clip(cols, 0, tgt_n - 1), valid, first
+
+
+def _em_word_align_banded(
+    source_tokens: TokenInput,
+    target_tokens: TokenInput,
+    iterations: int,
+    lexical_model,
+    source_vocab: Vocab | None,
+    target_vocab: Vocab | None,
+    tolerance: float,
+    prior: AlignmentPrior | None,
+    stats: EMStats | None,
+    band: int,
+) -> AlignmentLinks:
+    # Same model as em_word_align_numpy, but the table is (n, 2*band+1) around the diagonal, so long
+    # sentences cost O(n*band) time and memory. Per-target sums are scattered with bincount.
+    if prior is not None:
+        source_vocab, target_vocab = prior.check_vocabs(source_vocab, target_vocab)
+    src_ids, source_vocab = as_ids(source_tokens, source_vocab)
+    tgt_ids, target_vocab = as_ids(target_tokens, target_vocab)
+    src_n = len(src_ids)
+    tgt_n = len(tgt_ids)
+    src_punct = source_vocab.has_flag(src_ids, PUNCT)
+    tgt_punct = target_vocab.has_flag(tgt_ids, PUNCT)
+    src_codes = source_vocab.punct_codes(src_ids)
+    tgt_codes = target_vocab.punct_codes(tgt_ids)
+    cols, valid, first = _band_columns(src_n, tgt_n, band)
+    flat_cols = cols[valid]
+
+    pos_src = (np.arange(src_n, dtype=np.float64) + 1) / (src_n + 1)
+    pos_tgt = (np.arange(tgt_n, dtype=np.float64) + 1) / (tgt_n + 1)
+    pos_prior = np.exp(-8.0 * np.abs(pos_src[:, None] - pos_tgt[cols]))
+    exact = src_codes[:, None] == tgt_codes[cols]
+    any_punct = src_punct[:, None] | tgt_punct[cols]
+    table = (0.15 + pos_prior) * np.where(any_punct, np.where(exact, 4.0, 0.05), 1.0)
+    if lexical_model is not None:
+        rows = np.nonzero(valid)[0]
+        table[valid] *= lexical_model.score_cells(
+            as_tokens(source_tokens, source_vocab),
+            as_tokens(target_tokens, target_vocab),
+            zip(rows.tolist(), flat_cols.tolist()),
+        )
+    if prior is not None:
+        boost = np.full(table.shape, PRIOR_FLOOR)
+        first_list = first.tolist()
+        for si, ti, weight in prior.entries(src_ids.tolist(), tgt_ids.tolist()):
+            k = ti - first_list[si]
+            if 0 <= k < boost.shape[1]:
+                boost[si, k] = PRIOR_FLOOR + weight
+        table *= boost
+    table[~valid] = 0.0
+
+    done = 0
+    converged = False
+    max_delta = 0.0
+    log_likelihood = 0.0
+    for _ in range(max(1, iterations)):
+        z = np.bincount(flat_cols, weights=table[valid], minlength=tgt_n)
+        log_likelihood = float(np.log(z[z > 0]).sum())
+        count = _safe_divide(table, z[cols])
+        total_s = count.sum(axis=1)
+        total_t = np.bincount(flat_cols, weights=count[valid], minlength=tgt_n)
+
+        # Agreement-style update: source-normalized * target-normalized.
+        p_t_given_s = _safe_divide(count, total_s[:, None])
+        p_s_given_t = _safe_divide(count, total_t[cols])
+        new_table = np.where(valid, np.maximum(1e-12, p_t_given_s * p_s_given_t), 0.0)
+        max_delta = float(np.abs(new_table - table).max())
+        table = new_table
+        done += 1
+        if tolerance > 0 and max_delta < tolerance:
+            converged = True
+            break
+
+    if stats is not None:
+        stats.record(done, converged, max_delta, log_likelihood)
+    if prior is not None:
+        rows, ks = np.nonzero(valid & (table >= PRIOR_MIN))
+        prior.update(src_ids.tolist(), tgt_ids.tolist(), zip(rows.tolist(), cols[rows, ks].tolist(), table[rows, ks].tolist()))
+
+    # Enforce punctuation-only matching, within the band.
+    candidates = valid & np.where(src_punct[:, None], tgt_punct[cols], ~tgt_punct[cols])
+    has_candidate = candidates.any(axis=1)
+    masked = np.where(candidates, table, -np.inf)
+    best_k = masked.argmax(axis=1)
+    best_score = masked[np.arange(src_n), best_k]
+
+    # Keep strong secondary links for one-to-many mappings.
+    ratio = _safe_divide(table, best_score[:, None])
+    keep = candidates & (ratio >= 0.92) & (best_score[:, None] > 0)
+    keep[np.arange(src_n), best_k] = True
+    keep &= has_candidate[:, None]
+
+    rows, ks = np.nonzero(keep)
+    raw_links: Set[Tuple[int, int]] = set(zip(rows.tolist(), cols[rows, ks].tolist()))
+    _link_exact_punctuation(raw_links, src_punct, tgt_punct, src_codes, tgt_codes)
+    return AlignmentLinks.from_pairs(raw_links)
@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from .config import AppConfig
+
+# (model, source language, target language, normalized text). The model names what produced the
+# translation, so switching backends or models never serves the previous one's output.
+CacheKey = Tuple[str, str, str, str]
+
+
+def normalize_cache_text(text: str) -> str:
+    return " ".join(text.strip().split())
+
+
+def make_cache_key(model: str, source_language: str, target_language: str, text: str) -> CacheKey:
+    return (model, source_language.lower(), target_language.lower(), normalize_cache_text(text))
+
+
+def translation_model(translator, target_language: str) -> str:
+    # The backend name, or the translator's own model_id() where it has one (offline backends add the
+    # model file they loaded).
+    model_id = getattr(translator, "model_id", None)
+    return model_id(target_language) if model_id is not None else translator.backend
+
+
+def file_version(path: Path) -> str:
+    # Identifies a model file as loaded: rebuilding it in place changes the mtime and so the cache keys.
+    return f"{path}@{path.stat().st_mtime_ns}"
+
+
+@dataclass
+class CacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    def as_dict(self) -> dict:
+        payload = asdict(self)
+        lookups = self.hits + self.misses
+        payload["hits"] = self.hits
+        payload["hit_ratio"] = round(self.hits / lookups, 4) if lookups else 0.0
+        return payload
+
+
+class LRUCache:
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 3600.0) -> None:
+        self.max_size = max(1, max_size)
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[CacheKey, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.ttl_seconds > 0 and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._data[key]
+                self.evictions += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: CacheKey, value: str) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteTranslationStore:
+    # One connection per thread; WAL mode lets several worker processes share the file. Expired rows
+    # and, beyond `max_rows`, the oldest ones are deleted on open and every `prune_every` writes, so the
+    # file stays bounded (give or take one prune interval) however long the deployment runs.
+    def __init__(self, path: Path, ttl_seconds: float = 0.0, max_rows: int = 0, prune_every: int = 1000) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_rows = max(0, max_rows)
+        self.prune_every = max(1, prune_every)
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        self._local = threading.local()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connection()
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(translations)")]
+        if columns and "model" not in columns:
+            # Rows from before keys named their model cannot be attributed to one; start afresh.
+            conn.execute("DROP TABLE translations")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " model TEXT NOT NULL,"
+            " source_language TEXT NOT NULL,"
+            " target_language TEXT NOT NULL,"
+            " source_text TEXT NOT NULL,"
+            " translation TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (model, source_language, target_language, source_text))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS translations_created_at ON translations (created_at)")
+        conn.commit()
+        self.prune()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Per thread and per process: a connection inherited from a pre-fork master is never reused.
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(str(self.path), timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT translation, created_at FROM translations"
+            " WHERE model = ? AND source_language = ? AND target_language = ? AND source_text = ?",
+            key,
+        ).fetchone()
+        if row is None:
+            return None
+        translation, created_at = row
+        if self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds:
+            return None
+        return translation
+
+    def put(self, key: CacheKey, value: str) -> None:
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO translations"
+            " (model, source_language, target_language, source_text, translation, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (*key, value, time.time()),
+        )
+        conn.commit()
+        self._wrote(1)
+
+    def put_many(self, rows: Iterator[Tuple[CacheKey, str]]) -> int:
+        conn = self._connection()
+        now = time.time()
+        cur = conn.executemany(
+            "INSERT OR REPLACE INTO translations"
+            " (model, source_language, target_language, source_text, translation, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            ((*key, value, now) for key, value in rows),
+        )
+        conn.commit()
+        self._wrote(cur.rowcount)
+        return cur.rowcount
+
+    def _wrote(self, count: int) -> None:
+        with self._writes_lock:
+            self._writes += count
+            due = self._writes >= self.prune_every
+            if due:
+                self._writes = 0
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        # Deletes expired rows, then the oldest rows over `max_rows`; returns the number deleted.
+        conn = self._connection()
+        deleted = 0
+        if self.ttl_seconds > 0:
+            deleted += conn.execute(
+                "DELETE FROM translations WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+        if self.max_rows > 0:
+            excess = len(self) - self.max_rows
+            if excess > 0:
+                deleted += conn.execute(
+                    "DELETE FROM translations WHERE rowid IN"
+                    " (SELECT rowid FROM translations ORDER BY created_at, rowid LIMIT ?)",
+                    (excess,),
+                ).rowcount
+        conn.commit()
+        return deleted
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+
+class TranslationCache:
+    def __init__(self, memory: LRUCache, disk: Optional[SQLiteTranslationStore] = None) -> None:
+        self.memory = memory
+        self.disk = disk
+        self._stats = CacheStats()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def from_config(cfg: AppConfig) -> "TranslationCache":
+        disk = (
+            SQLiteTranslationStore(cfg.cache_path, ttl_seconds=cfg.cache_disk_ttl, max_rows=cfg.cache_disk_max_rows)
+            if cfg.cache_disk
+            else None
+        )
+        return TranslationCache(LRUCache(cfg.cache_size, cfg.cache_ttl), disk)
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.put(key, value)
+                self._count("disk_hits")
+                return value
+        self._count("misses")
+        return None
+
+    def put(self, key: CacheKey, value: str) -> None:
+        self.memory.put(key, value)
+        if self.disk is not None:
+            self.disk.put(key, value)
+        self._count("stores")
+
+    def warm_from_file(self, path: Path, model: str, source_language: str, target_language: str) -> int:
+        # Accepts "source<TAB>translation" or "source ||| translation" lines.
+        def rows() -> Iterator[Tuple[CacheKey, str]]:
+            with path.open("r", encoding="utf-8") as fh:
+                for line in fh:
+                    sep = "\t" if "\t" in line else "|||"
+                    if sep not in line:
+                        continue
+                    src, tgt = line.split(sep, 1)
+                    src, tgt = src.strip(), tgt.strip()
+                    if src and tgt:
+                        key = make_cache_key(model, source_language, target_language, src)
+                        self.memory.put(key, tgt)
+                        yield key, tgt
+
+        if self.disk is not None:
+            return self.disk.put_many(rows())
+        return sum(1 for _ in rows())
+
+    def _count(self, field_name: str) -> None:
+        with self._lock:
+            setattr(self._stats, field_name, getattr(self._stats, field_name) + 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._stats.evictions = self.memory.evictions
+            payload = self._stats.as_dict()
+        payload["memory_entries"] = len(self.memory)
+        return payload
+
+
+class CachedSentenceTranslator:
+    def __init__(self, translator, cache: TranslationCache) -> None:
+        self.translator = translator
+        self.cache = cache
+        self.source_language = translator.source_language
+
+    @property
+    def backend(self) -> str:
+        return self.translator.backend
+
+    def model_id(self, target_language: str) -> str:
+        return translation_model(self.translator, target_language)
+
+    def translate(self, sentence: str, target_language: str) -> str:
+        key = make_cache_key(self.model_id(target_language), self.source_language, target_language, sentence)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        translated = self.translator.translate(sentence, target_language)
+        self.cache.put(key, translated)
+        return translated
+
+
+def main(argv: list[str] | None = None) -> None:
+    cfg = AppConfig.from_env()
+    parser = argparse.ArgumentParser(description="Manage the persistent translation cache.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    warm = sub.add_parser("warm", help="Pre-load translations from a TSV or 'src ||| tgt' file.")
+    warm.add_argument("path", type=Path)
+    warm.add_argument("--target-language", required=True)
+    warm.add_argument("--source-language", default=cfg.source_language)
+    warm.add_argument("--model", default=None, help="Model the entries belong to; defaults to SMT_TRANSLATION_BACKEND's.")
+    sub.add_parser("stats", help="Show the number of entries in the on-disk store.")
+    args = parser.parse_args(argv)
+
+    store = SQLiteTranslationStore(cfg.cache_path, ttl_seconds=cfg.cache_disk_ttl, max_rows=cfg.cache_disk_max_rows)
+    if args.command == "warm":
+        lang = args.target_language.lower()
+        model = args.model
+        if model is None:
+            # Entries are keyed to the configured backend's current model, as the app would look them up.
+            from .engine import build_sentence_translator
+
+            model = translation_model(build_sentence_translator(cfg), lang)
+        cache = TranslationCache(LRUCache(cfg.cache_size, cfg.cache_ttl), store)
+        loaded = cache.warm_from_file(args.path, model, args.source_language.lower(), lang)
+        print(f"Loaded {loaded} translations for {model} into {cfg.cache_path}")
+    else:
+        print(f"{len(store)} translations in {cfg.cache_path}")
+
+
+if __name__ == "__main__":
+    main()
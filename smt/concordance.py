@@ -0,0 +1,386 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import threading
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .alignment import AlignmentLinks, extract_phrase_pairs_fast, phrase_based_projection
+from .config import AppConfig
+from .ibm_model import read_parallel_corpus
+from .tokenize import detokenize
+from .vocab import Vocab
+
+# Links buffered before a sorted posting run is spilled to disk; bounds the builder's memory.
+DEFAULT_CHUNK_LINKS = 4_000_000
+
+# File name -> dtype of every raw array in an index directory.
+_ARRAYS = {
+    "src_tokens": np.int32,
+    "src_offsets": np.int64,
+    "tgt_tokens": np.int32,
+    "tgt_offsets": np.int64,
+    "link_src": np.int32,
+    "link_tgt": np.int32,
+    "link_offsets": np.int64,
+    "pair_keys": np.uint64,
+    "pair_links": np.int64,
+    "pair_offsets": np.int64,
+    "postings": np.int32,
+    "rev_keys": np.uint64,
+    "rev_order": np.int64,
+}
+
+
+class ConcordanceError(RuntimeError):
+    pass
+
+
+def _pair_key(src_id: int, tgt_id: int) -> int:
+    return (src_id << 32) | tgt_id
+
+
+def _parse_links(line: str, src_n: int, tgt_n: int) -> List[Tuple[int, int]]:
+    links = []
+    for item in line.split():
+        si, _, ti = item.partition("-")
+        si_i, ti_i = int(si), int(ti)
+        if si_i < src_n and ti_i < tgt_n:
+            links.append((si_i, ti_i))
+    return sorted(set(links))
+
+
+# Offset array -> the array it indexes; each gets the running length appended after every sentence.
+_OFFSETS = {"src_offsets": "src_tokens", "tgt_offsets": "tgt_tokens", "link_offsets": "link_src"}
+
+
+class _Writer:
+    # Appends raw native-endian values to `<dir>/<name>`, buffered so small per-sentence writes stay cheap.
+    def __init__(self, out_dir: Path, name: str) -> None:
+        self.dtype = _ARRAYS[name]
+        self.fh = (out_dir / name).open("wb")
+        self.buffer = bytearray()
+        self.count = 0
+
+    def write(self, values) -> None:
+        data = np.asarray(values, dtype=self.dtype)
+        self.buffer += data.tobytes()
+        self.count += len(data)
+        if len(self.buffer) >= 1 << 22:
+            self.flush()
+
+    def flush(self) -> None:
+        self.fh.write(self.buffer)
+        self.buffer = bytearray()
+
+    def close(self) -> None:
+        self.flush()
+        self.fh.close()
+
+
+def _spill_run(run_dir: Path, runs: List[Path], keys: array, sents: array) -> None:
+    # One sorted run: link counts per pair plus the pair's distinct sentences, in sentence order.
+    k = np.frombuffer(keys, dtype=np.uint64)
+    s = np.frombuffer(sents, dtype=np.int32)
+    order = np.lexsort((s, k))
+    k, s = k[order], s[order]
+    unique_keys, link_counts = np.unique(k, return_counts=True)
+    keep = np.ones(len(k), dtype=bool)
+    keep[1:] = (k[1:] != k[:-1]) | (s[1:] != s[:-1])
+    path = run_dir / f"run{len(runs):05d}.npz"
+    np.savez(path, keys=k[keep], sents=s[keep], unique_keys=unique_keys, link_counts=link_counts)
+    runs.append(path)
+
+
+def _merge_runs(out_dir: Path, runs: List[Path]) -> int:
+    # Every run covers later sentences than the one before, so a pair's posting list is the
+    # concatenation of its per-run lists; each run is scattered straight into place.
+    loaded = [np.load(path) for path in runs]
+    keys = np.unique(np.concatenate([run["unique_keys"] for run in loaded] or [np.zeros(0, np.uint64)]))
+    pair_links = np.zeros(len(keys), dtype=np.int64)
+    pair_sents = np.zeros(len(keys), dtype=np.int64)
+    for run in loaded:
+        pair_links[np.searchsorted(keys, run["unique_keys"])] += run["link_counts"]
+        pair_sents += np.bincount(np.searchsorted(keys, run["keys"]), minlength=len(keys))
+    offsets = np.concatenate([[0], np.cumsum(pair_sents)]).astype(np.int64)
+
+    total = int(offsets[-1])
+    postings_path = out_dir / "postings"
+    if total:
+        postings = np.memmap(postings_path, dtype=np.int32, mode="w+", shape=(total,))
+        cursor = offsets[:-1].copy()
+        for run in loaded:
+            run_keys = run["keys"]
+            idx = np.searchsorted(keys, run_keys)
+            rank = np.arange(len(run_keys)) - np.searchsorted(run_keys, run_keys, side="left")
+            postings[cursor[idx] + rank] = run["sents"]
+            cursor += np.bincount(idx, minlength=len(keys))
+        postings.flush()
+        del postings
+    else:
+        postings_path.write_bytes(b"")
+
+    # Target-major copy of the keys, to list the source words aligned to a target word.
+    rev = ((keys & np.uint64(0xFFFFFFFF)) << np.uint64(32)) | (keys >> np.uint64(32))
+    rev_order = np.argsort(rev, kind="stable")
+    for name, values in (
+        ("pair_keys", keys),
+        ("pair_links", pair_links),
+        ("pair_offsets", offsets),
+        ("rev_keys", rev[rev_order]),
+        ("rev_order", rev_order),
+    ):
+        values.astype(_ARRAYS[name]).tofile(out_dir / name)
+    return len(keys)
+
+
+def build_concordance(
+    corpus_path: Path,
+    alignment_path: Path,
+    out_dir: Path,
+    source_language: str,
+    target_language: str,
+    chunk_links: int = DEFAULT_CHUNK_LINKS,
+) -> dict:
+    # Streams the corpus once; memory is bounded by the vocabularies, one run of `chunk_links` links
+    # and the per-pair arrays of the final merge.
+    tmp_dir = out_dir.with_name(out_dir.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    run_dir = tmp_dir / "runs"
+    run_dir.mkdir(parents=True)
+
+    src_vocab, tgt_vocab = Vocab(), Vocab()
+    writers = {name: _Writer(tmp_dir, name) for name in ("src_tokens", "tgt_tokens", "link_src", "link_tgt")}
+    offsets = {name: _Writer(tmp_dir, name) for name in _OFFSETS}
+    for writer in offsets.values():
+        writer.write([0])
+    runs: List[Path] = []
+    keys, sents = array("Q"), array("i")
+    sentences = 0
+    try:
+        with alignment_path.open("r", encoding="utf-8") as align_fh:
+            for (src_tokens, tgt_tokens), line in zip(read_parallel_corpus(corpus_path, keep_empty=True), align_fh):
+                src_ids = src_vocab.encode(src_tokens)
+                tgt_ids = tgt_vocab.encode(tgt_tokens)
+                links = _parse_links(line, len(src_tokens), len(tgt_tokens))
+                writers["src_tokens"].write(src_ids)
+                writers["tgt_tokens"].write(tgt_ids)
+                writers["link_src"].write([si for si, _ in links])
+                writers["link_tgt"].write([ti for _, ti in links])
+                for name, indexed in _OFFSETS.items():
+                    offsets[name].write([writers[indexed].count])
+                for si, ti in links:
+                    keys.append(_pair_key(int(src_ids[si]), int(tgt_ids[ti])))
+                    sents.append(sentences)
+                sentences += 1
+                if len(keys) >= chunk_links:
+                    _spill_run(run_dir, runs, keys, sents)
+                    keys, sents = array("Q"), array("i")
+        if keys:
+            _spill_run(run_dir, runs, keys, sents)
+    finally:
+        for writer in (*writers.values(), *offsets.values()):
+            writer.close()
+
+    if not sentences:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise ConcordanceError(f"No sentences in {corpus_path}")
+    pairs = _merge_runs(tmp_dir, runs)
+    shutil.rmtree(run_dir)
+    for name, vocab in (("src.vocab", src_vocab), ("tgt.vocab", tgt_vocab)):
+        (tmp_dir / name).write_text("".join(token + "\n" for token in vocab.tokens), encoding="utf-8")
+    stats = {
+        "source_language": source_language,
+        "target_language": target_language,
+        "sentences": sentences,
+        "links": writers["link_src"].count,
+        "pairs": pairs,
+    }
+    (tmp_dir / "meta.json").write_text(json.dumps(stats), encoding="utf-8")
+
+    if out_dir.exists():
+        old = out_dir.with_name(out_dir.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(out_dir, old)
+        os.replace(tmp_dir, out_dir)
+        shutil.rmtree(old, ignore_errors=True)
+    else:
+        os.replace(tmp_dir, out_dir)
+    return stats
+
+
+def _map(path: Path, dtype) -> np.ndarray:
+    if path.stat().st_size == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+class ConcordanceIndex:
+    # Read-only, memory-mapped view of a built index. Only the vocabularies are held in memory;
+    # every query is a binary search over the pair keys plus slices of the mapped arrays.
+    def __init__(self, index_dir: Path) -> None:
+        self.index_dir = index_dir
+        self.meta = json.loads((index_dir / "meta.json").read_text(encoding="utf-8"))
+        self.arrays = {name: _map(index_dir / name, dtype) for name, dtype in _ARRAYS.items()}
+        self.src_words = (index_dir / "src.vocab").read_text(encoding="utf-8").split("\n")[:-1]
+        self.tgt_words = (index_dir / "tgt.vocab").read_text(encoding="utf-8").split("\n")[:-1]
+        self.src_ids = {word: i for i, word in enumerate(self.src_words)}
+        self.tgt_ids = {word: i for i, word in enumerate(self.tgt_words)}
+
+    def __len__(self) -> int:
+        return int(self.meta["sentences"])
+
+    def _range(self, keys: np.ndarray, word_id: int) -> Tuple[int, int]:
+        lo = int(np.searchsorted(keys, np.uint64(word_id << 32), side="left"))
+        hi = int(np.searchsorted(keys, np.uint64((word_id + 1) << 32), side="left"))
+        return lo, hi
+
+    def _ranked(self, pair_idx: np.ndarray, limit: int, words: List[str], shift: int) -> List[dict]:
+        links = self.arrays["pair_links"][pair_idx]
+        offsets = self.arrays["pair_offsets"]
+        keys = self.arrays["pair_keys"]
+        top = pair_idx[np.argsort(-links, kind="stable")[:limit]]
+        return [
+            {
+                "word": words[int((keys[p] >> np.uint64(shift)) & np.uint64(0xFFFFFFFF))],
+                "links": int(self.arrays["pair_links"][p]),
+                "sentences": int(offsets[p + 1] - offsets[p]),
+            }
+            for p in top.tolist()
+        ]
+
+    def top_targets(self, source_word: str, limit: int = 20) -> List[dict]:
+        src_id = self.src_ids.get(source_word.lower())
+        if src_id is None:
+            return []
+        lo, hi = self._range(self.arrays["pair_keys"], src_id)
+        return self._ranked(np.arange(lo, hi), limit, self.tgt_words, 0)
+
+    def top_sources(self, target_word: str, limit: int = 20) -> List[dict]:
+        tgt_id = self.tgt_ids.get(target_word.lower())
+        if tgt_id is None:
+            return []
+        lo, hi = self._range(self.arrays["rev_keys"], tgt_id)
+        return self._ranked(np.asarray(self.arrays["rev_order"][lo:hi]), limit, self.src_words, 32)
+
+    def pair_sentences(self, source_word: str, target_word: str, offset: int = 0, limit: int = 20) -> Tuple[int, List[int]]:
+        # (number of sentences with the link, sentence IDs of the requested page).
+        src_id = self.src_ids.get(source_word.lower())
+        tgt_id = self.tgt_ids.get(target_word.lower())
+        if src_id is None or tgt_id is None:
+            return 0, []
+        keys = self.arrays["pair_keys"]
+        key = np.uint64(_pair_key(src_id, tgt_id))
+        idx = int(np.searchsorted(keys, key))
+        if idx >= len(keys) or keys[idx] != key:
+            return 0, []
+        start, end = (int(x) for x in self.arrays["pair_offsets"][idx : idx + 2])
+        page = self.arrays["postings"][start + max(0, offset) : min(end, start + max(0, offset) + limit)]
+        return end - start, page.tolist()
+
+    def sentence(self, index: int) -> Tuple[List[str], List[str], AlignmentLinks]:
+        if not 0 <= index < len(self):
+            raise IndexError(f"Sentence {index} is not in the index")
+        a = self.arrays
+        src = a["src_tokens"][a["src_offsets"][index] : a["src_offsets"][index + 1]]
+        tgt = a["tgt_tokens"][a["tgt_offsets"][index] : a["tgt_offsets"][index + 1]]
+        lo, hi = a["link_offsets"][index], a["link_offsets"][index + 1]
+        links = AlignmentLinks(a["link_src"][lo:hi].tolist(), a["link_tgt"][lo:hi].tolist())
+        return [self.src_words[i] for i in src.tolist()], [self.tgt_words[i] for i in tgt.tolist()], links
+
+    def hit(self, index: int, source_word: str, target_word: str) -> dict:
+        # One sentence with the positions of the queried word pair's links.
+        src, tgt, links = self.sentence(index)
+        source_word, target_word = source_word.lower(), target_word.lower()
+        matched = [(si, ti) for si, ti in links.pairs() if src[si] == source_word and tgt[ti] == target_word]
+        return {
+            "sentence": index,
+            "source_tokens": src,
+            "target_tokens": tgt,
+            "links": [list(p) for p in matched],
+        }
+
+    def sentence_payload(self, index: int) -> dict:
+        # Same keys as build_alignment_payload, so a stored sentence renders in the usual result view.
+        src, tgt, links = self.sentence(index)
+        phrase_pairs = extract_phrase_pairs_fast(src, tgt, links)
+        return {
+            "source_tokens": src,
+            "target_tokens": tgt,
+            "target_text": detokenize(tgt),
+            "alignments": links,
+            "backend": "concordance",
+            "target_language": self.meta["target_language"],
+            "alignment_model": "Stored corpus alignment",
+            "alignment_grid": links.grid(len(src), len(tgt)),
+            "alignment_pairs": links.word_pairs(src, tgt),
+            "giza_alignment": links.to_pharaoh(),
+            "phrase_pairs": phrase_pairs,
+            "phrase_based_translation": phrase_based_projection(src, tgt, links, phrase_pairs),
+        }
+
+
+_INDEXES: Dict[str, Optional[ConcordanceIndex]] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def load_concordance(index_dir: Path) -> ConcordanceIndex | None:
+    # Opened once per process. An index rebuilt in place is picked up when meta.json changes.
+    key = str(index_dir)
+    meta = index_dir / "meta.json"
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is not None and meta.exists() and json.loads(meta.read_text(encoding="utf-8")) == index.meta:
+            return index
+        _INDEXES[key] = ConcordanceIndex(index_dir) if meta.exists() else None
+        return _INDEXES[key]
+
+
+def main(argv: List[str] | None = None) -> None:
+    cfg = AppConfig.from_env()
+    parser = argparse.ArgumentParser(description="Build and query the word-pair concordance of an aligned corpus.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Index a corpus and its Pharaoh alignments (e.g. from smt.corpus_align).")
+    build.add_argument("corpus", type=Path, help="'src ||| tgt' corpus.")
+    build.add_argument("alignment", type=Path, help="Pharaoh 'i-j' alignment file, one line per corpus line.")
+    build.add_argument("--chunk-links", type=int, default=DEFAULT_CHUNK_LINKS, help="Links per sorted run.")
+    query = sub.add_parser("query", help="Top aligned words for one word, or the sentences linking two words.")
+    query.add_argument("source_word", nargs="?", default="")
+    query.add_argument("target_word", nargs="?", default="")
+    query.add_argument("--limit", type=int, default=20)
+    for p in (build, query):
+        p.add_argument("--target-language", required=True)
+        p.add_argument("--source-language", default=cfg.source_language)
+        p.add_argument("--index-dir", type=Path, default=None)
+    args = parser.parse_args(argv)
+
+    lang, src = args.target_language.lower(), args.source_language.lower()
+    index_dir = args.index_dir or cfg.concordance_dir_for(lang, src)
+    if args.command == "build":
+        stats = build_concordance(args.corpus, args.alignment, index_dir, src, lang, chunk_links=max(1, args.chunk_links))
+        print(f"Indexed {stats['links']} links ({stats['pairs']} word pairs) from {stats['sentences']} sentences into {index_dir}")
+        return
+
+    index = load_concordance(index_dir)
+    if index is None:
+        raise SystemExit(f"No concordance index at {index_dir}")
+    if args.source_word and args.target_word:
+        total, ids = index.pair_sentences(args.source_word, args.target_word, limit=args.limit)
+        print(f"{total} sentences")
+        for i in ids:
+            src_tokens, tgt_tokens, _ = index.sentence(i)
+            print(f"{i}\t{' '.join(src_tokens)}\t{' '.join(tgt_tokens)}")
+        return
+    ranked = index.top_targets(args.source_word, args.limit) if args.source_word else index.top_sources(args.target_word, args.limit)
+    for item in ranked:
+        print(f"{item['word']}\t{item['links']}\t{item['sentences']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,13 @@ from dataclasses import dataclass
 from pathlib import Path
 
 
+def _env_flag(name: str, default: bool) -> bool:
+    raw = os.environ.get(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() not in {"0", "false", "no", "off", ""}
+
+
 @dataclass(frozen=True)
 class AppConfig:
     data_dir: Path
@@ -15,6 +22,42 @@ class AppConfig:
     fast_align_path: str | None
     atools_path: str | None
     giza_root: str | None
+    align_engine: str = "numpy"
+    cache_enabled: bool = True
+    cache_size: int = 10000
+    cache_ttl: float = 3600.0
+    cache_disk: bool = True
+    cache_disk_ttl: float = 30 * 24 * 3600.0
+    cache_disk_max_rows: int = 1_000_000
+    batch_workers: int = 1
+    batch_max_items: int = 500
+    io_threads: int = 8
+    fanout_timeout: float = 10.0
+    translation_backend: str = "google"
+    moses_workers: int = 2
+    moses_queue_size: int = 32
+    moses_timeout: float = 30.0
+    moses_restart_backoff: float = 0.5
+    symmetrization: str = "agreement"
+    profile_every: int = 0
+    em_iterations: int = 8
+    em_tolerance: float = 0.0
+    align_band: int = 0
+    document_max_sentences: int = 200
+    coalesce: bool = True
+    decoder_fallback: bool = True
+    backend_url: str = "https://translate.google.com"
+    backend_timeout: float = 5.0
+    backend_retries: int = 2
+    backend_pool_size: int = 4
+    backend_hedge_after: float = 1.0
+    backend_breaker_failures: int = 5
+    backend_breaker_reset: float = 30.0
+    warm_up: bool = False
+    asgi_max_in_flight: int = 64
+    asgi_queue_size: int = 256
+    asgi_queue_timeout: float = 10.0
+    asgi_threads: int = 16
 
     @staticmethod
     def from_env() -> "AppConfig":
@@ -36,6 +79,42 @@ class AppConfig:
             fast_align_path=os.environ.get("FAST_ALIGN_BIN"),
             atools_path=os.environ.get("ATOOLS_BIN"),
             giza_root=os.environ.get("GIZA_ROOT"),
+            align_engine=os.environ.get("SMT_ALIGN_ENGINE", "numpy").strip().lower(),
+            cache_enabled=_env_flag("SMT_CACHE", True),
+            cache_size=int(os.environ.get("SMT_CACHE_SIZE", "10000")),
+            cache_ttl=float(os.environ.get("SMT_CACHE_TTL", "3600")),
+            cache_disk=_env_flag("SMT_CACHE_DISK", True),
+            cache_disk_ttl=float(os.environ.get("SMT_CACHE_DISK_TTL", str(30 * 24 * 3600))),
+            cache_disk_max_rows=int(os.environ.get("SMT_CACHE_DISK_MAX_ROWS", "1000000")),
+            batch_workers=int(os.environ.get("SMT_BATCH_WORKERS", str(os.cpu_count() or 1))),
+            batch_max_items=int(os.environ.get("SMT_BATCH_MAX_ITEMS", "500")),
+            io_threads=int(os.environ.get("SMT_IO_THREADS", "8")),
+            fanout_timeout=float(os.environ.get("SMT_FANOUT_TIMEOUT", "10")),
+            translation_backend=os.environ.get("SMT_TRANSLATION_BACKEND", "google").strip().lower(),
+            moses_workers=int(os.environ.get("SMT_MOSES_WORKERS", "2")),
+            moses_queue_size=int(os.environ.get("SMT_MOSES_QUEUE_SIZE", "32")),
+            moses_timeout=float(os.environ.get("SMT_MOSES_TIMEOUT", "30")),
+            moses_restart_backoff=float(os.environ.get("SMT_MOSES_RESTART_BACKOFF", "0.5")),
+            symmetrization=os.environ.get("SMT_SYMMETRIZATION", "agreement").strip().lower(),
+            profile_every=int(os.environ.get("SMT_PROFILE_EVERY", "0")),
+            em_iterations=int(os.environ.get("SMT_EM_ITERATIONS", "8")),
+            em_tolerance=float(os.environ.get("SMT_EM_TOLERANCE", "0")),
+            align_band=int(os.environ.get("SMT_ALIGN_BAND", "0")),
+            document_max_sentences=int(os.environ.get("SMT_DOCUMENT_MAX_SENTENCES", "200")),
+            coalesce=_env_flag("SMT_COALESCE", True),
+            decoder_fallback=_env_flag("SMT_DECODER_FALLBACK", True),
+            backend_url=os.environ.get("SMT_BACKEND_URL", "https://translate.google.com").strip().rstrip("/"),
+            backend_timeout=float(os.environ.get("SMT_BACKEND_TIMEOUT", "5")),
+            backend_retries=int(os.environ.get("SMT_BACKEND_RETRIES", "2")),
+            backend_pool_size=int(os.environ.get("SMT_BACKEND_POOL_SIZE", "4")),
+            backend_hedge_after=float(os.environ.get("SMT_BACKEND_HEDGE_AFTER", "1")),
+            backend_breaker_failures=int(os.environ.get("SMT_BACKEND_BREAKER_FAILURES", "5")),
+            backend_breaker_reset=float(os.environ.get("SMT_BACKEND_BREAKER_RESET", "30")),
+            warm_up=_env_flag("SMT_WARM_UP", False),
+            asgi_max_in_flight=int(os.environ.get("SMT_ASGI_MAX_IN_FLIGHT", "64")),
+            asgi_queue_size=int(os.environ.get("SMT_ASGI_QUEUE_SIZE", "256")),
+            asgi_queue_timeout=float(os.environ.get("SMT_ASGI_QUEUE_TIMEOUT", "10")),
+            asgi_threads=int(os.environ.get("SMT_ASGI_THREADS", "16")),
         )
 
     def moses_ini_for(self, target_language: str) -> Path:
@@ -43,3 +122,27 @@ class AppConfig:
         if candidate.exists():
             return candidate
         return self.data_dir / "models" / "moses.ini"
+
+    @property
+    def cache_path(self) -> Path:
+        return self.data_dir / "cache" / "translations.sqlite3"
+
+    @property
+    def profile_dir(self) -> Path:
+        return self.data_dir / "profiles"
+
+    def phrase_table_for(self, target_language: str, source_language: str | None = None) -> Path:
+        src = source_language or self.source_language
+        return self.data_dir / "models" / f"phrase-table.{src}-{target_language}.gz"
+
+    def compiled_phrase_table_for(self, target_language: str, source_language: str | None = None) -> Path:
+        src = source_language or self.source_language
+        return self.data_dir / "models" / f"phrase-table.{src}-{target_language}.bin"
+
+    def concordance_dir_for(self, target_language: str, source_language: str | None = None) -> Path:
+        src = source_language or self.source_language
+        return self.data_dir / "concordance" / f"{src}-{target_language}"
+
+    def lexical_model_for(self, target_language: str, source_language: str | None = None) -> Path:
+        src = source_language or self.source_language
+        return self.data_dir / "models" / f"ibm.{src}-{target_language}.npz"
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import ExitStack
+from itertools import islice
+from pathlib import Path
+from typing import Deque, Iterator, List, NamedTuple, TextIO, Tuple
+
+from .config import AppConfig
+from .engine import align_ids, load_lexical_model
+from .tokenize import preprocess_for_alignment
+from .vocab import vocab_for
+
+LinePair = Tuple[str, str]
+
+
+class ChunkJob(NamedTuple):
+    pairs: List[LinePair]
+    source_language: str
+    target_language: str
+    engine: str
+    symmetrization: str
+    model_path: str
+    em_iterations: int
+    em_tolerance: float
+    align_band: int
+
+
+class CorpusAlignError(RuntimeError):
+    pass
+
+
+def iter_line_pairs(corpus: Path | None = None, source: Path | None = None, target: Path | None = None) -> Iterator[LinePair]:
+    # Either one 'src ||| tgt' file or two line-parallel files; unusable lines yield empty sides.
+    if corpus is not None:
+        with corpus.open("r", encoding="utf-8") as fh:
+            for line in fh:
+                src, sep, tgt = line.partition("|||")
+                yield (src, tgt) if sep else ("", "")
+        return
+    if source is None or target is None:
+        raise CorpusAlignError("Pass either a 'src ||| tgt' corpus or both source and target files.")
+    with source.open("r", encoding="utf-8") as src_fh, target.open("r", encoding="utf-8") as tgt_fh:
+        yield from zip(src_fh, tgt_fh)
+        if src_fh.readline() or tgt_fh.readline():
+            raise CorpusAlignError(f"{source} and {target} have different numbers of lines")
+
+
+def align_chunk(job: ChunkJob) -> str:
+    # Runs in a pool worker; vocabularies and the lexical model are loaded once per process.
+    lexical_model = load_lexical_model(Path(job.model_path)) if job.model_path else None
+    iterations = 1 if lexical_model else job.em_iterations
+    src_vocab = vocab_for(job.source_language)
+    tgt_vocab = vocab_for(job.target_language)
+    out: List[str] = []
+    for src, tgt in job.pairs:
+        src_ids = preprocess_for_alignment(src, lowercase=True, vocab=src_vocab)
+        tgt_ids = preprocess_for_alignment(tgt, lowercase=True, vocab=tgt_vocab)
+        if len(src_ids) == 0 or len(tgt_ids) == 0:
+            out.append("\n")
+            continue
+        links = align_ids(
+            src_ids,
+            tgt_ids,
+            src_vocab,
+            tgt_vocab,
+            iterations,
+            job.engine,
+            lexical_model,
+            job.symmetrization,
+            job.em_tolerance,
+            band=job.align_band,
+        )
+        out.append(links.to_pharaoh() + "\n")
+    return "".join(out)
+
+
+def _checkpoint_path(out_path: Path) -> Path:
+    return out_path.with_name(out_path.name + ".ckpt")
+
+
+def _read_checkpoint(out_path: Path) -> Tuple[int, int]:
+    ckpt = _checkpoint_path(out_path)
+    if not ckpt.exists() or not out_path.exists():
+        return 0, 0
+    state = json.loads(ckpt.read_text(encoding="utf-8"))
+    return int(state["lines"]), int(state["bytes"])
+
+
+def _write_checkpoint(out_path: Path, lines: int, size: int) -> None:
+    ckpt = _checkpoint_path(out_path)
+    tmp = ckpt.with_name(ckpt.name + ".tmp")
+    tmp.write_text(json.dumps({"lines": lines, "bytes": size}), encoding="utf-8")
+    os.replace(tmp, ckpt)
+
+
+def _chunks(pairs: Iterator[LinePair], size: int) -> Iterator[List[LinePair]]:
+    while True:
+        chunk = list(islice(pairs, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def align_corpus_stream(
+    pairs: Iterator[LinePair],
+    out_path: Path,
+    source_language: str,
+    target_language: str,
+    engine: str = "numpy",
+    symmetrization: str = "agreement",
+    model_path: Path | None = None,
+    em_iterations: int = 8,
+    em_tolerance: float = 0.0,
+    align_band: int = 0,
+    workers: int = 1,
+    chunk_size: int = 256,
+    resume: bool = False,
+    progress: TextIO | None = None,
+) -> int:
+    # Memory is bounded by the in-flight window (2 chunks per worker), not by corpus size. Output is
+    # fsynced before each checkpoint, so a resumed run truncates to the last complete chunk.
+    done, size = _read_checkpoint(out_path) if resume else (0, 0)
+    if done:
+        pairs = islice(pairs, done, None)
+    model = str(model_path) if model_path is not None else ""
+    written = done
+    started = time.perf_counter()
+
+    with ExitStack() as stack:
+        out = stack.enter_context(out_path.open("r+b" if done else "wb"))
+        out.truncate(size)
+        out.seek(size)
+        executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers)) if workers > 1 else None
+
+        def flush(text: str, count: int) -> None:
+            nonlocal written
+            out.write(text.encode("utf-8"))
+            out.flush()
+            os.fsync(out.fileno())
+            written += count
+            _write_checkpoint(out_path, written, out.tell())
+            if progress is not None:
+                rate = (written - done) / max(1e-9, time.perf_counter() - started)
+                print(f"aligned {written} lines ({rate:.0f}/s)", file=progress, flush=True)
+
+        window: Deque[Tuple[Future, int]] = deque()
+        for chunk in _chunks(pairs, chunk_size):
+            job = ChunkJob(
+                chunk,
+                source_language,
+                target_language,
+                engine,
+                symmetrization,
+                model,
+                em_iterations,
+                em_tolerance,
+                align_band,
+            )
+            if executor is None:
+                flush(align_chunk(job), len(chunk))
+                continue
+            window.append((executor.submit(align_chunk, job), len(chunk)))
+            if len(window) >= 2 * workers:
+                future, count = window.popleft()
+                flush(future.result(), count)
+        while window:
+            future, count = window.popleft()
+            flush(future.result(), count)
+
+    _checkpoint_path(out_path).unlink(missing_ok=True)
+    return written
+
+
+def main(argv: List[str] | None = None) -> int:
+    cfg = AppConfig.from_env()
+    parser = argparse.ArgumentParser(
+        description="Align a parallel corpus with the viewer's EM aligner and write Pharaoh 'i-j' lines."
+    )
+    parser.add_argument("corpus", type=Path, nargs="?", help="'src ||| tgt' corpus.")
+    parser.add_argument("--source", type=Path, help="Source side, one sentence per line (with --target).")
+    parser.add_argument("--target", type=Path, help="Target side, line-parallel to --source.")
+    parser.add_argument("-o", "--output", type=Path, required=True)
+    parser.add_argument("--target-language", required=True)
+    parser.add_argument("--source-language", default=cfg.source_language)
+    parser.add_argument("--engine", default=cfg.align_engine, choices=("numpy", "python"))
+    parser.add_argument("--symmetrization", default=cfg.symmetrization)
+    parser.add_argument("--model", type=Path, default=None, help="Lexical model; defaults to the viewer's one.")
+    parser.add_argument("--iterations", type=int, default=cfg.em_iterations, help="Maximum EM iterations.")
+    parser.add_argument("--tolerance", type=float, default=cfg.em_tolerance, help="Stop EM early below this change.")
+    parser.add_argument("--band", type=int, default=cfg.align_band, help="Diagonal window; 0 aligns the full matrix.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--resume", action="store_true", help="Continue from the output's checkpoint.")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args(argv)
+
+    if (args.corpus is None) == (args.source is None):
+        parser.error("pass either a corpus or --source/--target")
+    if args.source is not None and args.target is None:
+        parser.error("--target is required with --source")
+
+    source_language = args.source_language.lower()
+    target_language = args.target_language.lower()
+    model_path = args.model or cfg.lexical_model_for(target_language, source_language)
+    try:
+        count = align_corpus_stream(
+            iter_line_pairs(args.corpus, args.source, args.target),
+            args.output,
+            source_language,
+            target_language,
+            engine=args.engine,
+            symmetrization=args.symmetrization,
+            model_path=model_path,
+            em_iterations=args.iterations,
+            em_tolerance=args.tolerance,
+            align_band=args.band,
+            workers=args.workers,
+            chunk_size=max(1, args.chunk_size),
+            resume=args.resume,
+            progress=None if args.quiet else sys.stderr,
+        )
+    except (CorpusAlignError, OSError, ValueError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    print(f"Wrote {count} alignments to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
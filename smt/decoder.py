@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import math
+import mmap
+import os
+import sys
+import threading
+from array import array
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .cache import file_version, translation_model
+from .config import AppConfig
+from .metrics import REGISTRY
+from .tokenize import detokenize, preprocess_for_alignment
+
+# Log-linear weights for the four phrase-table features p(s|t) lex(s|t) p(t|s) lex(t|s).
+TM_WEIGHTS = (0.2, 0.2, 0.2, 0.2)
+# Per-phrase cost, so fewer, longer phrases (which carry their own local reordering) are preferred.
+PHRASE_PENALTY = -0.5
+# Unknown words are copied through at this cost.
+UNKNOWN_SCORE = -10.0
+_MIN_PROB = 1e-9
+
+FALLBACKS = REGISTRY.counter(
+    "smt_decoder_fallbacks_total",
+    "Sentences the phrase-table decoder handed to the fallback backend.",
+)
+
+Option = Tuple[Tuple[str, ...], float]
+
+
+class DecoderError(RuntimeError):
+    pass
+
+
+def _phrase_hash(phrase: str) -> int:
+    return int.from_bytes(hashlib.blake2b(phrase.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def phrase_score(features: List[float]) -> float:
+    return sum(w * math.log(max(p, _MIN_PROB)) for w, p in zip(TM_WEIGHTS, features)) + PHRASE_PENALTY
+
+
+def index_path_for(table_path: Path) -> Path:
+    return table_path.with_suffix(".idx")
+
+
+def _read_groups(table_path: Path) -> Iterator[Tuple[str, List[Tuple[str, List[float]]]]]:
+    # Moses-format lines are sorted by source phrase, so each phrase's candidates are contiguous.
+    opener = gzip.open if table_path.suffix == ".gz" else open
+    current: str | None = None
+    group: List[Tuple[str, List[float]]] = []
+    with opener(table_path, "rt", encoding="utf-8") as fh:
+        for line in fh:
+            fields = line.rstrip("\n").split(" ||| ")
+            if len(fields) < 3:
+                continue
+            src, tgt = fields[0].strip(), fields[1].strip()
+            features = [float(x) for x in fields[2].split()[: len(TM_WEIGHTS)]]
+            if src != current:
+                if group:
+                    yield current, group  # type: ignore[misc]
+                current, group = src, []
+            group.append((tgt, features))
+    if group:
+        yield current, group  # type: ignore[misc]
+
+
+def compile_phrase_table(table_path: Path, out_path: Path, table_limit: int = 20) -> dict:
+    # Writes the table as one block per source phrase ("src\n" then "tgt\tscore\n" lines, best first)
+    # plus a (3, n) uint64 index of hash-sorted hashes, offsets and lengths, stored row by row so the
+    # hash row is contiguous for binary search. Both files are memory-mapped at load time.
+    index_path = index_path_for(out_path)
+    tmp_data = out_path.with_name(out_path.name + ".tmp")
+    tmp_index = index_path.with_name(index_path.name + ".tmp")
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Index columns are packed 8 bytes per value as they are written, not kept as Python int tuples.
+    hashes, offsets, lengths = array("Q"), array("Q"), array("Q")
+    previous: str | None = None
+    stats = {"source_phrases": 0, "phrase_pairs": 0, "max_phrase_len": 0}
+    header_size = 256
+    with tmp_data.open("wb") as out:
+        out.write(b" " * header_size)
+        for src, candidates in _read_groups(table_path):
+            # Lines are sorted whole, so "src ||| " prefixes (not the bare phrases: "a b" sorts before
+            # "a" there) strictly increase from group to group; a repeat or step back means unsorted input.
+            key = src + " ||| "
+            if previous is not None and key <= previous:
+                raise DecoderError(f"{table_path} is not sorted by source phrase ('{src}' comes after '{previous[:-5]}')")
+            previous = key
+            scored = sorted(((phrase_score(f), tgt) for tgt, f in candidates), reverse=True)[:table_limit]
+            block = (src + "\n" + "".join(f"{tgt}\t{score:.6g}\n" for score, tgt in scored)).encode("utf-8")
+            hashes.append(_phrase_hash(src))
+            offsets.append(out.tell())
+            lengths.append(len(block))
+            out.write(block)
+            stats["source_phrases"] += 1
+            stats["phrase_pairs"] += len(scored)
+            stats["max_phrase_len"] = max(stats["max_phrase_len"], len(src.split()))
+        if not hashes:
+            raise DecoderError(f"No phrase pairs in {table_path}")
+        header = json.dumps({"max_phrase_len": stats["max_phrase_len"], "source_phrases": len(hashes)})
+        out.seek(0)
+        out.write(header.encode("utf-8").ljust(header_size - 1) + b"\n")
+
+    order = np.argsort(np.frombuffer(hashes, dtype=np.uint64), kind="stable")
+    index = np.empty((3, len(hashes)), dtype=np.uint64)
+    for row, column in enumerate((hashes, offsets, lengths)):
+        index[row] = np.frombuffer(column, dtype=np.uint64)[order]
+    with tmp_index.open("wb") as fh:
+        np.save(fh, index)
+    os.replace(tmp_data, out_path)
+    os.replace(tmp_index, index_path)
+    return stats
+
+
+class IndexedPhraseTable:
+    # Read-only view of a compiled table; lookups are a binary search over the mapped index and a
+    # read of one block, so opening is O(1) and the OS page cache is shared between worker processes.
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._fh = path.open("rb")
+        self.version = file_version(path)
+        self._data = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        meta = json.loads(self._data[: self._data.find(b"\n")].decode("utf-8"))
+        self.max_phrase_len = int(meta["max_phrase_len"])
+        index = np.load(index_path_for(path), mmap_mode="r")
+        self._hashes, self._offsets, self._lengths = index[0], index[1], index[2]
+
+    def lookup_many(self, phrases: List[str]) -> List[List[Option]]:
+        # One vectorized binary search for all phrases of a sentence; blocks are only read on a hash hit.
+        keys = np.array([_phrase_hash(p) for p in phrases], dtype=np.uint64)
+        los = np.searchsorted(self._hashes, keys, side="left").tolist()
+        his = np.searchsorted(self._hashes, keys, side="right").tolist()
+        return [self._read(phrase, lo, hi) for phrase, lo, hi in zip(phrases, los, his)]
+
+    def lookup(self, phrase: str) -> List[Option]:
+        return self.lookup_many([phrase])[0]
+
+    def _read(self, phrase: str, lo: int, hi: int) -> List[Option]:
+        for row in range(lo, hi):
+            start = int(self._offsets[row])
+            lines = self._data[start : start + int(self._lengths[row])].decode("utf-8").splitlines()
+            if lines[0] != phrase:
+                continue
+            options: List[Option] = []
+            for line in lines[1:]:
+                tgt, score = line.rsplit("\t", 1)
+                options.append((tuple(tgt.split()), float(score)))
+            return options
+        return []
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def close(self) -> None:
+        self._data.close()
+        self._fh.close()
+
+
+class PhraseTableDecoder:
+    # Monotone phrase-based decoder. Without a target language model, candidate phrases never
+    # interact, so reordering can only add distortion cost and the best monotone segmentation is
+    # optimal; it is found exactly by dynamic programming in O(n * max_phrase_len) rather than by
+    # a pruned beam search.
+    def __init__(self, table: IndexedPhraseTable) -> None:
+        self.table = table
+
+    def _options(self, tokens: List[str]) -> Dict[Tuple[int, int], Option]:
+        # Best candidate per source span; unknown words are copied through.
+        n = len(tokens)
+        spans = [(i, j) for i in range(n) for j in range(i + 1, min(n, i + self.table.max_phrase_len) + 1)]
+        found = self.table.lookup_many([" ".join(tokens[i:j]) for i, j in spans])
+        options: Dict[Tuple[int, int], Option] = {span: cands[0] for span, cands in zip(spans, found) if cands}
+        for i in range(n):
+            if (i, i + 1) not in options:
+                options[(i, i + 1)] = ((tokens[i],), UNKNOWN_SCORE)
+        return options
+
+    def decode(self, tokens: List[str]) -> List[str]:
+        n = len(tokens)
+        options = self._options(tokens)
+        max_len = max(1, self.table.max_phrase_len)
+        best = [0.0] + [-math.inf] * n
+        back: List[Tuple[int, Tuple[str, ...]]] = [(0, ())] * (n + 1)
+        for j in range(1, n + 1):
+            for i in range(max(0, j - max_len), j):
+                option = options.get((i, j))
+                if option is not None and best[i] + option[1] > best[j]:
+                    best[j] = best[i] + option[1]
+                    back[j] = (i, option[0])
+        out: List[Tuple[str, ...]] = []
+        j = n
+        while j > 0:
+            j, words = back[j]
+            out.append(words)
+        return [word for words in reversed(out) for word in words]
+
+
+class PhraseTableSentenceTranslator:
+    # Offline backend decoding with the compiled per-language phrase table. Languages without a
+    # table go to the fallback backend when one is configured.
+    def __init__(self, cfg: AppConfig, fallback=None) -> None:
+        self.cfg = cfg
+        self.source_language = cfg.source_language
+        self.fallback = fallback
+        self.backend = "phrase-table"
+        self._decoders: Dict[str, Optional[PhraseTableDecoder]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def from_config(cfg: AppConfig) -> "PhraseTableSentenceTranslator":
+        fallback = None
+        if cfg.decoder_fallback:
+            from .library_translate import LibrarySentenceTranslator
+
+            fallback = LibrarySentenceTranslator.from_config(cfg)
+        return PhraseTableSentenceTranslator(cfg, fallback)
+
+    def warm_up(self, target_language: str) -> None:
+        self.decoder_for(target_language)
+
+    def model_id(self, target_language: str) -> str:
+        # The compiled table as loaded; languages without one are answered, and cached, as the fallback.
+        decoder = self.decoder_for(target_language)
+        if decoder is not None:
+            return f"{self.backend}:{decoder.table.version}"
+        if self.fallback is not None:
+            return translation_model(self.fallback, target_language)
+        return self.backend
+
+    def decoder_for(self, target_language: str) -> PhraseTableDecoder | None:
+        with self._lock:
+            if target_language not in self._decoders:
+                path = self.cfg.compiled_phrase_table_for(target_language)
+                decoder = None
+                if path.exists() and index_path_for(path).exists():
+                    decoder = PhraseTableDecoder(IndexedPhraseTable(path))
+                self._decoders[target_language] = decoder
+            return self._decoders[target_language]
+
+    def translate(self, sentence: str, target_language: str) -> str:
+        decoder = self.decoder_for(target_language)
+        if decoder is None:
+            if self.fallback is None:
+                path = self.cfg.compiled_phrase_table_for(target_language)
+                raise DecoderError(f"No compiled phrase table for '{target_language}': {path}")
+            FALLBACKS.inc(target_language=target_language)
+            return self.fallback.translate(sentence, target_language)
+        words = decoder.decode(preprocess_for_alignment(sentence, lowercase=True))
+        if not words:
+            raise DecoderError("Phrase-table decoder returned empty output.")
+        return detokenize(words)
+
+
+def main(argv: List[str] | None = None) -> None:
+    cfg = AppConfig.from_env()
+    parser = argparse.ArgumentParser(description="Compile phrase tables for the offline decoder and decode with them.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    comp = sub.add_parser("compile", help="Index a Moses-format phrase table for memory-mapped lookups.")
+    comp.add_argument("--target-language", required=True)
+    comp.add_argument("--source-language", default=cfg.source_language)
+    comp.add_argument("--table", type=Path, default=None, help="Defaults to the phrase table built by smt.phrase_table.")
+    comp.add_argument("--output", type=Path, default=None)
+    comp.add_argument("--table-limit", type=int, default=20, help="Candidates kept per source phrase.")
+    dec = sub.add_parser("translate", help="Decode sentences given as arguments, or stdin lines.")
+    dec.add_argument("--target-language", required=True)
+    dec.add_argument("sentences", nargs="*")
+    args = parser.parse_args(argv)
+
+    lang = args.target_language.lower()
+    if args.command == "compile":
+        src = args.source_language.lower()
+        table = args.table or cfg.phrase_table_for(lang, src)
+        out = args.output or cfg.compiled_phrase_table_for(lang, src)
+        stats = compile_phrase_table(table, out, table_limit=args.table_limit)
+        print(f"Indexed {stats['phrase_pairs']} phrase pairs for {stats['source_phrases']} source phrases into {out}")
+        return
+
+    translator = PhraseTableSentenceTranslator(cfg)
+    for sentence in args.sentences or (line.rstrip("\n") for line in sys.stdin):
+        print(translator.translate(sentence, lang))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,74 +1,563 @@
 from __future__ import annotations
 
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from pathlib import Path
 from dataclasses import asdict
-from typing import List
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
 
 from .alignment import (
+    AlignmentLinks,
+    AlignmentPrior,
+    EMStats,
     TranslationResult,
     em_word_align,
-    extract_phrase_pairs,
-    matrix_for_viewer,
+    extract_phrase_pairs_fast,
     phrase_based_projection,
 )
+from .cache import CachedSentenceTranslator, TranslationCache, normalize_cache_text
 from .config import AppConfig
 from .library_translate import LibrarySentenceTranslator
-from .tokenize import preprocess_for_alignment
+from .metrics import StageTimer, length_bucket, maybe_stage
+from .singleflight import CoalescingSentenceTranslator, SingleFlight
+from .tokenize import preprocess_for_alignment, split_paragraphs, split_sentences
+from .vocab import Vocab, vocab_for
+
+if TYPE_CHECKING:
+    from .ibm_model import LexicalModel
+
+
+_LEXICAL_MODELS: Dict[str, Optional["LexicalModel"]] = {}
+
+
+def load_lexical_model(path: Path) -> LexicalModel | None:
+    # Cached per process, so pool workers load each model at most once.
+    key = str(path)
+    if key not in _LEXICAL_MODELS:
+        from .ibm_model import LexicalModel
+
+        _LEXICAL_MODELS[key] = LexicalModel.load(path) if path.exists() else None
+    return _LEXICAL_MODELS[key]
+
+
+def align_ids(
+    src_ids: np.ndarray,
+    tgt_ids: np.ndarray,
+    src_vocab: Vocab,
+    tgt_vocab: Vocab,
+    iterations: int,
+    align_engine: str,
+    lexical_model: LexicalModel | None,
+    symmetrization: str,
+    tolerance: float = 0.0,
+    prior: AlignmentPrior | None = None,
+    stats: EMStats | None = None,
+    band: int = 0,
+):
+    # Warm-start priors and the diagonal band only apply to the single agreement-style EM run.
+    if symmetrization == "agreement":
+        return em_word_align(
+            src_ids,
+            tgt_ids,
+            iterations=iterations,
+            engine=align_engine,
+            lexical_model=lexical_model,
+            source_vocab=src_vocab,
+            target_vocab=tgt_vocab,
+            tolerance=tolerance,
+            prior=prior,
+            stats=stats,
+            band=band,
+        )
+    from .symmetrize import symmetrized_word_align
+
+    return symmetrized_word_align(
+        src_ids,
+        tgt_ids,
+        heuristic=symmetrization,
+        iterations=iterations,
+        lexical_model=lexical_model,
+        source_vocab=src_vocab,
+        target_vocab=tgt_vocab,
+        tolerance=tolerance,
+        stats=stats,
+    )
+
+
+PAYLOAD_FIELDS = (
+    "source_tokens",
+    "target_tokens",
+    "target_text",
+    "backend",
+    "target_language",
+    "alignment_model",
+    "alignments",
+    "alignment_grid",
+    "alignment_pairs",
+    "giza_alignment",
+    "em_stats",
+    "phrase_pairs",
+    "phrase_based_translation",
+)
+# Fields that need EM to run, and the subset that also needs phrase extraction.
+_ALIGNMENT_FIELDS = frozenset(PAYLOAD_FIELDS[6:])
+_PHRASE_FIELDS = frozenset(("phrase_pairs", "phrase_based_translation"))
+
+
+def resolve_fields(fields: Iterable[str] | None) -> Tuple[str, ...] | None:
+    # None means every field; otherwise validated, deduplicated and in PAYLOAD_FIELDS order.
+    if fields is None:
+        return None
+    wanted = set(fields)
+    unknown = wanted.difference(PAYLOAD_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown result fields: {', '.join(sorted(unknown))}")
+    return tuple(f for f in PAYLOAD_FIELDS if f in wanted)
+
+
+def build_alignment_payload(
+    source_text: str,
+    translated_sentence: str,
+    target_language: str,
+    backend: str,
+    align_engine: str = "numpy",
+    lexical_model: LexicalModel | None = None,
+    symmetrization: str = "agreement",
+    timer: StageTimer | None = None,
+    source_language: str = "en",
+    em_iterations: int = 8,
+    em_tolerance: float = 0.0,
+    prior: AlignmentPrior | None = None,
+    band: int = 0,
+    fields: Tuple[str, ...] | None = None,
+) -> dict:
+    # Only the requested fields are computed: EM is skipped when no alignment field is asked for,
+    # and phrase extraction/projection unless one of their fields is.
+    wanted = frozenset(PAYLOAD_FIELDS if fields is None else fields)
+    with maybe_stage(timer, "tokenize"):
+        source_tokens = preprocess_for_alignment(source_text, lowercase=True)
+        target_tokens: List[str] = preprocess_for_alignment(translated_sentence, lowercase=True)
+    if timer is not None:
+        timer.labels["target_language"] = target_language
+        timer.labels["length_bucket"] = length_bucket(len(source_tokens))
+
+    stats = EMStats()
+    alignments = AlignmentLinks()
+    if wanted & _ALIGNMENT_FIELDS:
+        with maybe_stage(timer, "tokenize"):
+            # The aligners work on interned IDs whose punctuation/numeric flags were computed once per word type.
+            if prior is not None:
+                src_vocab, tgt_vocab = prior.source_vocab, prior.target_vocab
+            else:
+                src_vocab = vocab_for(source_language)
+                tgt_vocab = vocab_for(target_language)
+            src_ids = src_vocab.encode(source_tokens)
+            tgt_ids = tgt_vocab.encode(target_tokens)
+        # A corpus-trained model already carries the word-pair statistics, so one EM pass suffices.
+        iterations = 1 if lexical_model else em_iterations
+        with maybe_stage(timer, "align"):
+            alignments = align_ids(
+                src_ids,
+                tgt_ids,
+                src_vocab,
+                tgt_vocab,
+                iterations,
+                align_engine,
+                lexical_model,
+                symmetrization,
+                tolerance=em_tolerance,
+                prior=prior,
+                stats=stats,
+                band=band,
+            )
+
+    result = TranslationResult(
+        source_tokens=source_tokens,
+        target_tokens=target_tokens,
+        target_text=translated_sentence,
+        alignments=alignments,
+        backend=backend,
+    )
+
+    # Shallow copy: the token lists and compact links are shared, not deep-copied like asdict() would.
+    payload = dict(vars(result))
+    links = result.alignments
+    payload["target_language"] = target_language
+    with maybe_stage(timer, "payload"):
+        if "alignment_grid" in wanted:
+            payload["alignment_grid"] = links.grid(len(source_tokens), len(target_tokens))
+        if "alignment_pairs" in wanted:
+            payload["alignment_pairs"] = links.word_pairs(source_tokens, target_tokens)
+        if "giza_alignment" in wanted:
+            payload["giza_alignment"] = links.to_pharaoh()
+        if "em_stats" in wanted:
+            payload["em_stats"] = asdict(stats)
+    if symmetrization == "agreement":
+        payload["alignment_model"] = "EM-based (IBM-style) with punctuation-aware constraints"
+    else:
+        payload["alignment_model"] = f"Bidirectional EM (IBM-style) symmetrized with {symmetrization}"
+    if lexical_model:
+        payload["alignment_model"] += f", IBM Model {lexical_model.model} prior"
+    if wanted & _PHRASE_FIELDS:
+        with maybe_stage(timer, "phrases"):
+            payload["phrase_pairs"] = extract_phrase_pairs_fast(
+                result.source_tokens,
+                result.target_tokens,
+                result.alignments,
+            )
+    if "phrase_based_translation" in wanted:
+        with maybe_stage(timer, "projection"):
+            payload["phrase_based_translation"] = phrase_based_projection(
+                result.source_tokens,
+                result.target_tokens,
+                result.alignments,
+                payload["phrase_pairs"],
+            )
+    if fields is None:
+        return payload
+    return {name: payload[name] for name in fields}
+
+
+class AlignJob(NamedTuple):
+    # Picklable description of one alignment, so it can run in a process pool worker.
+    source_text: str
+    translated_sentence: str
+    target_language: str
+    backend: str
+    align_engine: str
+    model_path: str
+    symmetrization: str
+    source_language: str
+    em_iterations: int
+    em_tolerance: float
+    align_band: int
+    fields: Optional[Tuple[str, ...]] = None
+
+
+def _run_align_job(job: AlignJob, timer: StageTimer | None = None, prior: AlignmentPrior | None = None) -> dict:
+    return build_alignment_payload(
+        job.source_text,
+        job.translated_sentence,
+        job.target_language,
+        job.backend,
+        align_engine=job.align_engine,
+        lexical_model=load_lexical_model(Path(job.model_path)),
+        symmetrization=job.symmetrization,
+        timer=timer,
+        source_language=job.source_language,
+        em_iterations=job.em_iterations,
+        em_tolerance=job.em_tolerance,
+        prior=prior,
+        band=job.align_band,
+        fields=job.fields,
+    )
+
+
+TRANSLATION_BACKENDS = ("google", "moses", "phrase")
+
+
+def build_sentence_translator(cfg: AppConfig):
+    if cfg.translation_backend == "moses":
+        from .moses_pool import MosesSentenceTranslator
+
+        return MosesSentenceTranslator.from_config(cfg)
+    if cfg.translation_backend == "phrase":
+        from .decoder import PhraseTableSentenceTranslator
+
+        return PhraseTableSentenceTranslator.from_config(cfg)
+    if cfg.translation_backend == "google":
+        return LibrarySentenceTranslator.from_config(cfg)
+    raise ValueError(f"Unknown translation backend: {cfg.translation_backend}")
 
 
 class SMTTranslator:
     def __init__(self, cfg: AppConfig) -> None:
+        if cfg.translation_backend not in TRANSLATION_BACKENDS:
+            raise ValueError(f"Unknown translation backend: {cfg.translation_backend}")
         self.cfg = cfg
         self.supported_languages = set(cfg.target_languages)
-        self.library_translator = LibrarySentenceTranslator(cfg.source_language)
+        self.cache: TranslationCache | None = None
+        if cfg.cache_enabled:
+            self.cache = TranslationCache.from_config(cfg)
+        # Identical concurrent requests share one backend call and one EM run instead of stampeding.
+        self._flight: SingleFlight[dict] | None = SingleFlight("align") if cfg.coalesce else None
+        # The backend is built on first use (or by warm_up), so a pre-fork master never starts the
+        # decoder processes, health-check threads or connection pools its workers would inherit.
+        self._backend = None
+        self._library_translator = None
+        self._backend_lock = threading.Lock()
+        self._executor_lock = threading.Lock()
+        self._io_executor: ThreadPoolExecutor | None = None
+        self._cpu_executor: Executor | None = None
 
-    def translate_with_alignment(self, source_text: str, target_language: str | None = None) -> dict:
+    @property
+    def library_translator(self):
+        translator = self._library_translator
+        if translator is None:
+            with self._backend_lock:
+                if self._library_translator is None:
+                    self._backend = translator = build_sentence_translator(self.cfg)
+                    if self.cache is not None:
+                        translator = CachedSentenceTranslator(translator, self.cache)
+                    if self.cfg.coalesce:
+                        translator = CoalescingSentenceTranslator(translator)
+                    self._library_translator = translator
+                translator = self._library_translator
+        return translator
+
+    @library_translator.setter
+    def library_translator(self, translator) -> None:
+        self._library_translator = translator
+
+    @property
+    def sentence_backend(self):
+        # The bare backend under the cache and coalescing layers.
+        self.library_translator  # builds the backend chain
+        return self._backend
+
+    def warm_up(self, languages: Iterable[str] | None = None) -> Dict[str, float]:
+        # Pays the first-request costs up front: backend construction (plus decoder processes or compiled
+        # tables where the backend has them), lexical models and the aligner's lazy imports. Meant to run
+        # in each worker after fork; returns seconds per step.
+        langs = list(languages or self.cfg.target_languages)
+        timings: Dict[str, float] = {}
+        started = time.perf_counter()
+        prepare = getattr(self.sentence_backend, "warm_up", None)
+        if prepare is not None:
+            for lang in langs:
+                prepare(lang)
+        timings["backend"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for lang in langs:
+            self.lexical_model(lang)
+        timings["lexical_models"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        if langs:
+            _run_align_job(self._align_job("Warm up the aligner, please.", "warm up the aligner , please .", langs[0]))
+        timings["aligner"] = time.perf_counter() - started
+        return timings
+
+    def lexical_model(self, target_language: str) -> LexicalModel | None:
+        return load_lexical_model(self.cfg.lexical_model_for(target_language))
+
+    def _resolve_language(self, target_language: str | None) -> str:
         lang = (target_language or self.cfg.default_target_language).lower()
         if self.supported_languages and lang not in self.supported_languages:
             raise ValueError(f"Unsupported target language: {lang}")
+        return lang
 
-        source_tokens = preprocess_for_alignment(source_text, lowercase=True)
-        translated_sentence = self.library_translator.translate(source_text, lang)
-        target_tokens: List[str] = preprocess_for_alignment(translated_sentence, lowercase=True)
-        alignments = em_word_align(source_tokens, target_tokens)
-
-        result = TranslationResult(
-            source_tokens=source_tokens,
-            target_tokens=target_tokens,
-            target_text=translated_sentence,
-            alignments=alignments,
-            backend=self.library_translator.backend,
+    def io_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._io_executor is None:
+                self._io_executor = ThreadPoolExecutor(
+                    max_workers=self.cfg.io_threads,
+                    thread_name_prefix="smt-io",
+                )
+            return self._io_executor
+
+    def cpu_executor(self) -> Executor | None:
+        if self.cfg.batch_workers <= 1:
+            return None
+        with self._executor_lock:
+            if self._cpu_executor is None:
+                self._cpu_executor = ProcessPoolExecutor(max_workers=self.cfg.batch_workers)
+            return self._cpu_executor
+
+    def close(self) -> None:
+        with self._executor_lock:
+            for executor in (self._io_executor, self._cpu_executor):
+                if executor is not None:
+                    executor.shutdown(wait=False, cancel_futures=True)
+            self._io_executor = None
+            self._cpu_executor = None
+
+    def _align_job(
+        self,
+        source_text: str,
+        translated_sentence: str,
+        lang: str,
+        fields: Tuple[str, ...] | None = None,
+    ) -> AlignJob:
+        return AlignJob(
+            source_text,
+            translated_sentence,
+            lang,
+            self.library_translator.backend,
+            self.cfg.align_engine,
+            str(self.cfg.lexical_model_for(lang)),
+            self.cfg.symmetrization,
+            self.cfg.source_language,
+            self.cfg.em_iterations,
+            self.cfg.em_tolerance,
+            self.cfg.align_band,
+            fields,
         )
 
-        payload = asdict(result)
-        payload["alignment_grid"] = matrix_for_viewer(
-            result.source_tokens,
-            result.target_tokens,
-            result.alignments,
+    def translate_with_alignment(
+        self,
+        source_text: str,
+        target_language: str | None = None,
+        timer: StageTimer | None = None,
+        fields: Iterable[str] | None = None,
+    ) -> dict:
+        lang = self._resolve_language(target_language)
+        fields = resolve_fields(fields)
+        if self._flight is None:
+            return self._translate_with_alignment(source_text, lang, timer, fields)
+        # Alignment settings come from the (frozen) config, so text, language and fields identify the work.
+        key = (normalize_cache_text(source_text), lang, fields)
+        started = time.perf_counter()
+        payload, shared = self._flight.do(
+            key, lambda: self._translate_with_alignment(source_text, lang, timer, fields)
         )
-        payload["alignment_pairs"] = [
-            {
-                "source_word": result.source_tokens[p.src_index],
-                "target_word": result.target_tokens[p.tgt_index],
-                "source_index": p.src_index,
-                "target_index": p.tgt_index,
-            }
-            for p in result.alignments
-            if p.src_index < len(result.source_tokens) and p.tgt_index < len(result.target_tokens)
+        if not shared:
+            return payload
+        if timer is not None:
+            timer.add("coalesced", time.perf_counter() - started)
+            timer.labels["target_language"] = lang
+        return dict(payload)
+
+    def _translate_with_alignment(
+        self,
+        source_text: str,
+        lang: str,
+        timer: StageTimer | None,
+        fields: Tuple[str, ...] | None,
+    ) -> dict:
+        with maybe_stage(timer, "translate"):
+            translated_sentence = self.library_translator.translate(source_text, lang)
+        return _run_align_job(self._align_job(source_text, translated_sentence, lang, fields), timer)
+
+    def translate_batch(
+        self,
+        source_texts: List[str],
+        target_language: str | None = None,
+        fields: Iterable[str] | None = None,
+    ) -> List[dict]:
+        lang = self._resolve_language(target_language)
+        fields = resolve_fields(fields)
+
+        def translate_one(text: str) -> Tuple[str | None, str | None]:
+            if not text.strip():
+                return None, "Empty sentence."
+            try:
+                return self.library_translator.translate(text, lang), None
+            except Exception as exc:
+                return None, f"Translation failed: {exc}"
+
+        translations = list(self.io_executor().map(translate_one, source_texts))
+
+        results: List[dict] = [
+            {"index": i, "source_text": text, "ok": False, "error": error}
+            for i, (text, (_, error)) in enumerate(zip(source_texts, translations))
         ]
-        payload["target_language"] = lang
-        payload["giza_alignment"] = " ".join(
-            f"{p.src_index}-{p.tgt_index}" for p in sorted(result.alignments, key=lambda x: (x.src_index, x.tgt_index))
-        )
-        payload["alignment_model"] = "EM-based (IBM-style) with punctuation-aware constraints"
-        payload["phrase_pairs"] = extract_phrase_pairs(
-            result.source_tokens,
-            result.target_tokens,
-            result.alignments,
-        )
-        payload["phrase_based_translation"] = phrase_based_projection(
-            result.source_tokens,
-            result.target_tokens,
-            result.alignments,
-            payload["phrase_pairs"],
-        )
-        return payload
+        pending = [
+            (i, self._align_job(source_texts[i], translated, lang, fields))
+            for i, (translated, error) in enumerate(translations)
+            if error is None
+        ]
+
+        executor = self.cpu_executor()
+        if executor is None:
+            outcomes = [(i, _capture(_run_align_job, job)) for i, job in pending]
+        else:
+            futures = [(i, executor.submit(_run_align_job, job)) for i, job in pending]
+            outcomes = [(i, _capture(future.result)) for i, future in futures]
+
+        for i, (payload, error) in outcomes:
+            item = results[i]
+            if error is None:
+                item.update(ok=True, error=None, result=payload)
+            else:
+                item["error"] = f"Alignment failed: {error}"
+        return results
+
+    def translate_document(
+        self,
+        text: str,
+        target_language: str | None = None,
+        fields: Iterable[str] | None = None,
+    ) -> List[dict]:
+        # Paragraphs are split into sentences that are translated concurrently and aligned one by one,
+        # so cost grows with the sum of per-sentence sizes rather than with the whole document squared.
+        # Sentences share a warm-start prior, so word pairs learned early carry over to later ones.
+        lang = self._resolve_language(target_language)
+        fields = resolve_fields(fields)
+        sentences = [
+            (p, k, sentence)
+            for p, paragraph in enumerate(split_paragraphs(text))
+            for k, sentence in enumerate(split_sentences(paragraph))
+        ]
+        if len(sentences) > self.cfg.document_max_sentences:
+            raise ValueError(f"At most {self.cfg.document_max_sentences} sentences per document.")
+
+        def translate_one(sentence: str) -> Tuple[str | None, str | None]:
+            try:
+                return self.library_translator.translate(sentence, lang), None
+            except Exception as exc:
+                return None, f"Translation failed: {exc}"
+
+        translations = list(self.io_executor().map(translate_one, [s for _, _, s in sentences]))
+        prior = AlignmentPrior(vocab_for(self.cfg.source_language), vocab_for(lang))
+        results: List[dict] = []
+        for (p, k, sentence), (translated, error) in zip(sentences, translations):
+            item = {"paragraph": p, "sentence": k, "source_text": sentence, "ok": False, "error": error}
+            if error is None:
+                job = self._align_job(sentence, translated, lang, fields)
+                payload, exc = _capture(_run_align_job, job, None, prior)
+                if exc is None:
+                    item.update(ok=True, result=payload)
+                else:
+                    item["error"] = f"Alignment failed: {exc}"
+            results.append(item)
+        return results
+
+    def translate_all_languages(
+        self,
+        source_text: str,
+        languages: List[str] | None = None,
+        timeout: float | None = None,
+        fields: Iterable[str] | None = None,
+    ) -> List[dict]:
+        langs = [self._resolve_language(l) for l in (languages or self.cfg.target_languages)]
+        fields = resolve_fields(fields)
+        timeout = self.cfg.fanout_timeout if timeout is None else timeout
+        executor = self.io_executor()
+        # Submit every language up front so total latency tracks the slowest backend call, not the sum.
+        futures = [
+            (lang, executor.submit(self.library_translator.translate, source_text, lang))
+            for lang in langs
+        ]
+        deadline = time.monotonic() + timeout
+
+        results: List[dict] = []
+        for lang, future in futures:
+            item = {"target_language": lang, "ok": False, "error": None}
+            try:
+                translated = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                future.cancel()
+                item["error"] = f"Translation timed out after {timeout:g}s."
+            except Exception as exc:
+                item["error"] = f"Translation failed: {exc}"
+            else:
+                payload, error = _capture(_run_align_job, self._align_job(source_text, translated, lang, fields))
+                if error is None:
+                    item.update(ok=True, result=payload)
+                else:
+                    item["error"] = f"Alignment failed: {error}"
+            results.append(item)
+        return results
+
+
+def _capture(fn, *args) -> Tuple[dict | None, Exception | None]:
+    try:
+        return fn(*args), None
+    except Exception as exc:
+        return None, exc
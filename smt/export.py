@@ -0,0 +1,361 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .alignment import AlignmentLinks, extract_phrase_pairs_fast
+from .tokenize import preprocess_for_alignment
+
+FORMATS = ("pharaoh", "jsonl", "parquet")
+COMPRESSIONS = ("none", "gzip", "zstd")
+CONTENT_TYPES = {
+    "pharaoh": "text/plain; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+EXTENSIONS = {"pharaoh": ".align", "jsonl": ".jsonl", "parquet": ".parquet"}
+COMPRESSED_TYPES = {"gzip": ("application/gzip", ".gz"), "zstd": ("application/zstd", ".zst")}
+
+# Output is handed on in pieces of about this size; with the Parquet row group it bounds peak memory.
+FLUSH_BYTES = 256 * 1024
+ROW_GROUP_SIZE = 5000
+_PHRASE_KEYS = ("source_phrase", "target_phrase", "source_start", "source_end", "target_start", "target_end")
+
+
+class ExportError(ValueError):
+    pass
+
+
+class ExportRecord(NamedTuple):
+    index: int
+    source_tokens: List[str]
+    target_tokens: List[str]
+    links: AlignmentLinks
+    phrase_pairs: Optional[List[dict]] = None
+    error: Optional[str] = None
+
+
+def check_options(fmt: str, compression: str) -> None:
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown export format '{fmt}'; expected one of {', '.join(FORMATS)}.")
+    if compression not in COMPRESSIONS:
+        raise ExportError(f"Unknown compression '{compression}'; expected one of {', '.join(COMPRESSIONS)}.")
+    if compression == "zstd":
+        _zstandard()
+    if fmt == "parquet":
+        _pyarrow()
+
+
+def _zstandard():
+    try:
+        import zstandard  # type: ignore
+    except ImportError as exc:
+        raise ExportError("zstd compression needs the 'zstandard' package (pip install zstandard).") from exc
+    return zstandard
+
+
+def _pyarrow():
+    try:
+        import pyarrow  # type: ignore
+        import pyarrow.parquet  # type: ignore  # noqa: F401
+    except ImportError as exc:
+        raise ExportError("Parquet export needs the 'pyarrow' package (pip install pyarrow).") from exc
+    return pyarrow
+
+
+def media_type(fmt: str, compression: str) -> str:
+    if compression in COMPRESSED_TYPES:
+        return COMPRESSED_TYPES[compression][0]
+    return CONTENT_TYPES[fmt]
+
+
+def file_name(stem: str, fmt: str, compression: str) -> str:
+    # Parquet compresses its pages itself, so it never gets an outer .gz/.zst.
+    name = stem + EXTENSIONS[fmt]
+    if fmt != "parquet" and compression in COMPRESSED_TYPES:
+        name += COMPRESSED_TYPES[compression][1]
+    return name
+
+
+def guess_options(path: Path) -> Tuple[str | None, str | None]:
+    # (format, compression) implied by a file name such as corpus.jsonl.gz; None where it says nothing.
+    suffixes = [s.lower() for s in path.suffixes]
+    compression = None
+    for name, (_, ext) in COMPRESSED_TYPES.items():
+        if suffixes and suffixes[-1] == ext:
+            compression = name
+            suffixes.pop()
+    fmt = next((name for name, ext in EXTENSIONS.items() if suffixes and suffixes[-1] == ext), None)
+    if fmt is None and suffixes and suffixes[-1] in (".pharaoh", ".txt"):
+        fmt = "pharaoh"
+    return fmt, compression
+
+
+def with_phrases(records: Iterable[ExportRecord]) -> Iterator[ExportRecord]:
+    for record in records:
+        if record.phrase_pairs is None and record.error is None:
+            record = record._replace(
+                phrase_pairs=extract_phrase_pairs_fast(record.source_tokens, record.target_tokens, record.links)
+            )
+        yield record
+
+
+def iter_corpus_records(
+    alignment: Path,
+    corpus: Path | None = None,
+    source: Path | None = None,
+    target: Path | None = None,
+) -> Iterator[ExportRecord]:
+    # Corpus-aligner output: line i of the alignment belongs to line i of the corpus, both tokenized as
+    # the aligner did.
+    from .corpus_align import CorpusAlignError, iter_line_pairs
+
+    try:
+        with alignment.open("r", encoding="utf-8") as align_fh:
+            for index, ((src, tgt), line) in enumerate(zip(iter_line_pairs(corpus, source, target), align_fh)):
+                src_tokens = preprocess_for_alignment(src, lowercase=True)
+                tgt_tokens = preprocess_for_alignment(tgt, lowercase=True)
+                try:
+                    links = AlignmentLinks.from_pharaoh(line, len(src_tokens), len(tgt_tokens))
+                except ValueError as exc:
+                    raise ExportError(f"{alignment}:{index + 1}: {exc}") from exc
+                yield ExportRecord(index, src_tokens, tgt_tokens, links)
+    except CorpusAlignError as exc:
+        raise ExportError(str(exc)) from exc
+
+
+def iter_index_records(index, start: int = 0, stop: int | None = None) -> Iterator[ExportRecord]:
+    # Sentences of a concordance index (smt.concordance), read one at a time from the mapped arrays.
+    stop = len(index) if stop is None else min(stop, len(index))
+    for i in range(max(0, start), stop):
+        src_tokens, tgt_tokens, links = index.sentence(i)
+        yield ExportRecord(i, src_tokens, tgt_tokens, links)
+
+
+def iter_batch_records(
+    translator,
+    sentences: List[str],
+    target_language: str,
+    phrases: bool = True,
+    chunk_size: int = 32,
+) -> Iterator[ExportRecord]:
+    # Translates and aligns `chunk_size` sentences at a time, so output starts before the batch is done.
+    fields = ["source_tokens", "target_tokens", "alignments"] + (["phrase_pairs"] if phrases else [])
+    for offset in range(0, len(sentences), chunk_size):
+        for item in translator.translate_batch(sentences[offset : offset + chunk_size], target_language, fields):
+            index = offset + item["index"]
+            if not item["ok"]:
+                yield ExportRecord(index, [], [], AlignmentLinks(), error=item["error"])
+                continue
+            result = item["result"]
+            yield ExportRecord(
+                index,
+                result["source_tokens"],
+                result["target_tokens"],
+                result["alignments"],
+                result.get("phrase_pairs"),
+            )
+
+
+class _ChunkSink:
+    # Write-only file object collecting output until the generator hands it on.
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+        self.size = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self.size += len(data)
+        return len(data)
+
+    closed = False
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        # Writers close the file they are given (pyarrow does); the collected chunks stay readable.
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self.size = 0
+        return data
+
+
+def _json_record(record: ExportRecord, phrases: bool) -> dict:
+    item: Dict[str, object] = {
+        "index": record.index,
+        "source_tokens": record.source_tokens,
+        "target_tokens": record.target_tokens,
+        "links": [[si, ti] for si, ti in record.links.pairs()],
+    }
+    if phrases:
+        item["phrase_pairs"] = [{key: p[key] for key in _PHRASE_KEYS} for p in record.phrase_pairs or []]
+    if record.error is not None:
+        item["error"] = record.error
+    return item
+
+
+def _text_lines(records: Iterable[ExportRecord], fmt: str, phrases: bool) -> Iterator[bytes]:
+    for record in records:
+        if fmt == "pharaoh":
+            yield (record.links.to_pharaoh() + "\n").encode("utf-8")
+        else:
+            yield (json.dumps(_json_record(record, phrases), ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _parquet_chunks(records: Iterable[ExportRecord], compression: str, phrases: bool) -> Iterator[bytes]:
+    pa = _pyarrow()
+    import pyarrow.parquet as pq  # type: ignore
+
+    phrase_type = pa.list_(
+        pa.struct([(key, pa.string() if key.endswith("phrase") else pa.int32()) for key in _PHRASE_KEYS])
+    )
+    fields = [
+        ("index", pa.int64()),
+        ("source_tokens", pa.list_(pa.string())),
+        ("target_tokens", pa.list_(pa.string())),
+        ("link_src", pa.list_(pa.int32())),
+        ("link_tgt", pa.list_(pa.int32())),
+    ]
+    if phrases:
+        fields.append(("phrase_pairs", phrase_type))
+    fields.append(("error", pa.string()))
+    schema = pa.schema(fields)
+    codec = {"none": "NONE", "gzip": "GZIP", "zstd": "ZSTD"}[compression]
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression=codec)
+    columns: Dict[str, list] = {name: [] for name, _ in fields}
+
+    def write_group() -> bytes:
+        writer.write_table(pa.table(columns, schema=schema))
+        for values in columns.values():
+            values.clear()
+        return sink.drain()
+
+    for record in records:
+        columns["index"].append(record.index)
+        columns["source_tokens"].append(record.source_tokens)
+        columns["target_tokens"].append(record.target_tokens)
+        columns["link_src"].append(record.links.src.tolist())
+        columns["link_tgt"].append(record.links.tgt.tolist())
+        if phrases:
+            columns["phrase_pairs"].append([{key: p[key] for key in _PHRASE_KEYS} for p in record.phrase_pairs or []])
+        columns["error"].append(record.error)
+        if len(columns["index"]) >= ROW_GROUP_SIZE:
+            yield write_group()
+    if columns["index"]:
+        yield write_group()
+    writer.close()
+    yield sink.drain()
+
+
+def stream_export(
+    records: Iterable[ExportRecord],
+    fmt: str = "jsonl",
+    compression: str = "none",
+    phrases: bool = True,
+) -> Iterator[bytes]:
+    # Encodes records one at a time and yields output in pieces of about FLUSH_BYTES (one row group for
+    # Parquet), so memory stays flat whatever the number of records.
+    check_options(fmt, compression)
+    phrases = phrases and fmt != "pharaoh"
+    if phrases:
+        records = with_phrases(records)
+    if fmt == "parquet":
+        yield from (chunk for chunk in _parquet_chunks(records, compression, phrases) if chunk)
+        return
+
+    sink = _ChunkSink()
+    if compression == "gzip":
+        out = gzip.GzipFile(fileobj=sink, mode="wb", compresslevel=6, mtime=0)
+    elif compression == "zstd":
+        out = _zstandard().ZstdCompressor(level=3).stream_writer(sink, closefd=False)
+    else:
+        out = sink
+    for line in _text_lines(records, fmt, phrases):
+        out.write(line)
+        if sink.size >= FLUSH_BYTES:
+            yield sink.drain()
+    if out is not sink:
+        out.close()
+    if sink.size:
+        yield sink.drain()
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Export word alignments as Pharaoh, JSONL or Parquet, optionally compressed.")
+    parser.add_argument("corpus", nargs="?", type=Path, help="'src ||| tgt' corpus the alignment was made from")
+    parser.add_argument("alignment", nargs="?", type=Path, help="Pharaoh alignment, one line per corpus line")
+    parser.add_argument("--source", type=Path, help="Source side, line-parallel with --target (instead of a corpus)")
+    parser.add_argument("--target", type=Path, help="Target side, line-parallel with --source")
+    parser.add_argument("--index", type=Path, help="Export a concordance index directory instead of corpus + alignment")
+    parser.add_argument("--start", type=int, default=0, help="First sentence to export from --index")
+    parser.add_argument("--stop", type=int, default=None, help="Stop before this sentence of --index")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="Output file, or - for stdout")
+    parser.add_argument("--format", choices=FORMATS, help="Default: from the output name, else jsonl")
+    parser.add_argument("--compression", choices=COMPRESSIONS, help="Default: from the output name (.gz, .zst)")
+    parser.add_argument("--no-phrases", action="store_true", help="Leave phrase pairs out of JSONL/Parquet output")
+    args = parser.parse_args(argv)
+
+    guessed_fmt, guessed_compression = guess_options(args.output) if str(args.output) != "-" else (None, None)
+    fmt = args.format or guessed_fmt or "jsonl"
+    compression = args.compression or guessed_compression or "none"
+
+    if args.index is not None:
+        from .concordance import ConcordanceIndex
+
+        if not (args.index / "meta.json").exists():
+            parser.error(f"No concordance index in {args.index}")
+        records: Iterable[ExportRecord] = iter_index_records(ConcordanceIndex(args.index), args.start, args.stop)
+    elif args.source is not None or args.target is not None:
+        alignment = args.alignment or args.corpus
+        if alignment is None or args.alignment is not None:
+            parser.error("With --source/--target, pass only the alignment file positionally.")
+        records = iter_corpus_records(alignment, source=args.source, target=args.target)
+    else:
+        if args.corpus is None or args.alignment is None:
+            parser.error("Pass a corpus and its alignment, --source/--target and an alignment, or --index.")
+        records = iter_corpus_records(args.alignment, corpus=args.corpus)
+
+    count = 0
+
+    def counted(items: Iterable[ExportRecord]) -> Iterator[ExportRecord]:
+        nonlocal count
+        for item in items:
+            count += 1
+            yield item
+
+    try:
+        chunks = stream_export(counted(records), fmt, compression, phrases=not args.no_phrases)
+        if str(args.output) == "-":
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+        else:
+            tmp = args.output.with_name(args.output.name + ".tmp")
+            try:
+                with tmp.open("wb") as fh:
+                    for chunk in chunks:
+                        fh.write(chunk)
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+            tmp.replace(args.output)
+    except ExportError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        sys.exit(1)
+    if str(args.output) != "-":
+        print(f"Exported {count} sentences as {fmt} ({compression}) to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+from __future__ import annotations
+
+import asyncio
+import http.client
+import queue
+import random
+import ssl
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Mapping, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from .config import AppConfig
+from .metrics import REGISTRY
+
+BACKEND_SECONDS = REGISTRY.histogram(
+    "smt_backend_seconds",
+    "Translation-backend call latency, including retries and hedged requests.",
+)
+BACKEND_ATTEMPTS = REGISTRY.counter("smt_backend_attempts_total", "Translation-backend attempts by outcome.")
+BACKEND_HEDGES = REGISTRY.counter("smt_backend_hedges_total", "Backup requests sent because the first was slow.")
+BACKEND_REJECTED = REGISTRY.counter("smt_backend_rejected_total", "Calls refused while the circuit was open.")
+
+# Errors from reusing a keep-alive connection the server has already closed.
+_STALE = (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError)
+
+
+class BackendError(RuntimeError):
+    pass
+
+
+class BackendHTTPError(BackendError):
+    def __init__(self, status: int, reason: str) -> None:
+        super().__init__(f"HTTP {status} {reason}")
+        self.status = status
+
+    @property
+    def retryable(self) -> bool:
+        return self.status >= 500 or self.status == 429
+
+
+class CircuitOpenError(BackendError):
+    pass
+
+
+class ConnectionPool:
+    # Keep-alive connections to one endpoint. Up to `size` idle connections are kept for reuse; busier
+    # moments open extra ones that are closed afterwards. Broken connections are never returned.
+    def __init__(self, endpoint: str, size: int = 4) -> None:
+        parts = urlsplit(endpoint)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Unsupported backend endpoint: {endpoint}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip("/")
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue(maxsize=max(1, size))
+
+    def _connect(self, timeout: float) -> http.client.HTTPConnection:
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+
+    def _checkout(self, timeout: float) -> http.client.HTTPConnection:
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect(timeout)
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn
+
+    def _checkin(self, conn: http.client.HTTPConnection) -> None:
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def request(self, method: str, path: str, timeout: float) -> bytes:
+        for fresh in (False, True):
+            conn = self._connect(timeout) if fresh else self._checkout(timeout)
+            try:
+                conn.request(method, self.base_path + path, headers={"Connection": "keep-alive"})
+                response = conn.getresponse()
+                body = response.read()
+            except _STALE:
+                conn.close()
+                if fresh:
+                    raise
+                continue
+            except BaseException:
+                conn.close()
+                raise
+            if response.will_close:
+                conn.close()
+            else:
+                self._checkin(conn)
+            if not 200 <= response.status < 300:
+                raise BackendHTTPError(response.status, response.reason)
+            return body
+        raise AssertionError("unreachable")
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class CircuitBreaker:
+    # Opens after `failures` consecutive failures and refuses calls for `reset_after` seconds; then one
+    # trial call is let through (half-open) and its outcome closes or re-opens the circuit.
+    def __init__(self, failures: int = 5, reset_after: float = 30.0) -> None:
+        self.failures = max(1, failures)
+        self.reset_after = reset_after
+        self.state = "closed"
+        self._count = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_after:
+                self.state = "half-open"
+                return True
+            return False
+
+    def success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self._count = 0
+
+    def failure(self) -> None:
+        with self._lock:
+            self._count += 1
+            if self.state == "half-open" or self._count >= self.failures:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def abandon(self) -> None:
+        # A call ended without an outcome (cancelled, or an unexpected error). A half-open trial goes
+        # back to open with its old timestamp, so the next call becomes the trial instead of the
+        # circuit waiting forever for a verdict.
+        with self._lock:
+            if self.state == "half-open":
+                self.state = "open"
+
+
+class ResilientHTTPClient:
+    # GET client for the translation backend: one connection pool and circuit breaker per key (the
+    # target language), a bounded per-attempt timeout, retries with full-jitter exponential backoff,
+    # and a hedged backup request when the first one is slower than `hedge_after` seconds.
+    pool_class = ConnectionPool
+
+    def __init__(
+        self,
+        endpoint: str,
+        pool_size: int = 4,
+        timeout: float = 5.0,
+        retries: int = 2,
+        backoff: float = 0.1,
+        backoff_cap: float = 2.0,
+        hedge_after: float = 1.0,
+        breaker_failures: int = 5,
+        breaker_reset: float = 30.0,
+        max_workers: int = 32,
+    ) -> None:
+        self.endpoint = endpoint
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.backoff_cap = backoff_cap
+        self.hedge_after = hedge_after
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self._pools: Dict[str, ConnectionPool] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self.max_workers = max_workers
+        self._pool_executor: ThreadPoolExecutor | None = None
+        self.pool_class(endpoint)  # validate the endpoint up front
+
+    @classmethod
+    def from_config(cls, cfg: AppConfig) -> "ResilientHTTPClient":
+        return cls(
+            cfg.backend_url,
+            pool_size=cfg.backend_pool_size,
+            timeout=cfg.backend_timeout,
+            retries=cfg.backend_retries,
+            hedge_after=cfg.backend_hedge_after,
+            breaker_failures=cfg.backend_breaker_failures,
+            breaker_reset=cfg.backend_breaker_reset,
+            max_workers=max(8, 2 * cfg.io_threads),
+        )
+
+    def _for_key(self, key: str) -> tuple:
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = self.pool_class(self.endpoint, self.pool_size)
+                self._breakers[key] = CircuitBreaker(self.breaker_failures, self.breaker_reset)
+            return pool, self._breakers[key]
+
+    def _target(self, path: str, params: Mapping[str, str]) -> str:
+        return f"{path}?{urlencode(params)}" if params else path
+
+    def _admit(self, breaker: CircuitBreaker, key: str) -> None:
+        if not breaker.allow():
+            BACKEND_REJECTED.inc(key=key)
+            raise CircuitOpenError(f"Backend circuit for '{key}' is open; retry in up to {self.breaker_reset:g}s")
+
+    def _succeeded(self, breaker: CircuitBreaker, key: str) -> None:
+        BACKEND_ATTEMPTS.inc(key=key, outcome="ok")
+        breaker.success()
+
+    def _failed(self, exc: Exception, breaker: CircuitBreaker, key: str) -> Exception:
+        # Records a failed attempt and returns the error to raise if no retry is left.
+        if isinstance(exc, BackendHTTPError):
+            BACKEND_ATTEMPTS.inc(key=key, outcome=f"http_{exc.status}")
+            if not exc.retryable:
+                # The request itself was wrong; that says nothing about the backend's health.
+                breaker.success()
+                raise exc
+            breaker.failure()
+            return exc
+        BACKEND_ATTEMPTS.inc(key=key, outcome="timeout" if isinstance(exc, TimeoutError) else "error")
+        breaker.failure()
+        return BackendError(f"{type(exc).__name__}: {str(exc) or 'timed out'}")
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0.0, min(self.backoff_cap, self.backoff * 2**attempt))
+
+    def get(self, path: str, params: Mapping[str, str], key: str = "") -> bytes:
+        pool, breaker = self._for_key(key)
+        target = self._target(path, params)
+        started = time.perf_counter()
+        try:
+            for attempt in range(self.retries + 1):
+                self._admit(breaker, key)
+                try:
+                    body = self._hedged(pool, target)
+                except (BackendHTTPError, OSError, http.client.HTTPException) as exc:
+                    error = self._failed(exc, breaker, key)
+                except BaseException:
+                    breaker.abandon()
+                    raise
+                else:
+                    self._succeeded(breaker, key)
+                    return body
+                if attempt < self.retries:
+                    time.sleep(self._backoff(attempt))
+            raise error
+        finally:
+            BACKEND_SECONDS.observe(time.perf_counter() - started, key=key)
+
+    def _hedged(self, pool: ConnectionPool, target: str) -> bytes:
+        executor = self._executor()
+        primary: Future = executor.submit(pool.request, "GET", target, self.timeout)
+        if self.hedge_after <= 0 or wait([primary], timeout=self.hedge_after).done:
+            return primary.result()
+        BACKEND_HEDGES.inc()
+        pending = {primary, executor.submit(pool.request, "GET", target, self.timeout)}
+        error: BaseException | None = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        assert error is not None
+        raise error
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool_executor is None:
+                self._pool_executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="smt-backend")
+            return self._pool_executor
+
+    def states(self) -> Dict[str, str]:
+        with self._lock:
+            return {key: breaker.state for key, breaker in self._breakers.items()}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool_executor is not None:
+                self._pool_executor.shutdown(wait=False, cancel_futures=True)
+            for pool in self._pools.values():
+                pool.close()
+
+
+class AsyncConnectionPool:
+    # asyncio counterpart of ConnectionPool: keep-alive HTTP/1.1 over asyncio streams, so a waiting
+    # request holds a socket but no thread. Used from one event loop.
+    def __init__(self, endpoint: str, size: int = 4) -> None:
+        parts = urlsplit(endpoint)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Unsupported backend endpoint: {endpoint}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.host_header = parts.netloc.rpartition("@")[2]
+        self.base_path = parts.path.rstrip("/")
+        self.size = max(1, size)
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        context = ssl.create_default_context() if self.scheme == "https" else None
+        return await asyncio.open_connection(self.host, self.port, ssl=context)
+
+    async def request(self, method: str, path: str, timeout: float) -> bytes:
+        return await asyncio.wait_for(self._request(method, path), timeout)
+
+    async def _request(self, method: str, path: str) -> bytes:
+        head = (
+            f"{method} {self.base_path}{path} HTTP/1.1\r\n"
+            f"Host: {self.host_header}\r\n"
+            "Connection: keep-alive\r\n"
+            "Accept-Encoding: identity\r\n\r\n"
+        ).encode("latin-1")
+        for fresh in (False, True):
+            conn = self._idle.pop() if self._idle and not fresh else await self._connect()
+            reader, writer = conn
+            try:
+                writer.write(head)
+                await writer.drain()
+                status, reason, body, keep_alive = await _read_response(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if fresh:
+                    raise ConnectionResetError("Backend closed the connection")
+                continue
+            except BaseException:
+                # Includes cancellation by a timeout or a winning hedge: the stream is mid-response.
+                writer.close()
+                raise
+            if keep_alive and len(self._idle) < self.size:
+                self._idle.append(conn)
+            else:
+                writer.close()
+            if not 200 <= status < 300:
+                raise BackendHTTPError(status, reason)
+            return body
+        raise AssertionError("unreachable")
+
+    def close(self) -> None:
+        while self._idle:
+            self._idle.pop()[1].close()
+
+
+async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, str, bytes, bool]:
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError("Connection closed before the response")
+    version, _, rest = status_line.decode("latin-1").strip().partition(" ")
+    code, _, reason = rest.partition(" ")
+    if not version.startswith("HTTP/") or not code.isdigit():
+        raise http.client.BadStatusLine(status_line.decode("latin-1", "replace"))
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    status = int(code)
+    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0].strip() or b"0", 16)
+            if size == 0:
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        body = b"".join(chunks)
+    elif "content-length" in headers:
+        body = await reader.readexactly(int(headers["content-length"]))
+    elif status in (204, 304) or 100 <= status < 200:
+        body = b""
+    else:
+        body = await reader.read()
+        keep_alive = False
+    return status, reason, body, keep_alive
+
+
+class AsyncResilientHTTPClient(ResilientHTTPClient):
+    # Same retry, hedging and circuit-breaker policy as ResilientHTTPClient, awaited on the event loop
+    # instead of blocking a thread per call.
+    pool_class = AsyncConnectionPool
+
+    async def get(self, path: str, params: Mapping[str, str], key: str = "") -> bytes:  # type: ignore[override]
+        pool, breaker = self._for_key(key)
+        target = self._target(path, params)
+        started = time.perf_counter()
+        try:
+            for attempt in range(self.retries + 1):
+                self._admit(breaker, key)
+                try:
+                    body = await self._hedged(pool, target)
+                except (BackendHTTPError, OSError, http.client.HTTPException) as exc:
+                    error = self._failed(exc, breaker, key)
+                except BaseException:
+                    breaker.abandon()
+                    raise
+                else:
+                    self._succeeded(breaker, key)
+                    return body
+                if attempt < self.retries:
+                    await asyncio.sleep(self._backoff(attempt))
+            raise error
+        finally:
+            BACKEND_SECONDS.observe(time.perf_counter() - started, key=key)
+
+    async def _hedged(self, pool: AsyncConnectionPool, target: str) -> bytes:  # type: ignore[override]
+        tasks = {asyncio.ensure_future(pool.request("GET", target, self.timeout))}
+        try:
+            if self.hedge_after > 0:
+                done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+                if not done:
+                    BACKEND_HEDGES.inc()
+                    tasks.add(asyncio.ensure_future(pool.request("GET", target, self.timeout)))
+            pending = set(tasks)
+            error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            assert error is not None
+            raise error
+        finally:
+            # The loser of a hedge, or both requests if the caller was cancelled.
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import argparse
+import json
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from .config import AppConfig
+from .tokenize import preprocess_for_alignment
+from .vocab import Vocab
+
+NULL_TOKEN = "<null>"
+LEXICAL_FLOOR = 1e-3
+
+
+class ModelError(RuntimeError):
+    pass
+
+
+def read_parallel_corpus(path: Path, keep_empty: bool = False) -> Iterator[Tuple[List[str], List[str]]]:
+    # keep_empty yields ([], []) for unusable lines so output stays line-aligned with the input.
+    with path.open("r", encoding="utf-8") as fh:
+        for line in fh:
+            src, sep, tgt = line.partition("|||")
+            src_tokens = preprocess_for_alignment(src, lowercase=True) if sep else []
+            tgt_tokens = preprocess_for_alignment(tgt, lowercase=True) if sep else []
+            if src_tokens and tgt_tokens:
+                yield src_tokens, tgt_tokens
+            elif keep_empty:
+                yield [], []
+
+
+def distortion_bucket(si: int, ti: int, src_len: int, tgt_len: int, buckets: int) -> int:
+    pos_src = (si + 1) / (src_len + 1)
+    pos_tgt = (ti + 1) / (tgt_len + 1)
+    return max(-buckets, min(buckets, int(round((pos_src - pos_tgt) * buckets))))
+
+
+@dataclass
+class LexicalModel:
+    source_language: str
+    target_language: str
+    src_vocab: Vocab
+    tgt_vocab: Vocab
+    # Sparse t(t|s) table: source id -> {target id: probability}.
+    t_table: Dict[int, Dict[int, float]]
+    distortion: Dict[int, float] = field(default_factory=dict)
+    distortion_buckets: int = 10
+    null_prob: float = 0.0
+    model: int = 1
+
+    def translation_prob(self, s_tok: str, t_tok: str) -> float:
+        s_id = self.src_vocab.get(s_tok)
+        t_id = self.tgt_vocab.get(t_tok)
+        if s_id is None or t_id is None:
+            return 0.0
+        return self.t_table.get(s_id, {}).get(t_id, 0.0)
+
+    def score_cells(
+        self,
+        source_tokens: List[str],
+        target_tokens: List[str],
+        cells: Iterable[Tuple[int, int]],
+    ) -> List[float]:
+        # Smoothed t(t|s) * a(i|j) weights for the given (si, ti) cells of one sentence pair.
+        src_n = len(source_tokens)
+        tgt_n = len(target_tokens)
+        s_ids = self.src_vocab.encode(source_tokens, add=False).tolist()
+        t_ids = self.tgt_vocab.encode(target_tokens, add=False).tolist()
+        use_distortion = self.model == 2 and bool(self.distortion)
+        weights: List[float] = []
+        for si, ti in cells:
+            weight = LEXICAL_FLOOR + self.t_table.get(s_ids[si], {}).get(t_ids[ti], 0.0)
+            if use_distortion:
+                bucket = distortion_bucket(si, ti, src_n, tgt_n, self.distortion_buckets)
+                weight *= self.distortion.get(bucket, 0.0) + LEXICAL_FLOOR
+            weights.append(weight)
+        return weights
+
+    def score_matrix(self, source_tokens: List[str], target_tokens: List[str]) -> List[List[float]]:
+        # Full n x m version of score_cells, indexed [si][ti].
+        tgt_n = len(target_tokens)
+        flat = self.score_cells(
+            source_tokens,
+            target_tokens,
+            ((si, ti) for si in range(len(source_tokens)) for ti in range(tgt_n)),
+        )
+        return [flat[i:i + tgt_n] for i in range(0, len(flat), tgt_n)] if tgt_n else [[] for _ in source_tokens]
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        s_ids: List[int] = []
+        t_ids: List[int] = []
+        probs: List[float] = []
+        for s_id, row in self.t_table.items():
+            for t_id, prob in row.items():
+                s_ids.append(s_id)
+                t_ids.append(t_id)
+                probs.append(prob)
+        meta = {
+            "source_language": self.source_language,
+            "target_language": self.target_language,
+            "model": self.model,
+            "distortion_buckets": self.distortion_buckets,
+            "null_prob": self.null_prob,
+            "distortion": {str(k): v for k, v in self.distortion.items()},
+        }
+        with path.open("wb") as fh:
+            np.savez_compressed(
+                fh,
+                src_vocab=np.array(self.src_vocab.tokens, dtype=str),
+                tgt_vocab=np.array(self.tgt_vocab.tokens, dtype=str),
+                s_ids=np.array(s_ids, dtype=np.int32),
+                t_ids=np.array(t_ids, dtype=np.int32),
+                probs=np.array(probs, dtype=np.float64),  # float64 so a loaded model scores exactly as trained
+                meta=np.array(json.dumps(meta)),
+            )
+
+    @staticmethod
+    def load(path: Path) -> "LexicalModel":
+        if not path.exists():
+            raise ModelError(f"Lexical model not found: {path}")
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            src_vocab = Vocab(data["src_vocab"].tolist())
+            tgt_vocab = Vocab(data["tgt_vocab"].tolist())
+            t_table: Dict[int, Dict[int, float]] = defaultdict(dict)
+            for s_id, t_id, prob in zip(data["s_ids"].tolist(), data["t_ids"].tolist(), data["probs"].tolist()):
+                t_table[s_id][t_id] = prob
+        return LexicalModel(
+            source_language=meta["source_language"],
+            target_language=meta["target_language"],
+            src_vocab=src_vocab,
+            tgt_vocab=tgt_vocab,
+            t_table=dict(t_table),
+            distortion={int(k): v for k, v in meta.get("distortion", {}).items()},
+            distortion_buckets=int(meta.get("distortion_buckets", 10)),
+            null_prob=float(meta.get("null_prob", 0.0)),
+            model=int(meta.get("model", 1)),
+        )
+
+
+def _initial_table(pairs: Iterable[Tuple[List[str], List[str]]], src_vocab: Vocab, tgt_vocab: Vocab) -> Dict[int, Dict[int, float]]:
+    null_id = src_vocab.add(NULL_TOKEN)
+    cooc: Dict[int, Dict[int, float]] = defaultdict(dict)
+    for src_tokens, tgt_tokens in pairs:
+        s_ids = [null_id] + src_vocab.encode(src_tokens).tolist()
+        t_ids = tgt_vocab.encode(tgt_tokens).tolist()
+        for s_id in s_ids:
+            row = cooc[s_id]
+            for t_id in t_ids:
+                row[t_id] = 1.0
+    for row in cooc.values():
+        uniform = 1.0 / len(row)
+        for t_id in row:
+            row[t_id] = uniform
+    return dict(cooc)
+
+
+def train_ibm_model(
+    corpus_path: Path,
+    source_language: str,
+    target_language: str,
+    model: int = 1,
+    iterations: int = 5,
+    model1_iterations: int | None = None,
+    distortion_buckets: int = 10,
+    prune_threshold: float = 1e-6,
+) -> LexicalModel:
+    # Every EM iteration re-reads the corpus from disk, so memory is bounded by
+    # the sparse t-table rather than by the number of sentence pairs.
+    if model not in (1, 2):
+        raise ModelError(f"Unsupported IBM model: {model}")
+
+    src_vocab = Vocab()
+    tgt_vocab = Vocab()
+    t_table = _initial_table(read_parallel_corpus(corpus_path), src_vocab, tgt_vocab)
+    if not t_table:
+        raise ModelError(f"No usable sentence pairs in {corpus_path}")
+    null_id = src_vocab.get(NULL_TOKEN)
+
+    if model1_iterations is None:
+        model1_iterations = iterations if model == 1 else max(1, iterations // 2)
+    distortion: Dict[int, float] = {}
+    null_weight = 1.0
+
+    for iteration in range(max(1, iterations)):
+        use_distortion = model == 2 and iteration >= model1_iterations
+        counts: Dict[int, Dict[int, float]] = defaultdict(lambda: defaultdict(float))
+        totals: Dict[int, float] = defaultdict(float)
+        dist_counts: Dict[int, float] = defaultdict(float)
+        null_count = 0.0
+        link_count = 0.0
+
+        for src_tokens, tgt_tokens in read_parallel_corpus(corpus_path):
+            s_ids = [null_id] + src_vocab.encode(src_tokens, add=False).tolist()
+            src_n = len(src_tokens)
+            tgt_n = len(tgt_tokens)
+            for ti, t_id in enumerate(tgt_vocab.encode(tgt_tokens, add=False).tolist()):
+                weights = []
+                for pos, s_id in enumerate(s_ids):
+                    weight = t_table[s_id].get(t_id, 0.0)
+                    if use_distortion:
+                        if pos == 0:
+                            weight *= null_weight
+                        else:
+                            bucket = distortion_bucket(pos - 1, ti, src_n, tgt_n, distortion_buckets)
+                            weight *= distortion.get(bucket, LEXICAL_FLOOR)
+                    weights.append(weight)
+                z = sum(weights)
+                if z <= 0.0:
+                    continue
+                for pos, s_id in enumerate(s_ids):
+                    posterior = weights[pos] / z
+                    if posterior <= 0.0:
+                        continue
+                    counts[s_id][t_id] += posterior
+                    totals[s_id] += posterior
+                    link_count += posterior
+                    if pos == 0:
+                        null_count += posterior
+                    else:
+                        dist_counts[distortion_bucket(pos - 1, ti, src_n, tgt_n, distortion_buckets)] += posterior
+
+        new_table: Dict[int, Dict[int, float]] = {}
+        for s_id, row in counts.items():
+            total = totals[s_id]
+            kept = {t_id: c / total for t_id, c in row.items() if c / total >= prune_threshold}
+            new_table[s_id] = kept or {max(row, key=row.get): 1.0}
+        t_table = new_table
+
+        if model == 2 and link_count > 0:
+            aligned = link_count - null_count
+            if aligned > 0:
+                # a(i|j) is renormalized per target position, so bucket weights only need to be relative.
+                distortion = {b: c / aligned for b, c in dist_counts.items()}
+            null_weight = max(LEXICAL_FLOOR, null_count / link_count)
+
+    return LexicalModel(
+        source_language=source_language,
+        target_language=target_language,
+        src_vocab=src_vocab,
+        tgt_vocab=tgt_vocab,
+        t_table=t_table,
+        distortion=distortion,
+        distortion_buckets=distortion_buckets,
+        null_prob=null_weight if model == 2 else 0.0,
+        model=model,
+    )
+
+
+def main(argv: List[str] | None = None) -> None:
+    cfg = AppConfig.from_env()
+    parser = argparse.ArgumentParser(description="Train an IBM Model 1/2 lexical table from a 'src ||| tgt' corpus.")
+    parser.add_argument("corpus", type=Path)
+    parser.add_argument("--target-language", required=True)
+    parser.add_argument("--source-language", default=cfg.source_language)
+    parser.add_argument("--model", type=int, choices=(1, 2), default=1)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--prune-threshold", type=float, default=1e-6)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args(argv)
+
+    model = train_ibm_model(
+        args.corpus,
+        source_language=args.source_language.lower(),
+        target_language=args.target_language.lower(),
+        model=args.model,
+        iterations=args.iterations,
+        prune_threshold=args.prune_threshold,
+    )
+    out = args.output or cfg.lexical_model_for(model.target_language, model.source_language)
+    model.save(out)
+    entries = sum(len(row) for row in model.t_table.values())
+    print(f"Saved IBM Model {model.model} ({entries} t-table entries) to {out}")
+
+
+if __name__ == "__main__":
+    main()
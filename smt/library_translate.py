@@ -1,32 +1,74 @@
 from __future__ import annotations
 
+import html
+import re
+
+from .config import AppConfig
+from .http_client import AsyncResilientHTTPClient, BackendError, ResilientHTTPClient
+
+# Google's no-JavaScript page (the one deep-translator scraped) puts the translation in this div.
+_RESULT_RE = re.compile(r'<div[^>]*class="(?:t0|result-container)"[^>]*>(.*?)</div>', re.S)
+_TAG_RE = re.compile(r"<[^>]+>")
+
 
 class LibraryTranslationError(RuntimeError):
     pass
 
 
+def parse_result_page(body: bytes) -> str:
+    match = _RESULT_RE.search(body.decode("utf-8", "replace"))
+    if match is None:
+        return ""
+    return html.unescape(_TAG_RE.sub("", match.group(1))).strip()
+
+
 class LibrarySentenceTranslator:
-    def __init__(self, source_language: str) -> None:
+    def __init__(
+        self,
+        source_language: str,
+        client: ResilientHTTPClient | None = None,
+        async_client: AsyncResilientHTTPClient | None = None,
+    ) -> None:
         self.source_language = source_language
+        self.client = client or ResilientHTTPClient("https://translate.google.com")
+        # Used by the ASGI app's event loop; same endpoint and policy, separate pools.
+        self.async_client = async_client or AsyncResilientHTTPClient(self.client.endpoint)
         self.backend = "google-translator"
 
+    @staticmethod
+    def from_config(cfg: AppConfig) -> "LibrarySentenceTranslator":
+        return LibrarySentenceTranslator(
+            cfg.source_language,
+            ResilientHTTPClient.from_config(cfg),
+            AsyncResilientHTTPClient.from_config(cfg),
+        )
+
+    def _params(self, sentence: str, target_language: str) -> dict:
+        return {"sl": self.source_language, "tl": target_language, "q": sentence}
+
     def translate(self, sentence: str, target_language: str) -> str:
         try:
-            from deep_translator import GoogleTranslator  # type: ignore
-        except Exception as exc:
-            raise LibraryTranslationError(
-                "deep-translator is not available. Install dependencies from requirements.txt."
-            ) from exc
+            body = self.client.get("/m", self._params(sentence, target_language), key=target_language)
+        except BackendError as exc:
+            raise _failed(exc) from exc
+        return _translated(body)
 
+    async def translate_async(self, sentence: str, target_language: str) -> str:
         try:
-            translated = GoogleTranslator(source=self.source_language, target=target_language).translate(sentence)
-            translated = (translated or "").strip()
-            if translated:
-                self.backend = "google-translator"
-                return translated
-        except Exception as exc:
-            raise LibraryTranslationError(
-                "Google translation failed. Verify language codes and internet connectivity."
-            ) from exc
-
-        raise LibraryTranslationError("Google translation returned empty output.")
+            body = await self.async_client.get("/m", self._params(sentence, target_language), key=target_language)
+        except BackendError as exc:
+            raise _failed(exc) from exc
+        return _translated(body)
+
+
+def _failed(exc: BackendError) -> LibraryTranslationError:
+    return LibraryTranslationError(
+        f"Google translation failed ({exc}). Verify language codes and internet connectivity."
+    )
+
+
+def _translated(body: bytes) -> str:
+    translated = parse_result_page(body)
+    if translated:
+        return translated
+    raise LibraryTranslationError("Google translation returned empty output.")
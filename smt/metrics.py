@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import cProfile
+import itertools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LENGTH_BUCKETS = (10, 50, 200, 1000)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def length_bucket(n_tokens: int) -> str:
+    for bound in LENGTH_BUCKETS:
+        if n_tokens <= bound:
+            return f"le{bound}"
+    return f"gt{LENGTH_BUCKETS[-1]}"
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _render_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    items = key + extra
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # label key -> (per-bucket counts, +Inf count, sum)
+        self._series: Dict[LabelKey, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _label_key(labels)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[idx] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._series.items()}
+        for key, series in sorted(snapshot.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_render_labels(key, (('le', repr(bound)),))} {cumulative:g}")
+            cumulative += series[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_render_labels(key, (('le', '+Inf'),))} {cumulative:g}")
+            lines.append(f"{self.name}_sum{_render_labels(key)} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{_render_labels(key)} {cumulative:g}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._values)
+        for key, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{_render_labels(key)} {value:g}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Histogram | Counter] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Histogram(name, help_text, buckets)
+            return metric  # type: ignore[return-value]
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Counter(name, help_text)
+            return metric  # type: ignore[return-value]
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram("smt_stage_seconds", "Time spent in each translation/alignment stage.")
+REQUEST_SECONDS = REGISTRY.histogram("smt_request_seconds", "End-to-end HTTP request latency.")
+STARTUP_SECONDS = REGISTRY.histogram("smt_startup_seconds", "Worker startup time by phase (create_app, warm-up steps).")
+
+
+class StageTimer:
+    # Collects per-stage durations for one request; cheap enough to leave on for every request.
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.labels: Dict[str, str] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total: Optional[float] = None) -> str:
+        parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages.items()]
+        if total is not None:
+            parts.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+    def record(self) -> None:
+        labels = {
+            "target_language": self.labels.get("target_language", "none"),
+            "length_bucket": self.labels.get("length_bucket", "none"),
+        }
+        for name, seconds in self.stages.items():
+            STAGE_SECONDS.observe(seconds, stage=name, **labels)
+
+
+@contextmanager
+def maybe_stage(timer: Optional[StageTimer], name: str) -> Iterator[None]:
+    if timer is None:
+        yield
+    else:
+        with timer.stage(name):
+            yield
+
+
+class SamplingProfiler:
+    # Profiles one request out of every `every` and dumps a .prof file readable by pstats/snakeviz.
+    def __init__(self, every: int, out_dir: Path) -> None:
+        self.every = every
+        self.out_dir = out_dir
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start(self) -> Optional[cProfile.Profile]:
+        if self.every <= 0:
+            return None
+        with self._lock:
+            n = next(self._counter)
+        if n % self.every:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already active on this thread.
+            return None
+        return profile
+
+    def stop(self, profile: Optional[cProfile.Profile], label: str) -> Optional[Path]:
+        if profile is None:
+            return None
+        profile.disable()
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        safe_label = "".join(c if c.isalnum() else "_" for c in label)
+        path = self.out_dir / f"{time.strftime('%Y%m%d-%H%M%S')}-{threading.get_ident()}-{safe_label}.prof"
+        profile.dump_stats(str(path))
+        return path
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import queue
+import subprocess
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, List
+
+from .cache import file_version
+from .config import AppConfig
+from .tokenize import detokenize, preprocess_for_alignment
+from .toolkit import ToolkitError
+
+# Longest wait between restarts of a worker whose decoder keeps failing.
+MAX_RESTART_BACKOFF = 30.0
+
+
+class MosesPoolBusy(ToolkitError):
+    pass
+
+
+class MosesWorker:
+    # One long-lived `moses -f moses.ini` process fed one sentence per line over stdin.
+    def __init__(self, moses_bin: str, moses_ini: Path, timeout: float = 30.0, backoff: float = 0.5) -> None:
+        self.moses_bin = moses_bin
+        self.moses_ini = moses_ini
+        self.timeout = timeout
+        self.backoff = backoff
+        self.restarts = 0
+        self.decoded = 0
+        self._failures = 0  # consecutive failed runs; reset by a successful decode
+        self._start_after = 0.0
+        self._proc: subprocess.Popen[str] | None = None
+        self._lines: "queue.Queue[str | None]" = queue.Queue()
+        self._stderr_tail: Deque[str] = deque(maxlen=20)
+        self.start()
+
+    def start(self) -> None:
+        self._lines = queue.Queue()
+        self._proc = subprocess.Popen(
+            [self.moses_bin, "-f", str(self.moses_ini)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+        )
+        threading.Thread(target=self._pump_stdout, args=(self._proc, self._lines), daemon=True).start()
+        threading.Thread(target=self._pump_stderr, args=(self._proc,), daemon=True).start()
+
+    @staticmethod
+    def _pump_stdout(proc: subprocess.Popen[str], lines: "queue.Queue[str | None]") -> None:
+        assert proc.stdout is not None
+        for line in proc.stdout:
+            lines.put(line)
+        lines.put(None)
+
+    def _pump_stderr(self, proc: subprocess.Popen[str]) -> None:
+        # Moses logs heavily to stderr; drain it so the pipe never fills and blocks the decoder.
+        assert proc.stderr is not None
+        for line in proc.stderr:
+            self._stderr_tail.append(line.rstrip())
+
+    def is_alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def stop(self) -> None:
+        if self._proc is None:
+            return
+        if self._proc.poll() is None:
+            self._proc.kill()
+        self._proc.wait()
+        self._proc = None
+
+    def restart(self) -> None:
+        # The first failure is replaced at once; after that each consecutive one doubles the wait before
+        # the next start (from `backoff` up to MAX_RESTART_BACKOFF seconds), so a decoder that crashes on
+        # load is not respawned in a tight loop. Nothing sleeps: the start happens in revive().
+        self.stop()
+        self.restarts += 1
+        self._failures += 1
+        delay = 0.0 if self._failures == 1 else min(MAX_RESTART_BACKOFF, self.backoff * 2 ** (self._failures - 2))
+        self._start_after = time.monotonic() + delay
+        if delay <= 0:
+            self.start()
+
+    def revive(self) -> bool:
+        # Replaces a dead process, or starts a stopped one whose backoff has passed; True if running.
+        if self.is_alive():
+            return True
+        if self._proc is not None:
+            self.restart()
+        elif time.monotonic() >= self._start_after:
+            self.start()
+        return self.is_alive()
+
+    def decode(self, sentence: str, timeout: float | None = None) -> str:
+        if not self.revive():
+            wait = max(0.0, self._start_after - time.monotonic())
+            raise ToolkitError(f"Moses worker failed {self._failures} times in a row; next start in {wait:.1f}s")
+        assert self._proc is not None and self._proc.stdin is not None
+        line = " ".join(sentence.split())
+        try:
+            self._proc.stdin.write(line + "\n")
+            self._proc.stdin.flush()
+            out = self._lines.get(timeout=timeout or self.timeout)
+        except (BrokenPipeError, OSError) as exc:
+            self.restart()
+            raise ToolkitError(f"Moses worker pipe failed: {exc}") from exc
+        except queue.Empty as exc:
+            # The decoder is now out of step with its input; replace it rather than read a stale line later.
+            self.restart()
+            raise ToolkitError(f"Moses decode timed out after {timeout or self.timeout:g}s") from exc
+        if out is None:
+            detail = "\n".join(self._stderr_tail)
+            self.restart()
+            raise ToolkitError(f"Moses worker exited unexpectedly.\n{detail}".strip())
+        self.decoded += 1
+        self._failures = 0
+        return out.strip()
+
+
+class _LanguagePool:
+    def __init__(
+        self, moses_bin: str, moses_ini: Path, workers: int, queue_size: int, timeout: float, backoff: float
+    ) -> None:
+        self.model = file_version(moses_ini)
+        self.workers: List[MosesWorker] = [
+            MosesWorker(moses_bin, moses_ini, timeout, backoff) for _ in range(max(1, workers))
+        ]
+        self.idle: "queue.Queue[MosesWorker]" = queue.Queue()
+        for worker in self.workers:
+            self.idle.put(worker)
+        # Bounds in-flight plus waiting requests; beyond that callers fail fast instead of piling up.
+        self.admission = threading.BoundedSemaphore(len(self.workers) + max(0, queue_size))
+        self.timeout = timeout
+
+
+class MosesDecoderPool:
+    def __init__(
+        self,
+        moses_bin: str,
+        cfg: AppConfig,
+        workers: int = 2,
+        queue_size: int = 32,
+        timeout: float = 30.0,
+        restart_backoff: float = 0.5,
+    ) -> None:
+        self.moses_bin = moses_bin
+        self.cfg = cfg
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.restart_backoff = restart_backoff
+        self._pools: Dict[str, _LanguagePool] = {}
+        self._lock = threading.Lock()
+        self._health_thread: threading.Thread | None = None
+        self._closed = threading.Event()
+
+    def _ini_for(self, target_language: str) -> Path:
+        moses_ini = self.cfg.moses_ini_for(target_language)
+        if not moses_ini.exists():
+            raise ToolkitError(f"No Moses configuration for '{target_language}': {moses_ini}")
+        return moses_ini
+
+    def _pool_for(self, target_language: str) -> _LanguagePool:
+        with self._lock:
+            pool = self._pools.get(target_language)
+            if pool is None:
+                moses_ini = self._ini_for(target_language)
+                pool = _LanguagePool(
+                    self.moses_bin, moses_ini, self.workers, self.queue_size, self.timeout, self.restart_backoff
+                )
+                self._pools[target_language] = pool
+            return pool
+
+    def model_version(self, target_language: str) -> str:
+        # The configuration the language's workers were started with, or will be; starts nothing.
+        with self._lock:
+            pool = self._pools.get(target_language)
+        return pool.model if pool is not None else file_version(self._ini_for(target_language))
+
+    def decode(self, sentence: str, target_language: str) -> str:
+        pool = self._pool_for(target_language)
+        if not pool.admission.acquire(blocking=False):
+            raise MosesPoolBusy(f"Moses request queue for '{target_language}' is full")
+        try:
+            try:
+                worker = pool.idle.get(timeout=pool.timeout)
+            except queue.Empty as exc:
+                raise MosesPoolBusy(f"No Moses worker for '{target_language}' became free in {pool.timeout:g}s") from exc
+            try:
+                return worker.decode(sentence)
+            finally:
+                pool.idle.put(worker)
+        finally:
+            pool.admission.release()
+
+    def health_check(self) -> Dict[str, dict]:
+        report: Dict[str, dict] = {}
+        with self._lock:
+            pools = dict(self._pools)
+        for lang, pool in pools.items():
+            alive = 0
+            for worker in pool.workers:
+                if worker.is_alive():
+                    alive += 1
+            report[lang] = {
+                "workers": len(pool.workers),
+                "alive": alive,
+                "idle": pool.idle.qsize(),
+                "restarts": sum(w.restarts for w in pool.workers),
+                "decoded": sum(w.decoded for w in pool.workers),
+            }
+        return report
+
+    def _restart_dead_workers(self) -> None:
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            # Only touch idle workers; a busy worker restarts itself if its process dies mid-request.
+            for _ in range(pool.idle.qsize()):
+                try:
+                    worker = pool.idle.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    worker.revive()
+                finally:
+                    pool.idle.put(worker)
+
+    def start_health_checks(self, interval: float = 10.0) -> None:
+        if self._health_thread is not None:
+            return
+
+        def loop() -> None:
+            while not self._closed.wait(interval):
+                self._restart_dead_workers()
+
+        self._health_thread = threading.Thread(target=loop, name="moses-health", daemon=True)
+        self._health_thread.start()
+
+    def close(self) -> None:
+        self._closed.set()
+        with self._lock:
+            for pool in self._pools.values():
+                for worker in pool.workers:
+                    worker.stop()
+            self._pools.clear()
+
+
+class MosesSentenceTranslator:
+    def __init__(self, source_language: str, pool: MosesDecoderPool) -> None:
+        self.source_language = source_language
+        self.pool = pool
+        self.backend = "moses"
+
+    @staticmethod
+    def from_config(cfg: AppConfig) -> "MosesSentenceTranslator":
+        if not cfg.moses_path:
+            raise ToolkitError("MOSES_BIN must be set to use the Moses translation backend.")
+        pool = MosesDecoderPool(
+            cfg.moses_path,
+            cfg,
+            workers=cfg.moses_workers,
+            queue_size=cfg.moses_queue_size,
+            timeout=cfg.moses_timeout,
+            restart_backoff=cfg.moses_restart_backoff,
+        )
+        pool.start_health_checks()
+        return MosesSentenceTranslator(cfg.source_language, pool)
+
+    def warm_up(self, target_language: str) -> None:
+        self.pool._pool_for(target_language)
+
+    def model_id(self, target_language: str) -> str:
+        return f"{self.backend}:{self.pool.model_version(target_language)}"
+
+    def translate(self, sentence: str, target_language: str) -> str:
+        tokens = preprocess_for_alignment(sentence, lowercase=True)
+        decoded = self.pool.decode(" ".join(tokens), target_language)
+        if not decoded:
+            raise ToolkitError("Moses returned empty output.")
+        return detokenize(decoded.split())
@@ -0,0 +1,344 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import heapq
+import tempfile
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from itertools import groupby
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from .alignment import AlignmentLinks, extract_phrase_spans
+from .config import AppConfig
+from .ibm_model import read_parallel_corpus
+
+NULL_WORD = "NULL"
+# Rough per-line bookkeeping overhead of a Python str in the sort buffer.
+_LINE_OVERHEAD = 64
+# Rough cost of one vocabulary entry (str object plus dict slot) in the lexical table.
+_VOCAB_OVERHEAD = 100
+
+
+class PhraseTableError(RuntimeError):
+    pass
+
+
+class ExternalSorter:
+    # Buffers lines up to a memory budget, spills sorted runs to disk and k-way merges them back.
+    def __init__(self, tmp_dir: Path, memory_budget: int) -> None:
+        self.tmp_dir = tmp_dir
+        self.memory_budget = max(1 << 16, memory_budget)
+        self._buffer: List[str] = []
+        self._buffered_bytes = 0
+        self._runs: List[Path] = []
+
+    def add(self, line: str) -> None:
+        self._buffer.append(line)
+        self._buffered_bytes += len(line) + _LINE_OVERHEAD
+        if self._buffered_bytes >= self.memory_budget:
+            self._spill()
+
+    def _spill(self) -> None:
+        if not self._buffer:
+            return
+        self._buffer.sort()
+        run = self.tmp_dir / f"run{len(self._runs):05d}.txt"
+        with run.open("w", encoding="utf-8") as fh:
+            fh.writelines(self._buffer)
+        self._runs.append(run)
+        self._buffer = []
+        self._buffered_bytes = 0
+
+    def sorted_lines(self) -> Iterator[str]:
+        if not self._runs:
+            self._buffer.sort()
+            yield from self._buffer
+            self._buffer = []
+            return
+        self._spill()
+        handles = [run.open("r", encoding="utf-8") for run in self._runs]
+        try:
+            yield from heapq.merge(*handles)
+        finally:
+            for fh in handles:
+                fh.close()
+            for run in self._runs:
+                run.unlink(missing_ok=True)
+            self._runs = []
+
+
+def iter_aligned_corpus(corpus_path: Path, alignment_path: Path) -> Iterator[Tuple[List[str], List[str], AlignmentLinks]]:
+    with alignment_path.open("r", encoding="utf-8") as align_fh:
+        for (src_tokens, tgt_tokens), line in zip(read_parallel_corpus(corpus_path, keep_empty=True), align_fh):
+            yield src_tokens, tgt_tokens, AlignmentLinks.from_pairs(_parse_links(line))
+
+
+class LexicalTable:
+    # w(t|s) and w(s|t) for every aligned word pair: the pair keys ((src id << 32) | tgt id) sorted in one
+    # array with both probabilities in parallel arrays, 24 bytes a pair plus the two vocabularies, instead
+    # of two dicts of tuples. Its size is known, so the build can charge it against its memory budget.
+    def __init__(self, src_vocab: Dict[str, int], tgt_vocab: Dict[str, int], keys: array, t_given_s: array, s_given_t: array) -> None:
+        self.src_vocab = src_vocab
+        self.tgt_vocab = tgt_vocab
+        self.keys = keys
+        self.t_given_s_probs = t_given_s
+        self.s_given_t_probs = s_given_t
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def nbytes(self) -> int:
+        vocab = sum(len(word) + _VOCAB_OVERHEAD for word in self.src_vocab) + sum(
+            len(word) + _VOCAB_OVERHEAD for word in self.tgt_vocab
+        )
+        return vocab + len(self.keys) * (self.keys.itemsize + 2 * self.t_given_s_probs.itemsize)
+
+    def _find(self, s: str, t: str) -> int:
+        si = self.src_vocab.get(s)
+        ti = self.tgt_vocab.get(t)
+        if si is None or ti is None:
+            return -1
+        key = (si << 32) | ti
+        i = bisect_left(self.keys, key)
+        return i if i < len(self.keys) and self.keys[i] == key else -1
+
+    def t_given_s(self, s: str, t: str) -> float:
+        i = self._find(s, t)
+        return self.t_given_s_probs[i] if i >= 0 else 0.0
+
+    def s_given_t(self, s: str, t: str) -> float:
+        i = self._find(s, t)
+        return self.s_given_t_probs[i] if i >= 0 else 0.0
+
+
+def word_translation_tables(corpus_path: Path, alignment_path: Path, tmp_dir: Path, memory_budget: int) -> LexicalTable:
+    # w(t|s) and w(s|t) from word-alignment counts; unaligned words count against NULL. Link occurrences
+    # are counted through an external sort, so only the vocabularies and the final table stay in memory.
+    occurrences = ExternalSorter(tmp_dir, memory_budget)
+    for src_tokens, tgt_tokens, points in iter_aligned_corpus(corpus_path, alignment_path):
+        aligned_src = set()
+        aligned_tgt = set()
+        for si, ti in points.pairs():
+            if si >= len(src_tokens) or ti >= len(tgt_tokens):
+                continue
+            occurrences.add(f"{src_tokens[si]}\t{tgt_tokens[ti]}\n")
+            aligned_src.add(si)
+            aligned_tgt.add(ti)
+        for si, s in enumerate(src_tokens):
+            if si not in aligned_src:
+                occurrences.add(f"{s}\t{NULL_WORD}\n")
+        for ti, t in enumerate(tgt_tokens):
+            if ti not in aligned_tgt:
+                occurrences.add(f"{NULL_WORD}\t{t}\n")
+
+    src_vocab: Dict[str, int] = {}
+    tgt_vocab: Dict[str, int] = {}
+    src_counts = array("q")
+    tgt_counts = array("q")
+    keys = array("q")
+    counts = array("q")
+    for line, run in groupby(occurrences.sorted_lines()):
+        s, t = line.rstrip("\n").split("\t")
+        c = sum(1 for _ in run)
+        si = src_vocab.setdefault(s, len(src_vocab))
+        if si == len(src_counts):
+            src_counts.append(0)
+        ti = tgt_vocab.setdefault(t, len(tgt_vocab))
+        if ti == len(tgt_counts):
+            tgt_counts.append(0)
+        src_counts[si] += c
+        tgt_counts[ti] += c
+        keys.append((si << 32) | ti)
+        counts.append(c)
+
+    # Source ids follow the sort, target ids do not: order the pairs by key for bisect lookups.
+    key_arr = np.frombuffer(keys, dtype=np.int64)
+    order = np.argsort(key_arr, kind="stable")
+    sorted_keys = key_arr[order]
+    sorted_counts = np.frombuffer(counts, dtype=np.int64)[order]
+    t_given_s = sorted_counts / np.frombuffer(src_counts, dtype=np.int64)[sorted_keys >> 32]
+    s_given_t = sorted_counts / np.frombuffer(tgt_counts, dtype=np.int64)[sorted_keys & 0xFFFFFFFF]
+    return LexicalTable(
+        src_vocab,
+        tgt_vocab,
+        array("q", sorted_keys.tobytes()),
+        array("d", t_given_s.tobytes()),
+        array("d", s_given_t.tobytes()),
+    )
+
+
+def lexical_weight(
+    src_words: List[str],
+    tgt_words: List[str],
+    links: List[Tuple[int, int]],
+    w_t_given_s: Callable[[str, str], float],
+) -> float:
+    # Koehn et al. (2003): average w(t|s) over each target word's links, NULL for unaligned words.
+    by_tgt: Dict[int, List[int]] = defaultdict(list)
+    for si, ti in links:
+        by_tgt[ti].append(si)
+    score = 1.0
+    for ti, t in enumerate(tgt_words):
+        sources = by_tgt.get(ti)
+        if not sources:
+            score *= w_t_given_s(NULL_WORD, t)
+        else:
+            score *= sum(w_t_given_s(src_words[si], t) for si in sources) / len(sources)
+    return score
+
+
+def _parse_links(field: str) -> List[Tuple[int, int]]:
+    links = []
+    for item in field.split():
+        si, _, ti = item.partition("-")
+        links.append((int(si), int(ti)))
+    return links
+
+
+def _groups(lines: Iterator[str], key_fields: int) -> Iterator[Tuple[Tuple[str, ...], List[List[str]]]]:
+    current: Tuple[str, ...] | None = None
+    group: List[List[str]] = []
+    for line in lines:
+        fields = line.rstrip("\n").split("\t")
+        key = tuple(fields[:key_fields])
+        if key != current:
+            if group:
+                yield current, group  # type: ignore[misc]
+            current, group = key, []
+        group.append(fields)
+    if group:
+        yield current, group  # type: ignore[misc]
+
+
+def build_phrase_table(
+    corpus_path: Path,
+    alignment_path: Path,
+    out_path: Path,
+    max_phrase_len: int = 4,
+    memory_budget_mb: float = 256.0,
+    extend_unaligned: bool = True,
+    min_count: int = 1,
+) -> dict:
+    budget = int(memory_budget_mb * 1024 * 1024)
+    stats = {"sentences": 0, "extracted": 0, "phrase_pairs": 0}
+
+    with tempfile.TemporaryDirectory(prefix="smt-phrases-") as tmp:
+        tmp_dir = Path(tmp)
+        (tmp_dir / "lex").mkdir()
+        lex = word_translation_tables(corpus_path, alignment_path, tmp_dir / "lex", budget)
+        stats["lexical_pairs"] = len(lex)
+        stats["lexical_bytes"] = lex.nbytes
+        # The lexical table stays resident for the whole build, so each sort stage spills to disk once
+        # its buffer reaches what is left of the budget.
+        budget = max(0, budget - lex.nbytes)
+        by_src = ExternalSorter(tmp_dir / "src", budget)
+        by_tgt = ExternalSorter(tmp_dir / "tgt", budget)
+        final = ExternalSorter(tmp_dir / "final", budget)
+        for sorter in (by_src, by_tgt, final):
+            sorter.tmp_dir.mkdir()
+
+        # 1. Extract "src \t tgt \t phrase-internal links" records.
+        for src_tokens, tgt_tokens, points in iter_aligned_corpus(corpus_path, alignment_path):
+            stats["sentences"] += 1
+            spans = extract_phrase_spans(
+                len(src_tokens),
+                len(tgt_tokens),
+                points,
+                max_phrase_len=max_phrase_len,
+                extend_unaligned=extend_unaligned,
+            )
+            links = list(points.pairs())
+            for s_start, s_end, t_start, t_end in spans:
+                inner = " ".join(
+                    f"{si - s_start}-{ti - t_start}"
+                    for si, ti in links
+                    if s_start <= si <= s_end and t_start <= ti <= t_end
+                )
+                by_src.add(
+                    f"{' '.join(src_tokens[s_start:s_end + 1])}\t{' '.join(tgt_tokens[t_start:t_end + 1])}\t{inner}\n"
+                )
+                stats["extracted"] += 1
+
+        # 2. Grouped by source phrase: c(s), p(t|s) and both lexical weights.
+        for (src,), rows in _groups(by_src.sorted_lines(), 1):
+            pair_counts: Counter = Counter()
+            pair_links: Dict[str, Counter] = defaultdict(Counter)
+            for _, tgt, inner in rows:
+                pair_counts[tgt] += 1
+                pair_links[tgt][inner] += 1
+            c_s = sum(pair_counts.values())
+            src_words = src.split()
+            for tgt, c_st in pair_counts.items():
+                inner = pair_links[tgt].most_common(1)[0][0]
+                links = _parse_links(inner)
+                tgt_words = tgt.split()
+                lex_t_s = lexical_weight(src_words, tgt_words, links, lex.t_given_s)
+                lex_s_t = lexical_weight(
+                    tgt_words,
+                    src_words,
+                    [(ti, si) for si, ti in links],
+                    lambda t, s: lex.s_given_t(s, t),
+                )
+                by_tgt.add(f"{tgt}\t{src}\t{c_st}\t{c_s}\t{c_st / c_s:.6g}\t{lex_t_s:.6g}\t{lex_s_t:.6g}\t{inner}\n")
+
+        # 3. Grouped by target phrase: c(t) and p(s|t); re-sort by source for the final table.
+        for (tgt,), rows in _groups(by_tgt.sorted_lines(), 1):
+            c_t = sum(int(r[2]) for r in rows)
+            for _, src, c_st, c_s, p_t_s, lex_t_s, lex_s_t, inner in rows:
+                if int(c_st) < min_count:
+                    continue
+                p_s_t = int(c_st) / c_t
+                final.add(
+                    f"{src} ||| {tgt} ||| {p_s_t:.6g} {lex_s_t} {p_t_s} {lex_t_s} ||| {inner} ||| {c_t} {c_s} {c_st}\n"
+                )
+
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        opener = gzip.open if out_path.suffix == ".gz" else open
+        with opener(out_path, "wt", encoding="utf-8") as out:
+            for line in final.sorted_lines():
+                out.write(line)
+                stats["phrase_pairs"] += 1
+
+    if not stats["phrase_pairs"]:
+        raise PhraseTableError(f"No phrase pairs extracted from {corpus_path}")
+    return stats
+
+
+def main(argv: List[str] | None = None) -> None:
+    cfg = AppConfig.from_env()
+    parser = argparse.ArgumentParser(description="Build a scored phrase table from a corpus and its word alignments.")
+    parser.add_argument("corpus", type=Path, help="'src ||| tgt' corpus.")
+    parser.add_argument("alignment", type=Path, help="Pharaoh 'i-j' alignment file, one line per corpus line.")
+    parser.add_argument("--target-language", required=True)
+    parser.add_argument("--source-language", default=cfg.source_language)
+    parser.add_argument("--max-phrase-len", type=int, default=4)
+    parser.add_argument("--memory-mb", type=float, default=256.0, help="Memory budget in MB (lexical table plus sort buffers).")
+    parser.add_argument("--min-count", type=int, default=1)
+    parser.add_argument("--no-extend-unaligned", action="store_true")
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args(argv)
+
+    out = args.output or cfg.phrase_table_for(args.target_language.lower(), args.source_language.lower())
+    stats = build_phrase_table(
+        args.corpus,
+        args.alignment,
+        out,
+        max_phrase_len=args.max_phrase_len,
+        memory_budget_mb=args.memory_mb,
+        extend_unaligned=not args.no_extend_unaligned,
+        min_count=args.min_count,
+    )
+    print(
+        f"Extracted {stats['extracted']} phrase instances from {stats['sentences']} sentences; "
+        f"wrote {stats['phrase_pairs']} phrase pairs to {out}"
+    )
+
+
+if __name__ == "__main__":
+    main()
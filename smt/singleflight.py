@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Awaitable, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+from .cache import make_cache_key, translation_model
+from .metrics import REGISTRY
+
+T = TypeVar("T")
+
+COALESCED = REGISTRY.counter(
+    "smt_coalesced_calls_total",
+    "Calls by single-flight role: 'leader' did the work, 'follower' waited on an identical in-flight call.",
+)
+
+
+class _Call(Generic[T]):
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight(Generic[T]):
+    # Concurrent calls with the same key share one execution: the first caller runs `fn`, the others
+    # block until it finishes and get its result (or its exception). Nothing is kept afterwards, so a
+    # key that is no longer in flight runs again; caching is the translation cache's job.
+    def __init__(self, kind: str) -> None:
+        self.kind = kind
+        self._calls: Dict[Hashable, _Call[T]] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> Tuple[T, bool]:
+        # Returns (result, shared); `shared` is True when this caller waited on another one's call.
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            COALESCED.inc(kind=self.kind, role="follower")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True  # type: ignore[return-value]
+
+        COALESCED.inc(kind=self.kind, role="leader")
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight(Generic[T]):
+    # Event-loop counterpart of SingleFlight: followers await the leader's task instead of blocking a
+    # thread. The task is shielded, so a caller that goes away does not cancel the others' result.
+    def __init__(self, kind: str) -> None:
+        self.kind = kind
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        task = self._calls.get(key)
+        if task is not None:
+            COALESCED.inc(kind=self.kind, role="follower")
+            return await asyncio.shield(task), True
+
+        COALESCED.inc(kind=self.kind, role="leader")
+        task = self._calls[key] = asyncio.ensure_future(fn())
+        task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task), False
+
+    def _finished(self, key: Hashable, task: asyncio.Future) -> None:
+        del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved even when every caller was cancelled
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+class CoalescingSentenceTranslator:
+    # Collapses concurrent identical backend calls (same normalized text and language pair) into one.
+    def __init__(self, translator) -> None:
+        self.translator = translator
+        self.source_language = translator.source_language
+        self.flight: SingleFlight[str] = SingleFlight("translate")
+
+    @property
+    def backend(self) -> str:
+        return self.translator.backend
+
+    def model_id(self, target_language: str) -> str:
+        return translation_model(self.translator, target_language)
+
+    def translate(self, sentence: str, target_language: str) -> str:
+        key = make_cache_key(self.model_id(target_language), self.source_language, target_language, sentence)
+        translated, _ = self.flight.do(key, lambda: self.translator.translate(sentence, target_language))
+        return translated
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Runs in a fresh interpreter so the numbers match a worker booting from nothing.
+_PROBE = """
+import json, time
+started = time.perf_counter()
+import app as module
+imported = time.perf_counter()
+flask_app = module.create_app()
+phases = {"import_app": imported - started, **flask_app.extensions["smt_startup"]}
+if WARM_UP:
+    module.warm_up(flask_app)
+    phases.update(flask_app.extensions["smt_startup"])
+try:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+except ImportError:
+    rss_kb = None
+print(json.dumps({"phases": phases, "rss_kb": rss_kb}))
+"""
+
+
+def parse_importtime(stderr: str) -> Dict[str, float]:
+    # `-X importtime` lines are "import time: self [us] | cumulative | name"; self times add up without
+    # double counting, so they are summed per top-level package.
+    totals: Dict[str, float] = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].strip().split(".")[0]
+        totals[name] += int(fields[0]) / 1e6
+    return dict(totals)
+
+
+def startup_report(warm_up: bool = False) -> dict:
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"WARM_UP = {warm_up!r}\n{_PROBE}"],
+        cwd=str(ROOT),
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        tail = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")][-5:]
+        raise RuntimeError("App startup failed:\n" + "\n".join(tail))
+    probe = json.loads(proc.stdout.strip().splitlines()[-1])
+    imports = parse_importtime(proc.stderr)
+    return {
+        "wall_seconds": wall,
+        "phases": probe["phases"],
+        "rss_mb": probe["rss_kb"] / 1024 if probe["rss_kb"] else None,
+        "import_seconds": sum(imports.values()),
+        "imports": imports,
+    }
+
+
+def format_report(report: dict, top: int = 15) -> str:
+    lines = [f"process wall time      {report['wall_seconds'] * 1e3:9.1f} ms"]
+    for phase, seconds in report["phases"].items():
+        lines.append(f"{phase:<22} {seconds * 1e3:9.1f} ms")
+    if report["rss_mb"] is not None:
+        lines.append(f"{'peak RSS':<22} {report['rss_mb']:9.1f} MB")
+    lines.append("")
+    lines.append(f"imports (self time by top-level package, total {report['import_seconds'] * 1e3:.1f} ms)")
+    ranked: List[Tuple[str, float]] = sorted(report["imports"].items(), key=lambda item: -item[1])
+    for name, seconds in ranked[:top]:
+        lines.append(f"  {name:<20} {seconds * 1e3:9.1f} ms")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report app startup and import time in a fresh interpreter.")
+    parser.add_argument("--warm-up", action="store_true", help="Also run the post-fork warm-up and time its steps.")
+    parser.add_argument("--top", type=int, default=15, help="Packages to list in the import breakdown.")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON.")
+    args = parser.parse_args()
+
+    report = startup_report(args.warm_up)
+    if args.json:
+        print(json.dumps(report, indent=2, sort_keys=True))
+    else:
+        print(format_report(report, args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from .alignment import AlignmentLinks, EMStats
+from .alignment_numpy import em_directional_table
+from .ibm_model import read_parallel_corpus
+from .vocab import TokenInput, Vocab
+
+# Links are kept as two parallel int32 arrays (source indices, target indices).
+Links = Tuple[np.ndarray, np.ndarray]
+
+HEURISTICS = ("intersect", "union", "grow-diag", "grow-diag-final", "grow-diag-final-and")
+
+_NEIGHBORS = ((-1, 0), (0, -1), (1, 0), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1))
+
+
+def empty_links() -> Links:
+    return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+
+
+def links_from_pairs(pairs: Sequence[Tuple[int, int]]) -> Links:
+    if not pairs:
+        return empty_links()
+    arr = np.asarray(pairs, dtype=np.int32).reshape(-1, 2)
+    return arr[:, 0].copy(), arr[:, 1].copy()
+
+
+def parse_pharaoh(line: str) -> Links:
+    pairs = []
+    for item in line.split():
+        si, _, ti = item.partition("-")
+        pairs.append((int(si), int(ti)))
+    return links_from_pairs(pairs)
+
+
+def format_pharaoh(links: Links) -> str:
+    return " ".join(f"{si}-{ti}" for si, ti in zip(links[0].tolist(), links[1].tolist()))
+
+
+def _sorted_unique(links: Links, stride: int) -> np.ndarray:
+    return np.unique(links[0].astype(np.int64) * stride + links[1].astype(np.int64))
+
+
+def _decode(keys: np.ndarray, stride: int) -> Links:
+    return (keys // stride).astype(np.int32), (keys % stride).astype(np.int32)
+
+
+def symmetrize(forward: Links, reverse: Links, heuristic: str = "grow-diag-final-and") -> Links:
+    # Mirrors `atools -c <heuristic>`; links come back unique and sorted by (source, target),
+    # so format_pharaoh() output matches atools byte for byte.
+    if heuristic not in HEURISTICS:
+        raise ValueError(f"Unknown symmetrization heuristic: {heuristic}")
+
+    width = 1 + max([int(a.max()) for a in (forward[0], reverse[0]) if a.size] or [0])
+    stride = 1 + max([int(a.max()) for a in (forward[1], reverse[1]) if a.size] or [0])
+    fwd = _sorted_unique(forward, stride)
+    rev = _sorted_unique(reverse, stride)
+
+    if heuristic == "intersect":
+        return _decode(np.intersect1d(fwd, rev, assume_unique=True), stride)
+    union_keys = np.union1d(fwd, rev)
+    if heuristic == "union":
+        return _decode(union_keys, stride)
+
+    # grow-diag*: a port of atools' GDFACommand, including its iteration order, which decides which of
+    # two competing neighbours gets a free row or column first.
+    fwd_grid = _grid(_decode(fwd, stride), width, stride)
+    rev_grid = _grid(_decode(rev, stride), width, stride)
+    res = [[False] * stride for _ in range(width)]
+    i_aligned = [False] * width
+    j_aligned = [False] * stride
+
+    def align(si: int, ti: int) -> None:
+        res[si][ti] = True
+        i_aligned[si] = True
+        j_aligned[ti] = True
+
+    for si, ti in zip(*(a.tolist() for a in _decode(np.intersect1d(fwd, rev, assume_unique=True), stride))):
+        align(si, ti)
+
+    # Grow: sweep the current links in raster order and try each one's neighbours in _NEIGHBORS order.
+    # Links added during a sweep are visited later in the same sweep when they come after the cursor;
+    # sweeps repeat until one adds nothing.
+    added = True
+    while added:
+        added = False
+        for si in range(width):
+            for ti in range(stride):
+                if not res[si][ti]:
+                    continue
+                for di, dj in _NEIGHBORS:
+                    i2, j2 = si + di, ti + dj
+                    if not (0 <= i2 < width and 0 <= j2 < stride):
+                        continue
+                    if (not i_aligned[i2] or not j_aligned[j2]) and (fwd_grid[i2][j2] or rev_grid[i2][j2]):
+                        align(i2, j2)
+                        added = True
+
+    # Final: forward links first, then reverse links, each in raster order.
+    if heuristic in ("grow-diag-final", "grow-diag-final-and"):
+        use_and = heuristic == "grow-diag-final-and"
+        for grid in (fwd_grid, rev_grid):
+            for si in range(width):
+                for ti in range(stride):
+                    if not grid[si][ti] or res[si][ti]:
+                        continue
+                    if use_and:
+                        if not i_aligned[si] and not j_aligned[ti]:
+                            align(si, ti)
+                    elif not i_aligned[si] or not j_aligned[ti]:
+                        align(si, ti)
+
+    return links_from_pairs([(si, ti) for si in range(width) for ti in range(stride) if res[si][ti]])
+
+
+def _grid(links: Links, width: int, height: int) -> List[List[bool]]:
+    grid = [[False] * height for _ in range(width)]
+    for si, ti in zip(links[0].tolist(), links[1].tolist()):
+        grid[si][ti] = True
+    return grid
+
+
+def directional_links(
+    source_tokens: TokenInput,
+    target_tokens: TokenInput,
+    iterations: int = 8,
+    lexical_model=None,
+    source_vocab: Vocab | None = None,
+    target_vocab: Vocab | None = None,
+    tolerance: float = 0.0,
+    stats: EMStats | None = None,
+) -> Tuple[Links, Links]:
+    if len(source_tokens) == 0 or len(target_tokens) == 0:
+        return empty_links(), empty_links()
+    # source->target: every target token picks its best source token (fast_align's default direction).
+    fwd_table = em_directional_table(
+        source_tokens, target_tokens, iterations, lexical_model, source_vocab, target_vocab, tolerance, stats
+    )
+    fwd_src = fwd_table.argmax(axis=0).astype(np.int32)
+    forward = (fwd_src, np.arange(len(target_tokens), dtype=np.int32))
+    # target->source: every source token picks its best target token, reported in i-j orientation.
+    rev_table = em_directional_table(
+        target_tokens, source_tokens, iterations, None, target_vocab, source_vocab, tolerance, stats
+    )
+    rev_tgt = rev_table.argmax(axis=0).astype(np.int32)
+    reverse = (np.arange(len(source_tokens), dtype=np.int32), rev_tgt)
+    return forward, reverse
+
+
+def symmetrized_word_align(
+    source_tokens: TokenInput,
+    target_tokens: TokenInput,
+    heuristic: str = "grow-diag-final-and",
+    iterations: int = 8,
+    lexical_model=None,
+    source_vocab: Vocab | None = None,
+    target_vocab: Vocab | None = None,
+    tolerance: float = 0.0,
+    stats: EMStats | None = None,
+) -> AlignmentLinks:
+    forward, reverse = directional_links(
+        source_tokens, target_tokens, iterations, lexical_model, source_vocab, target_vocab, tolerance, stats
+    )
+    src, tgt = symmetrize(forward, reverse, heuristic)
+    return AlignmentLinks(src.tolist(), tgt.tolist())
+
+
+def symmetrize_lines(forward_lines: Iterator[str], reverse_lines: Iterator[str], heuristic: str) -> Iterator[str]:
+    for fwd_line, rev_line in zip(forward_lines, reverse_lines):
+        yield format_pharaoh(symmetrize(parse_pharaoh(fwd_line), parse_pharaoh(rev_line), heuristic))
+
+
+def symmetrize_files(forward_path: Path, reverse_path: Path, out_path: Path, heuristic: str = "grow-diag-final-and") -> int:
+    count = 0
+    with forward_path.open("r", encoding="utf-8") as fwd, reverse_path.open("r", encoding="utf-8") as rev, out_path.open(
+        "w", encoding="utf-8"
+    ) as out:
+        for line in symmetrize_lines(fwd, rev, heuristic):
+            out.write(line + "\n")
+            count += 1
+    return count
+
+
+def align_corpus(corpus_path: Path, out_path: Path, heuristic: str = "grow-diag-final-and", iterations: int = 8) -> int:
+    count = 0
+    with out_path.open("w", encoding="utf-8") as out:
+        for source_tokens, target_tokens in read_parallel_corpus(corpus_path, keep_empty=True):
+            forward, reverse = directional_links(source_tokens, target_tokens, iterations)
+            out.write(format_pharaoh(symmetrize(forward, reverse, heuristic)) + "\n")
+            count += 1
+    return count
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="In-process symmetrization of word alignments (atools-compatible).")
+    parser.add_argument("-c", "--heuristic", default="grow-diag-final-and", choices=HEURISTICS)
+    parser.add_argument("-o", "--output", type=Path, required=True)
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--corpus", type=Path, help="'src ||| tgt' corpus to align in both directions and symmetrize.")
+    group.add_argument("-i", "--forward", type=Path, help="Forward Pharaoh alignment file (requires -j).")
+    parser.add_argument("-j", "--reverse", type=Path)
+    parser.add_argument("--iterations", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    if args.corpus:
+        count = align_corpus(args.corpus, args.output, args.heuristic, args.iterations)
+    else:
+        if args.reverse is None:
+            parser.error("-j/--reverse is required with -i/--forward")
+        count = symmetrize_files(args.forward, args.reverse, args.output, args.heuristic)
+    print(f"Wrote {count} symmetrized alignments to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
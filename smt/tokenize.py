@@ -1,21 +1,49 @@
 from __future__ import annotations
 
 import re
-from typing import List
+from typing import TYPE_CHECKING, List, overload
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from .vocab import Vocab
 
 _TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
 _PUNCT_RE = re.compile(r"^[^\w\s]+$", re.UNICODE)
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+# Sentence ends: Latin terminators plus the Devanagari danda/double danda, followed by whitespace.
+_SENTENCE_END_RE = re.compile(r"(?:(?<=[.!?\u0964\u0965])|(?<=[.!?\u0964\u0965][\"')\]]))\s+")
 
 
 def tokenize(text: str) -> List[str]:
     return _TOKEN_RE.findall(text.strip())
 
 
-def preprocess_for_alignment(text: str, lowercase: bool = True) -> List[str]:
+@overload
+def preprocess_for_alignment(text: str, lowercase: bool = True, vocab: None = None) -> List[str]: ...
+
+
+@overload
+def preprocess_for_alignment(text: str, lowercase: bool = True, vocab: Vocab = ...) -> np.ndarray: ...
+
+
+def preprocess_for_alignment(text: str, lowercase: bool = True, vocab: Vocab | None = None):
+    # With a vocabulary, returns the int32 token IDs instead of the token strings.
     normalized = " ".join(text.strip().split())
     if lowercase:
         normalized = normalized.lower()
-    return tokenize(normalized)
+    tokens = tokenize(normalized)
+    if vocab is not None:
+        return vocab.encode(tokens)
+    return tokens
+
+
+def split_paragraphs(text: str) -> List[str]:
+    return [p.strip() for p in _PARAGRAPH_RE.split(text) if p.strip()]
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_END_RE.split(" ".join(text.split())) if s.strip()]
 
 
 def is_punctuation(token: str) -> bool:
@@ -2,8 +2,11 @@ from __future__ import annotations
 
 import shlex
 import subprocess
+import threading
+import time
+from collections import deque
 from pathlib import Path
-from typing import List
+from typing import Callable, Deque, Dict, List
 
 
 class ToolkitError(RuntimeError):
@@ -35,51 +38,98 @@ def moses_decode(moses_bin: str, moses_ini: str, sentence: str) -> str:
     return lines[0].strip() if lines else ""
 
 
+ProgressCallback = Callable[[str, str], None]
+
+
+class _StreamingStage:
+    # Runs one command with stdout going straight to a file and stderr drained on a thread.
+    def __init__(self, name: str, cmd: List[str], out_path: Path, progress: ProgressCallback | None) -> None:
+        self.name = name
+        self.cmd = cmd
+        self.progress = progress
+        self.stderr_tail: Deque[str] = deque(maxlen=50)
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self._out = out_path.open("w", encoding="utf-8")
+        try:
+            self.proc = subprocess.Popen(cmd, stdout=self._out, stderr=subprocess.PIPE, text=True)
+        except OSError:
+            self._out.close()
+            raise
+        self._reader = threading.Thread(target=self._drain_stderr, daemon=True)
+        self._reader.start()
+        self._report(f"started: {' '.join(shlex.quote(c) for c in cmd)}")
+
+    def _report(self, message: str) -> None:
+        if self.progress is not None:
+            self.progress(self.name, message)
+
+    def _drain_stderr(self) -> None:
+        assert self.proc.stderr is not None
+        for line in self.proc.stderr:
+            line = line.rstrip()
+            if line:
+                self.stderr_tail.append(line)
+                self._report(line)
+
+    def wait(self) -> float:
+        returncode = self.proc.wait()
+        self._reader.join()
+        self._out.close()
+        self.elapsed = time.perf_counter() - self.started
+        if returncode != 0:
+            detail = "\n".join(self.stderr_tail)
+            raise ToolkitError(f"{self.name} failed ({returncode})\n{detail}".strip())
+        self._report(f"finished in {self.elapsed:.2f}s")
+        return self.elapsed
+
+    def kill(self) -> None:
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+        self._out.close()
+
+
 def fast_align_bidirectional(
     fast_align_bin: str,
-    atools_bin: str,
+    atools_bin: str | None,
     parallel_corpus: Path,
     out_forward: Path,
     out_reverse: Path,
     out_sym: Path,
-) -> None:
-    with out_forward.open("w", encoding="utf-8") as fwd:
-        proc = subprocess.run(
-            [fast_align_bin, "-i", str(parallel_corpus), "-d", "-o", "-v"],
-            text=True,
-            capture_output=True,
-            check=False,
-        )
-        if proc.returncode != 0:
-            raise ToolkitError(proc.stderr.strip() or "fast_align forward failed")
-        fwd.write(proc.stdout)
-
-    with out_reverse.open("w", encoding="utf-8") as rev:
-        proc = subprocess.run(
-            [fast_align_bin, "-i", str(parallel_corpus), "-d", "-o", "-v", "-r"],
-            text=True,
-            capture_output=True,
-            check=False,
-        )
-        if proc.returncode != 0:
-            raise ToolkitError(proc.stderr.strip() or "fast_align reverse failed")
-        rev.write(proc.stdout)
-
-    with out_sym.open("w", encoding="utf-8") as sym:
-        proc = subprocess.run(
-            [
-                atools_bin,
-                "-i",
-                str(out_forward),
-                "-j",
-                str(out_reverse),
-                "-c",
-                "grow-diag-final-and",
-            ],
-            text=True,
-            capture_output=True,
-            check=False,
+    heuristic: str = "grow-diag-final-and",
+    progress: ProgressCallback | None = None,
+) -> Dict[str, float]:
+    started = time.perf_counter()
+    base = [fast_align_bin, "-i", str(parallel_corpus), "-d", "-o", "-v"]
+    # Both directions read the same corpus independently, so they run side by side.
+    stages: List[_StreamingStage] = []
+    timings: Dict[str, float] = {}
+    try:
+        stages.append(_StreamingStage("fast_align forward", base, out_forward, progress))
+        stages.append(_StreamingStage("fast_align reverse", base + ["-r"], out_reverse, progress))
+        timings["forward"] = stages[0].wait()
+        timings["reverse"] = stages[1].wait()
+    except (ToolkitError, OSError):
+        for stage in stages:
+            stage.kill()
+        raise
+
+    if atools_bin:
+        sym = _StreamingStage(
+            "atools",
+            [atools_bin, "-i", str(out_forward), "-j", str(out_reverse), "-c", heuristic],
+            out_sym,
+            progress,
         )
-        if proc.returncode != 0:
-            raise ToolkitError(proc.stderr.strip() or "atools symmetrization failed")
-        sym.write(proc.stdout)
+        timings["symmetrize"] = sym.wait()
+    else:
+        from .symmetrize import symmetrize_files
+
+        sym_started = time.perf_counter()
+        lines = symmetrize_files(out_forward, out_reverse, out_sym, heuristic)
+        timings["symmetrize"] = time.perf_counter() - sym_started
+        if progress is not None:
+            progress("symmetrize", f"{lines} lines in-process in {timings['symmetrize']:.2f}s")
+    timings["total"] = time.perf_counter() - started
+    return timings
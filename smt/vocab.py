@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from .tokenize import is_punctuation
+
+# Attribute bits precomputed once per vocabulary entry.
+PUNCT = 1
+NUMERIC = 2
+ALPHA = 4
+
+UNKNOWN_ID = -1
+# A shared per-language vocabulary is replaced (not mutated) once it grows past this many entries,
+# so a long-running server cannot grow it without bound; callers holding the old one are unaffected.
+SHARED_VOCAB_LIMIT = 500_000
+
+TokenInput = Union[Sequence[str], np.ndarray]
+
+# Punctuation marks are the same strings in every language, so they get codes shared by all
+# vocabularies; exact punctuation matches across a source and a target vocabulary compare these.
+_PUNCT_CODES: Dict[str, int] = {}
+_PUNCT_LOCK = threading.Lock()
+
+
+def _punct_code(token: str) -> int:
+    code = _PUNCT_CODES.get(token)
+    if code is None:
+        with _PUNCT_LOCK:
+            code = _PUNCT_CODES.setdefault(token, len(_PUNCT_CODES) + 1)
+    return code
+
+
+def token_flags(token: str) -> int:
+    flags = 0
+    if is_punctuation(token):
+        flags |= PUNCT
+    if token.isnumeric():
+        flags |= NUMERIC
+    if token.isalpha():
+        flags |= ALPHA
+    return flags
+
+
+class Vocab:
+    # Token <-> int ID interner. Lookups are lock-free; only inserting a new token takes the lock.
+    # Attribute arrays are grown by replacement, so readers indexing known IDs never see a resize.
+    def __init__(self, tokens: Iterable[str] = ()) -> None:
+        self.tokens: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self._flags = np.zeros(64, dtype=np.uint8)
+        self._punct_codes = np.zeros(64, dtype=np.int32)
+        self._lock = threading.Lock()
+        for token in tokens:
+            self.add(token)
+
+    def add(self, token: str) -> int:
+        idx = self.ids.get(token)
+        if idx is not None:
+            return idx
+        with self._lock:
+            idx = self.ids.get(token)
+            if idx is not None:
+                return idx
+            idx = len(self.tokens)
+            if idx >= len(self._flags):
+                self._flags = np.concatenate([self._flags, np.zeros_like(self._flags)])
+                self._punct_codes = np.concatenate([self._punct_codes, np.zeros_like(self._punct_codes)])
+            flags = token_flags(token)
+            self._flags[idx] = flags
+            self._punct_codes[idx] = _punct_code(token) if flags & PUNCT else 0
+            self.tokens.append(token)
+            self.ids[token] = idx
+        return idx
+
+    def get(self, token: str) -> int | None:
+        return self.ids.get(token)
+
+    def encode(self, tokens: Iterable[str], add: bool = True) -> np.ndarray:
+        # Unknown tokens map to UNKNOWN_ID when add=False.
+        tokens = tokens if isinstance(tokens, (list, tuple)) else list(tokens)
+        if add:
+            ids = [self.ids.get(t) for t in tokens]
+            if None in ids:
+                ids = [self.add(t) if i is None else i for t, i in zip(tokens, ids)]
+        else:
+            ids = [self.ids.get(t, UNKNOWN_ID) for t in tokens]
+        return np.array(ids, dtype=np.int32)
+
+    def decode(self, ids: Iterable[int]) -> List[str]:
+        tokens = self.tokens
+        return [tokens[i] for i in np.asarray(ids).tolist()]
+
+    def flags(self, ids: np.ndarray) -> np.ndarray:
+        return self._flags[ids]
+
+    def has_flag(self, ids: np.ndarray, flag: int) -> np.ndarray:
+        return (self._flags[ids] & flag) != 0
+
+    def punct_codes(self, ids: np.ndarray) -> np.ndarray:
+        # 0 for non-punctuation; equal non-zero codes mean identical punctuation, across vocabularies.
+        return self._punct_codes[ids]
+
+    def __contains__(self, token: str) -> bool:
+        return token in self.ids
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+
+_SHARED: Dict[str, Vocab] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def vocab_for(language: str) -> Vocab:
+    with _SHARED_LOCK:
+        vocab = _SHARED.get(language)
+        if vocab is None or len(vocab) >= SHARED_VOCAB_LIMIT:
+            vocab = _SHARED[language] = Vocab()
+        return vocab
+
+
+def as_ids(tokens: TokenInput, vocab: Vocab | None = None) -> Tuple[np.ndarray, Vocab]:
+    # Accepts token strings or IDs already encoded with `vocab`; strings without a vocabulary get a
+    # throwaway sentence-local one.
+    if isinstance(tokens, np.ndarray):
+        if vocab is None:
+            raise ValueError("Encoded token IDs need the Vocab they were encoded with.")
+        return tokens, vocab
+    vocab = vocab if vocab is not None else Vocab()
+    return vocab.encode(tokens), vocab
+
+
+def as_tokens(tokens: TokenInput, vocab: Vocab | None = None) -> List[str]:
+    if isinstance(tokens, np.ndarray):
+        if vocab is None:
+            raise ValueError("Encoded token IDs need the Vocab they were encoded with.")
+        return vocab.decode(tokens)
+    return list(tokens)
@@ -0,0 +1,188 @@
+// Draws alignment matrices on a canvas from the sparse wire format
+// ({source_tokens, target_tokens, alignment_grid: {rows, cols, links: [[i, j], ...]}}).
+// Only the cells inside the scrolled viewport are painted, so cost follows the visible area and the
+// number of links rather than rows x cols.
+(function () {
+  "use strict";
+
+  const CELL = 22;
+  const MIN_LABEL = 48;
+  const MAX_LABEL = 160;
+  const FONT = '12px "Segoe UI", Tahoma, sans-serif';
+
+  function cssVar(el, name, fallback) {
+    const value = getComputedStyle(el).getPropertyValue(name).trim();
+    return value || fallback;
+  }
+
+  function labelSize(ctx, tokens) {
+    let widest = 0;
+    for (let i = 0; i < tokens.length; i++) {
+      widest = Math.max(widest, ctx.measureText(tokens[i]).width);
+    }
+    return Math.min(MAX_LABEL, Math.max(MIN_LABEL, widest + 12));
+  }
+
+  function setup(root) {
+    const data = JSON.parse(root.querySelector(".alignment-data").textContent);
+    const src = data.source_tokens;
+    const tgt = data.target_tokens;
+    const linked = new Map();
+    data.alignment_grid.links.forEach(function (link) {
+      if (!linked.has(link[0])) {
+        linked.set(link[0], new Set());
+      }
+      linked.get(link[0]).add(link[1]);
+    });
+
+    const viewport = root.querySelector(".grid-viewport");
+    const spacer = root.querySelector(".grid-spacer");
+    const canvas = root.querySelector("canvas");
+    const ctx = canvas.getContext("2d");
+    ctx.font = FONT;
+    const labelW = labelSize(ctx, src);
+    const labelH = labelSize(ctx, tgt);
+    const colors = {
+      on: cssVar(root, "--grid-on", "#60a387"),
+      off: cssVar(root, "--grid-off", "#f4f4f2"),
+      line: cssVar(root, "--grid-line", "#d3cec1"),
+      label: cssVar(root, "--grid-label", "#fffdf7"),
+      ink: cssVar(root, "--ink", "#1f2933"),
+    };
+
+    spacer.style.width = labelW + tgt.length * CELL + "px";
+    spacer.style.height = labelH + src.length * CELL + "px";
+    viewport.style.height = Math.min(labelH + src.length * CELL + 18, Math.round(window.innerHeight * 0.7)) + "px";
+
+    function clippedText(text, x, y, width) {
+      ctx.save();
+      ctx.beginPath();
+      ctx.rect(x, y - CELL, width, CELL * 2);
+      ctx.clip();
+      ctx.fillText(text, x, y);
+      ctx.restore();
+    }
+
+    function draw() {
+      const w = viewport.clientWidth;
+      const h = viewport.clientHeight;
+      if (!w || !h) {
+        return;
+      }
+      const dpr = window.devicePixelRatio || 1;
+      if (canvas.width !== Math.round(w * dpr) || canvas.height !== Math.round(h * dpr)) {
+        canvas.width = Math.round(w * dpr);
+        canvas.height = Math.round(h * dpr);
+        canvas.style.width = w + "px";
+        canvas.style.height = h + "px";
+      }
+      const x0 = viewport.scrollLeft;
+      const y0 = viewport.scrollTop;
+      canvas.style.transform = "translate(" + x0 + "px, " + y0 + "px)";
+      ctx.setTransform(dpr, 0, 0, dpr, 0, 0);
+      ctx.font = FONT;
+      ctx.clearRect(0, 0, w, h);
+
+      const firstCol = Math.floor(x0 / CELL);
+      const lastCol = Math.min(tgt.length - 1, Math.floor((x0 + w - labelW) / CELL));
+      const firstRow = Math.floor(y0 / CELL);
+      const lastRow = Math.min(src.length - 1, Math.floor((y0 + h - labelH) / CELL));
+      const cellX = function (col) { return labelW + col * CELL - x0; };
+      const cellY = function (row) { return labelH + row * CELL - y0; };
+
+      // Cells: one background fill, then only the linked cells in view.
+      ctx.fillStyle = colors.off;
+      ctx.fillRect(labelW, labelH, cellX(lastCol + 1) - labelW, cellY(lastRow + 1) - labelH);
+      ctx.fillStyle = colors.on;
+      for (let row = firstRow; row <= lastRow; row++) {
+        const cols = linked.get(row);
+        if (!cols) {
+          continue;
+        }
+        cols.forEach(function (col) {
+          if (col >= firstCol && col <= lastCol) {
+            ctx.fillRect(cellX(col), cellY(row), CELL, CELL);
+          }
+        });
+      }
+      ctx.strokeStyle = colors.line;
+      ctx.lineWidth = 1;
+      ctx.beginPath();
+      for (let col = firstCol; col <= lastCol + 1; col++) {
+        ctx.moveTo(cellX(col) + 0.5, labelH);
+        ctx.lineTo(cellX(col) + 0.5, cellY(lastRow + 1));
+      }
+      for (let row = firstRow; row <= lastRow + 1; row++) {
+        ctx.moveTo(labelW, cellY(row) + 0.5);
+        ctx.lineTo(cellX(lastCol + 1), cellY(row) + 0.5);
+      }
+      ctx.stroke();
+
+      // Frozen headers: target tokens across the top (rotated), source tokens down the side.
+      ctx.fillStyle = colors.label;
+      ctx.fillRect(0, 0, w, labelH);
+      ctx.fillRect(0, 0, labelW, h);
+      ctx.fillStyle = colors.ink;
+      ctx.textBaseline = "middle";
+      for (let col = firstCol; col <= lastCol; col++) {
+        ctx.save();
+        ctx.translate(cellX(col) + CELL / 2, labelH - 6);
+        ctx.rotate(-Math.PI / 2);
+        clippedText(tgt[col], 0, 0, labelH - 10);
+        ctx.restore();
+      }
+      ctx.save();
+      ctx.beginPath();
+      ctx.rect(0, labelH, labelW, h - labelH);
+      ctx.clip();
+      for (let row = firstRow; row <= lastRow; row++) {
+        clippedText(src[row], 6, cellY(row) + CELL / 2, labelW - 10);
+      }
+      ctx.restore();
+      ctx.fillStyle = colors.label;
+      ctx.fillRect(0, 0, labelW, labelH);
+      ctx.fillStyle = colors.ink;
+      ctx.fillText("src \\ tgt", 6, labelH / 2);
+    }
+
+    let pending = false;
+    function schedule() {
+      if (!pending) {
+        pending = true;
+        window.requestAnimationFrame(function () {
+          pending = false;
+          draw();
+        });
+      }
+    }
+
+    viewport.addEventListener("scroll", schedule, { passive: true });
+    window.addEventListener("resize", schedule);
+    if (window.ResizeObserver) {
+      // Also redraws when a hidden panel is shown again.
+      new ResizeObserver(schedule).observe(viewport);
+    }
+    canvas.addEventListener("mousemove", function (event) {
+      const rect = canvas.getBoundingClientRect();
+      const col = Math.floor((event.clientX - rect.left - labelW + viewport.scrollLeft) / CELL);
+      const row = Math.floor((event.clientY - rect.top - labelH + viewport.scrollTop) / CELL);
+      if (row < 0 || col < 0 || row >= src.length || col >= tgt.length) {
+        canvas.title = "";
+        return;
+      }
+      const link = linked.has(row) && linked.get(row).has(col);
+      canvas.title = src[row] + " (" + row + ") → " + tgt[col] + " (" + col + ")" + (link ? ": linked" : "");
+    });
+    draw();
+  }
+
+  function init() {
+    document.querySelectorAll(".alignment-grid").forEach(setup);
+  }
+
+  if (document.readyState === "loading") {
+    document.addEventListener("DOMContentLoaded", init);
+  } else {
+    init();
+  }
+})();
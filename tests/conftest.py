@@ -0,0 +1,27 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+# The app and the smt package are imported from the repository root, as `python app.py` does; the
+# offline stub backend lives with the benchmarks.
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # The app on a throwaway data directory, translating with the deterministic offline stub.
+    from app import create_app
+    from bench_pipeline import StubSentenceTranslator
+
+    monkeypatch.setenv("SMT_DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("SMT_CACHE", "0")
+    monkeypatch.setenv("SMT_BATCH_WORKERS", "1")
+    monkeypatch.setenv("SMT_TARGET_LANGUAGES", "hi,bn")
+    app = create_app()
+    translator = app.extensions["smt_translator"]
+    translator.library_translator = StubSentenceTranslator()
+    yield app.test_client()
+    translator.close()
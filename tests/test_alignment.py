@@ -0,0 +1,17 @@
+import random
+
+import pytest
+
+from smt.alignment import AlignmentLinks, AlignmentPoint, extract_phrase_pairs, extract_phrase_pairs_fast
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_fast_phrase_extraction_matches_reference(seed):
+    rng = random.Random(seed)
+    src = [f"s{i}" for i in range(rng.randint(1, 12))]
+    tgt = [f"t{j}" for j in range(rng.randint(1, 12))]
+    points = sorted(
+        {(rng.randrange(len(src)), rng.randrange(len(tgt))) for _ in range(rng.randint(1, 2 * max(len(src), len(tgt))))}
+    )
+    reference = extract_phrase_pairs(src, tgt, [AlignmentPoint(si, ti) for si, ti in points])
+    assert extract_phrase_pairs_fast(src, tgt, AlignmentLinks.from_pairs(points)) == reference
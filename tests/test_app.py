@@ -0,0 +1,83 @@
+import pytest
+
+
+def test_all_languages_api(client):
+    response = client.post("/api/translate/all", json={"text": "the cat sleeps", "languages": ["hi", "bn"], "timeout": 5})
+    assert response.status_code == 200
+    assert [r["target_language"] for r in response.get_json()["results"]] == ["hi", "bn"]
+    assert all(r["ok"] for r in response.get_json()["results"])
+
+
+@pytest.mark.parametrize(
+    "extra, error",
+    [
+        ({"timeout": "abc"}, "'timeout' must be a positive number of seconds."),
+        ({"timeout": "5"}, "'timeout' must be a positive number of seconds."),
+        ({"timeout": True}, "'timeout' must be a positive number of seconds."),
+        ({"timeout": 0}, "'timeout' must be a positive number of seconds."),
+        ({"languages": "hi"}, "'languages' must be a list of language codes."),
+        ({"languages": ["hi", 3]}, "'languages' must be a list of language codes."),
+        ({"languages": ["hi", "xx"]}, "Unsupported target languages: xx"),
+    ],
+)
+def test_all_languages_api_rejects_bad_options(client, extra, error):
+    response = client.post("/api/translate/all", json={"text": "the cat sleeps", **extra})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": error}
+
+
+def test_asgi_prefetch_plan_agrees_on_bad_options(client):
+    import json
+
+    from asgi import prefetch_plan
+    from smt.config import AppConfig
+
+    cfg = AppConfig.from_env()
+
+    def plan(payload):
+        return prefetch_plan(cfg, ["hi", "bn"], "/api/translate/all", "application/json", json.dumps(payload).encode())
+
+    assert plan({"text": "the cat", "timeout": 2}) == (["the cat"], ["hi", "bn"], 2.0)
+    assert plan({"text": "the cat", "timeout": "abc"}) is None
+    assert plan({"text": "the cat", "languages": "hi"}) is None
+
+
+def test_form_all_languages_renders_backend_errors(client, monkeypatch):
+    translator = client.application.extensions["smt_translator"]
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("backend down")
+
+    monkeypatch.setattr(translator, "translate_all_languages", fail)
+    response = client.post("/translate", data={"source_text": "the cat", "target_language": "all"})
+    assert response.status_code == 200
+    assert b"Translation failed: backend down" in response.data
+
+
+def test_form_all_languages_with_unlisted_default_language(tmp_path, monkeypatch):
+    from app import create_app
+    from bench_pipeline import StubSentenceTranslator
+
+    monkeypatch.setenv("SMT_DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("SMT_CACHE", "0")
+    monkeypatch.setenv("SMT_TARGET_LANGUAGES", "hi,bn")
+    monkeypatch.setenv("SMT_DEFAULT_TARGET_LANGUAGE", "ta")
+    app = create_app()
+    app.extensions["smt_translator"].library_translator = StubSentenceTranslator()
+    response = app.test_client().post("/translate", data={"source_text": "the cat", "target_language": "all"})
+    assert response.status_code == 200
+    assert b"Translation failed: Unsupported target language: ta" in response.data
+
+
+def test_warm_up_without_an_app_builds_the_module_app(tmp_path, monkeypatch):
+    import app as app_module
+
+    monkeypatch.setenv("SMT_DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("SMT_CACHE", "0")
+    vars(app_module).pop("app", None)  # as after a bare `import app`
+    try:
+        timings = app_module.warm_up()
+        assert set(timings) == {"backend", "lexical_models", "aligner"}
+        assert "warm_up_backend" in app_module.app.extensions["smt_startup"]
+    finally:
+        vars(app_module).pop("app", None)
@@ -0,0 +1,220 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from bench_pipeline import StubSentenceTranslator
+
+import asgi
+from asgi import create_asgi_app
+from smt.aio import AdmissionController, AdmissionRejected
+
+
+class GatedStub(StubSentenceTranslator):
+    # The offline stub, counting its calls and, while `gate` is clear, holding them.
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def translate(self, sentence: str, target_language: str) -> str:
+        self.calls.append((sentence, target_language))
+        self.gate.wait(5)
+        return super().translate(sentence, target_language)
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    # An ASGIApp over the real Flask app, with the stub as its sentence backend.
+    monkeypatch.setenv("SMT_DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("SMT_CACHE", "0")
+    monkeypatch.setenv("SMT_BATCH_WORKERS", "1")
+    monkeypatch.setenv("SMT_TARGET_LANGUAGES", "hi,bn")
+    stub = GatedStub()
+    monkeypatch.setattr("smt.engine.build_sentence_translator", lambda cfg: stub)
+    apps = []
+
+    def make(**env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, str(value))
+        app = create_asgi_app()
+        app.stub = stub
+        apps.append(app)
+        return app
+
+    yield make
+    for app in apps:
+        app.close()
+
+
+async def request(app, method: str, path: str, payload=None, body: bytes | None = None) -> tuple:
+    # Drives one request through the ASGI interface; returns (status, headers, body).
+    if body is None:
+        body = json.dumps(payload).encode() if payload is not None else b""
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json"), (b"host", b"test")],
+    }
+    await app(scope, receive, send)
+    start = sent[0]
+    assert start["type"] == "http.response.start"
+    return start["status"], dict(start["headers"]), b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def translate(app, text: str = "the cat sleeps", lang: str = "hi"):
+    return request(app, "POST", "/api/translate/grid", {"text": text, "target_language": lang})
+
+
+def test_prefetched_translations_are_read_by_the_view(make_app):
+    app = make_app()
+
+    async def main():
+        status, _, body = await request(app, "POST", "/api/translate/all", {"text": "the cat sleeps", "timeout": 5})
+        assert status == 200
+        results = json.loads(body)["results"]
+        assert [r["target_language"] for r in results] == ["hi", "bn"] and all(r["ok"] for r in results)
+        # One backend call per language, made by the prefetch on the event loop; the view made none.
+        assert sorted(app.stub.calls) == [("the cat sleeps", "bn"), ("the cat sleeps", "hi")]
+        assert app.async_translator.prefetched._entries == {}
+
+    asyncio.run(main())
+
+
+def test_prefetched_backend_error_is_reported_by_the_view(make_app):
+    app = make_app()
+
+    def broken(sentence, target_language):
+        raise RuntimeError("backend down")
+
+    app.stub.translate = broken
+
+    async def main():
+        status, _, body = await translate(app)
+        assert status == 502
+        assert "backend down" in json.loads(body)["error"]
+
+    asyncio.run(main())
+
+
+def test_queue_overflow_gets_503_with_retry_after(make_app):
+    app = make_app(SMT_ASGI_MAX_IN_FLIGHT=1, SMT_ASGI_QUEUE_SIZE=0)
+
+    async def main():
+        app.stub.gate.clear()
+        held = asyncio.ensure_future(translate(app, "the first one"))
+        await asyncio.sleep(0.1)
+        status, headers, body = await translate(app, "the second one")
+        assert status == 503
+        assert headers[b"retry-after"] == b"1"
+        assert "queue is full" in json.loads(body)["error"]
+
+        # Monitoring stays reachable while the only slot is taken.
+        status, _, body = await request(app, "GET", "/metrics")
+        assert status == 200 and b"smt_admission_total" in body
+
+        app.stub.gate.set()
+        assert (await held)[0] == 200
+        assert app.admission.stats() == {"active": 0, "queued": 0, "limit": 1}
+
+    asyncio.run(main())
+
+
+def test_queued_request_runs_when_a_slot_frees_and_late_ones_time_out(make_app):
+    app = make_app(SMT_ASGI_MAX_IN_FLIGHT=1, SMT_ASGI_QUEUE_SIZE=2, SMT_ASGI_QUEUE_TIMEOUT=0.3)
+
+    async def main():
+        app.stub.gate.clear()
+        first = asyncio.ensure_future(translate(app, "the first one"))
+        await asyncio.sleep(0.05)
+        status, _, body = await translate(app, "the late one")  # queued, then not admitted in time
+        assert status == 503 and "not admitted within 0.3s" in json.loads(body)["error"]
+        second = asyncio.ensure_future(translate(app, "the second one"))
+        await asyncio.sleep(0.05)
+        assert app.admission.stats()["queued"] == 1
+        app.stub.gate.set()
+        assert (await first)[0] == 200
+        assert (await second)[0] == 200
+        assert app.admission.stats()["active"] == 0
+
+    asyncio.run(main())
+
+
+def test_oversized_body_gets_413(make_app, monkeypatch):
+    app = make_app()
+    monkeypatch.setattr(asgi, "MAX_BODY_BYTES", 64)
+
+    async def main():
+        status, _, body = await request(app, "POST", "/api/translate/grid", body=b"x" * 65)
+        assert status == 413
+        assert app.stub.calls == []
+        assert app.admission.stats()["active"] == 0
+
+    asyncio.run(main())
+
+
+def test_lifespan_startup_and_shutdown(make_app):
+    app = make_app()
+    messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message["type"])
+
+    asyncio.run(app({"type": "lifespan"}, receive, send))
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+
+
+def test_admission_hands_freed_slots_to_waiters_in_order():
+    async def main():
+        admission = AdmissionController(limit=1, queue_size=2, timeout=5.0)
+        await admission.acquire()
+        order = []
+
+        async def waiter(name):
+            await admission.acquire()
+            order.append(name)
+
+        waiters = [asyncio.ensure_future(waiter(name)) for name in ("a", "b")]
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected, match="queue is full"):
+            await admission.acquire()
+        admission.release()
+        await asyncio.sleep(0)
+        admission.release()
+        await asyncio.gather(*waiters)
+        assert order == ["a", "b"]
+        admission.release()
+        assert admission.stats() == {"active": 0, "queued": 0, "limit": 1}
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_does_not_leak_its_slot():
+    async def main():
+        admission = AdmissionController(limit=1, queue_size=2, timeout=5.0)
+        await admission.acquire()
+        gone = asyncio.ensure_future(admission.acquire())
+        await asyncio.sleep(0)
+        gone.cancel()
+        await asyncio.sleep(0)
+        admission.release()
+        assert admission.stats() == {"active": 0, "queued": 0, "limit": 1}
+        await admission.acquire()  # the slot is free again
+
+    asyncio.run(main())
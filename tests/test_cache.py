@@ -0,0 +1,99 @@
+import os
+import sqlite3
+import time
+
+from bench_pipeline import StubSentenceTranslator
+
+from smt.cache import CachedSentenceTranslator, LRUCache, SQLiteTranslationStore, TranslationCache, make_cache_key
+from smt.config import AppConfig
+from smt.decoder import PhraseTableSentenceTranslator, compile_phrase_table
+
+
+def key(i):
+    return make_cache_key("stub", "en", "hi", f"sentence {i}")
+
+
+def test_prune_deletes_oldest_rows_over_the_limit(tmp_path):
+    store = SQLiteTranslationStore(tmp_path / "cache.sqlite3", max_rows=10, prune_every=5)
+    for i in range(23):
+        store.put(key(i), f"t{i}")
+    # Pruned after writes 5, 10, 15 and 20; never more than one interval over the limit.
+    assert len(store) == 13
+    assert store.prune() == 3
+    assert len(store) == 10
+    assert store.get(key(12)) is None
+    assert store.get(key(13)) == "t13"
+    assert store.get(key(22)) == "t22"
+
+
+def test_prune_deletes_expired_rows(tmp_path):
+    store = SQLiteTranslationStore(tmp_path / "cache.sqlite3", ttl_seconds=60)
+    store.put_many((key(i), f"t{i}") for i in range(4))
+    conn = store._connection()
+    conn.execute("UPDATE translations SET created_at = ? WHERE source_text IN (?, ?)", (time.time() - 120, key(0)[3], key(1)[3]))
+    conn.commit()
+    assert store.prune() == 2
+    assert len(store) == 2
+    assert store.get(key(2)) == "t2"
+
+
+def test_store_is_pruned_when_opened(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    store = SQLiteTranslationStore(path)
+    store.put_many((key(i), f"t{i}") for i in range(50))
+    assert len(SQLiteTranslationStore(path, max_rows=20)) == 20
+
+
+def test_put_many_counts_towards_the_prune_interval(tmp_path):
+    store = SQLiteTranslationStore(tmp_path / "cache.sqlite3", max_rows=10, prune_every=100)
+    store.put_many((key(i), f"t{i}") for i in range(150))
+    assert len(store) == 10
+
+
+def test_entries_are_keyed_by_model(tmp_path):
+    store = SQLiteTranslationStore(tmp_path / "cache.sqlite3")
+    store.put(make_cache_key("google-translator", "en", "hi", "hello"), "namaste")
+    assert store.get(make_cache_key("google-translator", "en", "hi", " hello ")) == "namaste"
+    assert store.get(make_cache_key("phrase-table:/models/pt.bin@1", "en", "hi", "hello")) is None
+
+
+def test_store_without_model_column_is_replaced(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    conn = sqlite3.connect(str(path))
+    conn.execute(
+        "CREATE TABLE translations (source_language TEXT, target_language TEXT, source_text TEXT,"
+        " translation TEXT, created_at REAL, PRIMARY KEY (source_language, target_language, source_text))"
+    )
+    conn.execute("INSERT INTO translations VALUES ('en', 'hi', 'hello', 'namaste', ?)", (time.time(),))
+    conn.commit()
+    conn.close()
+    store = SQLiteTranslationStore(path)
+    assert len(store) == 0
+    store.put(key(0), "t0")
+    assert store.get(key(0)) == "t0"
+
+
+def test_switching_backend_misses_the_previous_backends_entries(tmp_path):
+    cache = TranslationCache(LRUCache(), SQLiteTranslationStore(tmp_path / "cache.sqlite3"))
+    google = CachedSentenceTranslator(StubSentenceTranslator(), cache)
+    google.translator.backend = "google-translator"
+    first = google.translate("hello world", "hi")
+    offline = CachedSentenceTranslator(StubSentenceTranslator(), cache)
+    offline.translator.translate = lambda sentence, target_language: "offline"
+    assert offline.translate("hello world", "hi") == "offline"
+    assert google.translate("hello world", "hi") == first
+
+
+def test_phrase_table_model_changes_when_the_table_is_rebuilt(tmp_path, monkeypatch):
+    monkeypatch.setenv("SMT_DATA_DIR", str(tmp_path))
+    cfg = AppConfig.from_env()
+    table = tmp_path / "phrase-table.txt"
+    table.write_text("hello ||| namaste ||| 0.5 0.5 0.5 0.5 ||| 0-0\n", encoding="utf-8")
+    compile_phrase_table(table, cfg.compiled_phrase_table_for("hi"))
+    assert PhraseTableSentenceTranslator(cfg).model_id("bn") == "phrase-table"
+
+    before = PhraseTableSentenceTranslator(cfg).model_id("hi")
+    assert before.startswith(f"phrase-table:{cfg.compiled_phrase_table_for('hi')}@")
+    compiled = cfg.compiled_phrase_table_for("hi")
+    os.utime(compiled, ns=(compiled.stat().st_atime_ns, compiled.stat().st_mtime_ns + 1))
+    assert PhraseTableSentenceTranslator(cfg).model_id("hi") != before
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from smt.corpus_align import align_corpus_stream, iter_line_pairs
+
+WORDS = ["the", "cat", "dog", "sleeps", "runs", "under", "a", "red", "table", "quickly"]
+
+
+class Interrupted(Exception):
+    pass
+
+
+def write_corpus(path, lines: int = 60):
+    rows = []
+    for i in range(lines):
+        src = " ".join(WORDS[(i + k) % len(WORDS)] for k in range(3 + i % 4))
+        tgt = " ".join(f"w{(i + k) % 7}" for k in range(2 + i % 5))
+        # Every 13th line has an empty side, which still gets its (empty) output line.
+        rows.append(f"{src} ||| \n" if i % 13 == 5 else f"{src} ||| {tgt}\n")
+    path.write_text("".join(rows), encoding="utf-8")
+    return path
+
+
+def interrupted_after(pairs, count: int):
+    for i, pair in enumerate(pairs):
+        if i == count:
+            raise Interrupted
+        yield pair
+
+
+def align(corpus, out, **kwargs):
+    return align_corpus_stream(iter_line_pairs(corpus), out, "en", "hi", chunk_size=8, em_iterations=3, **kwargs)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_resumed_run_matches_an_uninterrupted_one(tmp_path, workers):
+    corpus = write_corpus(tmp_path / "corpus.txt")
+    reference = tmp_path / "reference.align"
+    assert align(corpus, reference, workers=workers) == 60
+    expected = reference.read_bytes()
+    assert expected.count(b"\n") == 60
+    assert not (tmp_path / "reference.align.ckpt").exists()
+
+    out = tmp_path / "run.align"
+    with pytest.raises(Interrupted):
+        align_corpus_stream(
+            interrupted_after(iter_line_pairs(corpus), 37), out, "en", "hi", chunk_size=8, em_iterations=3, workers=workers
+        )
+    state = json.loads((tmp_path / "run.align.ckpt").read_text(encoding="utf-8"))
+    # Only whole chunks are checkpointed, and the output holds exactly what the checkpoint covers.
+    assert state["lines"] % 8 == 0 and 0 < state["lines"] < 37
+    assert out.read_bytes() == expected[: state["bytes"]]
+    assert out.read_bytes().count(b"\n") == state["lines"]
+
+    with out.open("ab") as fh:
+        fh.write(b"0-0 1-1 2-")  # a torn write after the last checkpoint
+    assert align(corpus, out, workers=workers, resume=True) == 60
+    assert out.read_bytes() == expected
+    assert not (tmp_path / "run.align.ckpt").exists()
+
+
+def test_resume_without_checkpoint_starts_over(tmp_path):
+    corpus = write_corpus(tmp_path / "corpus.txt", lines=20)
+    out = tmp_path / "run.align"
+    out.write_bytes(b"stale output\n")
+    assert align(corpus, out, resume=True) == 20
+    reference = tmp_path / "reference.align"
+    align(corpus, reference)
+    assert out.read_bytes() == reference.read_bytes()
@@ -0,0 +1,26 @@
+import pytest
+
+from smt.decoder import DecoderError, IndexedPhraseTable, compile_phrase_table
+
+
+def write_table(path, lines):
+    path.write_text("".join(f"{line} ||| 0.5 0.5 0.5 0.5 ||| 0-0\n" for line in lines), encoding="utf-8")
+    return path
+
+
+def test_compile_accepts_line_sorted_table(tmp_path):
+    # Sorted as whole lines, "the cat" comes before "the".
+    lines = sorted(["the ||| ye", "the cat ||| billi", "the cat ||| ek billi", "cat ||| billi"])
+    table = write_table(tmp_path / "phrase-table.txt", lines)
+    stats = compile_phrase_table(table, tmp_path / "phrase-table.bin")
+    assert stats == {"source_phrases": 3, "phrase_pairs": 4, "max_phrase_len": 2}
+    compiled = IndexedPhraseTable(tmp_path / "phrase-table.bin")
+    assert {tgt for (tgt, _) in compiled.lookup("the cat")} == {("billi",), ("ek", "billi")}
+    compiled.close()
+
+
+@pytest.mark.parametrize("lines", [["the ||| ye", "cat ||| billi"], ["cat ||| billi", "the ||| ye", "cat ||| bill"]])
+def test_compile_rejects_unsorted_table(tmp_path, lines):
+    table = write_table(tmp_path / "phrase-table.txt", lines)
+    with pytest.raises(DecoderError, match="not sorted"):
+        compile_phrase_table(table, tmp_path / "phrase-table.bin")
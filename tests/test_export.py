@@ -0,0 +1,84 @@
+import gzip
+import io
+import json
+
+import pytest
+
+from smt import export
+from smt.alignment import AlignmentLinks
+from smt.export import ExportRecord, stream_export
+
+
+def records(n=12):
+    for i in range(n):
+        src = ["the", "cat", f"n{i}", "sleeps"]
+        tgt = [f"w{i}", "billi", "sota"]
+        yield ExportRecord(i, src, tgt, AlignmentLinks([0, 1, 2, 3], [0, 1, 0, 2]))
+
+
+def jsonl_rows(data: bytes):
+    return [json.loads(line) for line in data.decode("utf-8").splitlines()]
+
+
+def test_jsonl_gzip_round_trip():
+    rows = jsonl_rows(gzip.decompress(b"".join(stream_export(records(), "jsonl", "gzip"))))
+    assert [r["index"] for r in rows] == list(range(12))
+    assert rows[0]["links"] == [[0, 0], [1, 1], [2, 0], [3, 2]]
+    assert rows[0]["phrase_pairs"]
+
+
+def test_jsonl_zstd_round_trip(monkeypatch):
+    zstandard = pytest.importorskip("zstandard")
+    monkeypatch.setattr(export, "FLUSH_BYTES", 64)
+    data = b"".join(stream_export(records(), "jsonl", "zstd"))
+    with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)) as reader:
+        rows = jsonl_rows(reader.read())
+    assert rows == jsonl_rows(b"".join(stream_export(records(), "jsonl", "none")))
+
+
+@pytest.mark.parametrize("compression", ["none", "gzip", "zstd"])
+def test_parquet_round_trip(monkeypatch, compression):
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    monkeypatch.setattr(export, "ROW_GROUP_SIZE", 5)
+    chunks = list(stream_export(records(), "parquet", compression))
+    parquet = pq.ParquetFile(io.BytesIO(b"".join(chunks)))
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read().to_pylist()
+    assert [row["index"] for row in table] == list(range(12))
+    assert table[3]["source_tokens"] == ["the", "cat", "n3", "sleeps"]
+    assert table[3]["link_src"] == [0, 1, 2, 3] and table[3]["link_tgt"] == [0, 1, 0, 2]
+    assert table[3]["phrase_pairs"] == jsonl_rows(b"".join(stream_export(records(), "jsonl")))[3]["phrase_pairs"]
+    assert table[3]["error"] is None
+
+
+def test_export_endpoint_parquet(client):
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    response = client.post(
+        "/api/export",
+        json={"sentences": ["the cat sleeps", "a dog runs"], "target_language": "hi", "format": "parquet"},
+    )
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "application/vnd.apache.parquet"
+    table = pq.read_table(io.BytesIO(response.data)).to_pylist()
+    assert [row["index"] for row in table] == [0, 1]
+
+
+@pytest.mark.parametrize("phrases", ["false", 0, None, [True]])
+def test_export_endpoint_rejects_non_boolean_phrases(client, phrases):
+    response = client.post("/api/export", json={"sentences": ["the cat"], "target_language": "hi", "phrases": phrases})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "'phrases' must be true or false."}
+
+
+def test_export_endpoint_phrases_flag(client):
+    def rows(phrases):
+        response = client.post("/api/export", json={"sentences": ["the cat sleeps"], "target_language": "hi", "phrases": phrases})
+        assert response.status_code == 200
+        return jsonl_rows(response.data)
+
+    assert "phrase_pairs" in rows(True)[0]
+    assert "phrase_pairs" not in rows(False)[0]
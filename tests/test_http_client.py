@@ -0,0 +1,153 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from stub_backend import StubBackendServer, parse_args
+
+from smt.http_client import AsyncResilientHTTPClient, BackendError, CircuitOpenError, ResilientHTTPClient
+
+
+@pytest.fixture
+def stub():
+    # The stub backend on an ephemeral port; tests adjust `server.options` before calling it.
+    server = StubBackendServer(("127.0.0.1", 0), parse_args(["--slow-latency", "1.0"]))
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def client_for(stub, async_client: bool = False, **kwargs) -> ResilientHTTPClient:
+    options = {"timeout": 2.0, "retries": 2, "backoff": 0.001, "hedge_after": 0.0, "pool_size": 2}
+    options.update(kwargs)
+    cls = AsyncResilientHTTPClient if async_client else ResilientHTTPClient
+    return cls(stub.url, **options)
+
+
+def run_async(client: AsyncResilientHTTPClient, calls: int = 1, **params) -> list:
+    async def main():
+        try:
+            return [await client.get("/m", {"q": f"hello {i}", "tl": "hi", **params}, key="hi") for i in range(calls)]
+        finally:
+            client.close()
+
+    return asyncio.run(main())
+
+
+def get(client, calls: int = 1) -> list:
+    try:
+        return [client.get("/m", {"q": f"hello {i}", "tl": "hi"}, key="hi") for i in range(calls)]
+    finally:
+        client.close()
+
+
+def fetch(client, calls: int = 1) -> list:
+    return run_async(client, calls) if isinstance(client, AsyncResilientHTTPClient) else get(client, calls)
+
+
+@pytest.mark.parametrize("async_client", [False, True])
+def test_pooled_connection_is_reused(stub, async_client):
+    bodies = fetch(client_for(stub, async_client), calls=5)
+    assert all(b"result-container" in body for body in bodies)
+    assert stub.stats["requests"] == 5
+    assert stub.stats["connections"] == 1
+
+
+@pytest.mark.parametrize("async_client", [False, True])
+def test_retries_5xx(stub, async_client):
+    stub.options.fail_first = 2
+    (body,) = fetch(client_for(stub, async_client))
+    assert b"result-container" in body
+    assert stub.stats["errors"] == 2 and stub.stats["ok"] == 1
+
+
+@pytest.mark.parametrize("async_client", [False, True])
+def test_retries_connection_reset(stub, async_client):
+    # The pool retries a dropped connection once on a fresh one; the second drop is the client's retry.
+    stub.options.reset_first = 2
+    (body,) = fetch(client_for(stub, async_client))
+    assert b"result-container" in body
+    assert stub.stats["resets"] == 2 and stub.stats["ok"] == 1
+
+
+@pytest.mark.parametrize("async_client", [False, True])
+def test_gives_up_after_retries(stub, async_client):
+    stub.options.fail_first = 10
+    with pytest.raises(BackendError, match="HTTP 503"):
+        fetch(client_for(stub, async_client, retries=1))
+    assert stub.stats["requests"] == 2
+
+
+@pytest.mark.parametrize("async_client", [False, True])
+def test_hedged_request_wins(stub, async_client):
+    # The first request sleeps a second; the backup sent after 50 ms answers first.
+    stub.options.slow_first = 1
+    started = time.perf_counter()
+    (body,) = fetch(client_for(stub, async_client, hedge_after=0.05))
+    assert b"result-container" in body
+    assert time.perf_counter() - started < 0.8
+    assert stub.stats["requests"] == 2
+
+
+@pytest.mark.parametrize("async_client", [False, True])
+def test_breaker_opens_half_opens_and_closes(stub, async_client):
+    client = client_for(stub, async_client, retries=0, breaker_failures=2, breaker_reset=0.2)
+    call = (lambda: run_async(client)) if async_client else (lambda: client.get("/m", {"q": "x", "tl": "hi"}, key="hi"))
+    stub.options.fail_first = 3
+    for _ in range(2):
+        with pytest.raises(BackendError, match="HTTP 503"):
+            call()
+    assert client.states() == {"hi": "open"}
+    with pytest.raises(CircuitOpenError):
+        call()
+    assert stub.stats["requests"] == 2
+
+    time.sleep(0.25)
+    with pytest.raises(BackendError, match="HTTP 503"):
+        call()  # the half-open trial fails and re-opens the circuit
+    assert client.states() == {"hi": "open"}
+    time.sleep(0.25)
+    call()
+    assert client.states() == {"hi": "closed"}
+    client.close()
+
+
+def test_cancelled_half_open_trial_does_not_wedge_breaker(stub):
+    client = client_for(stub, True, retries=0, breaker_failures=1, breaker_reset=0.1)
+    stub.options.fail_first = 1
+    stub.options.slow_first = 2
+
+    async def main():
+        with pytest.raises(BackendError):
+            await client.get("/m", {"q": "x", "tl": "hi"}, key="hi")
+        await asyncio.sleep(0.15)
+        # The trial is cancelled the way a prefetch timeout cancels it.
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.get("/m", {"q": "x", "tl": "hi"}, key="hi"), 0.1)
+        assert client.states() == {"hi": "open"}
+        body = await client.get("/m", {"q": "x", "tl": "hi"}, key="hi")
+        client.close()
+        return body
+
+    assert b"result-container" in asyncio.run(main())
+    assert client.states() == {"hi": "closed"}
+
+
+def test_unexpected_error_in_half_open_trial_does_not_wedge_breaker(stub, monkeypatch):
+    client = client_for(stub, retries=0, breaker_failures=1, breaker_reset=0.0)
+    stub.options.fail_first = 1
+    with pytest.raises(BackendError):
+        client.get("/m", {"q": "x", "tl": "hi"}, key="hi")
+
+    def broken(pool, target):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(client, "_hedged", broken)
+    with pytest.raises(KeyboardInterrupt):
+        client.get("/m", {"q": "x", "tl": "hi"}, key="hi")
+    monkeypatch.undo()
+    assert b"result-container" in get(client)[0]
+    assert client.states() == {"hi": "closed"}
@@ -0,0 +1,81 @@
+import math
+
+import pytest
+
+from smt.ibm_model import NULL_TOKEN, LexicalModel, ModelError, main, read_parallel_corpus, train_ibm_model
+
+CORPUS = """the house ||| ghar
+the small house ||| chhota ghar
+a small book ||| chhoti kitab
+the book ||| kitab
+a house ||| ek ghar
+the small book is red ||| chhoti kitab laal hai
+the house is big ||| ghar bada hai
+unusable line without a separator
+"""
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    path = tmp_path / "corpus.en-hi.txt"
+    path.write_text(CORPUS, encoding="utf-8")
+    return path
+
+
+def log_likelihood(model: LexicalModel, corpus) -> float:
+    # IBM Model 1 corpus log-likelihood: every target word is generated by the NULL word or one source word.
+    total = 0.0
+    for src_tokens, tgt_tokens in read_parallel_corpus(corpus):
+        sources = [NULL_TOKEN] + src_tokens
+        for t_tok in tgt_tokens:
+            total += math.log(sum(model.translation_prob(s_tok, t_tok) for s_tok in sources) / len(sources))
+    return total
+
+
+def test_em_iterations_increase_likelihood(corpus):
+    likelihoods = [
+        log_likelihood(train_ibm_model(corpus, "en", "hi", iterations=n, prune_threshold=0.0), corpus) for n in range(1, 6)
+    ]
+    assert all(later >= earlier - 1e-9 for earlier, later in zip(likelihoods, likelihoods[1:]))
+    assert likelihoods[-1] > likelihoods[0]
+    model = train_ibm_model(corpus, "en", "hi", iterations=5)
+    assert model.translation_prob("house", "ghar") > model.translation_prob("house", "kitab")
+    assert model.translation_prob("book", "kitab") > model.translation_prob("book", "ghar")
+
+
+@pytest.mark.parametrize("ibm", [1, 2])
+def test_save_load_round_trip_scores_identically(corpus, tmp_path, ibm):
+    model = train_ibm_model(corpus, "en", "hi", model=ibm, iterations=4)
+    path = tmp_path / "models" / "lexical.npz"
+    model.save(path)
+    loaded = LexicalModel.load(path)
+    assert (loaded.model, loaded.source_language, loaded.target_language) == (ibm, "en", "hi")
+    assert loaded.distortion == model.distortion and loaded.null_prob == model.null_prob
+    for src_tokens, tgt_tokens in read_parallel_corpus(corpus):
+        assert loaded.score_matrix(src_tokens, tgt_tokens) == model.score_matrix(src_tokens, tgt_tokens)
+    assert loaded.score_matrix(["unseen", "house"], ["ghar"]) == model.score_matrix(["unseen", "house"], ["ghar"])
+
+
+def test_load_missing_model_fails(tmp_path):
+    with pytest.raises(ModelError, match="Lexical model not found"):
+        LexicalModel.load(tmp_path / "missing.npz")
+
+
+def test_training_rejects_unusable_input(tmp_path, corpus):
+    with pytest.raises(ModelError, match="Unsupported IBM model"):
+        train_ibm_model(corpus, "en", "hi", model=3)
+    empty = tmp_path / "empty.txt"
+    empty.write_text("no separator here\n", encoding="utf-8")
+    with pytest.raises(ModelError, match="No usable sentence pairs"):
+        train_ibm_model(empty, "en", "hi")
+
+
+def test_cli_trains_and_saves(corpus, tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("SMT_DATA_DIR", str(tmp_path))
+    out = tmp_path / "out.npz"
+    main([str(corpus), "--target-language", "HI", "--model", "2", "--iterations", "3", "--output", str(out)])
+    assert "Saved IBM Model 2" in capsys.readouterr().out
+    loaded = LexicalModel.load(out)
+    expected = train_ibm_model(corpus, "en", "hi", model=2, iterations=3)
+    assert loaded.target_language == "hi" and loaded.model == 2
+    assert loaded.score_matrix(["the", "house"], ["ghar"]) == expected.score_matrix(["the", "house"], ["ghar"])
@@ -0,0 +1,169 @@
+import sys
+import threading
+import time
+
+import pytest
+
+from smt.config import AppConfig
+from smt.moses_pool import MosesDecoderPool, MosesPoolBusy, MosesWorker
+from smt.toolkit import ToolkitError
+
+# Stands in for `moses -f <ini>`: upper-cases each line. The ini holds its start-up behaviour, and
+# words in a sentence trigger a slow answer, an exit mid-request or a burst of stderr logging.
+FAKE_MOSES = f"""#!{sys.executable}
+import sys, time
+if open(sys.argv[2]).read().strip() == "crash":
+    sys.stderr.write("fatal: cannot load model\\n")
+    sys.exit(1)
+for line in sys.stdin:
+    sys.stderr.write("decoding " + line)
+    if "sleep" in line:
+        time.sleep(5)
+    if "die" in line:
+        sys.stderr.write("segfault in search\\n")
+        sys.exit(3)
+    if "spam" in line:
+        sys.stderr.write("x" * (1 << 20) + "\\n")
+    print(line.strip().upper(), flush=True)
+"""
+
+
+@pytest.fixture
+def moses(tmp_path):
+    script = tmp_path / "moses"
+    script.write_text(FAKE_MOSES, encoding="utf-8")
+    script.chmod(0o755)
+    return str(script)
+
+
+def write_ini(tmp_path, mode: str = "ok", name: str = "moses.ini"):
+    ini = tmp_path / name
+    ini.write_text(mode, encoding="utf-8")
+    return ini
+
+
+def test_worker_decodes_line_by_line(moses, tmp_path):
+    worker = MosesWorker(moses, write_ini(tmp_path), timeout=5.0)
+    try:
+        assert worker.decode("hello   world") == "HELLO WORLD"
+        assert worker.decode("again") == "AGAIN"
+        assert worker.decoded == 2 and worker.restarts == 0
+    finally:
+        worker.stop()
+
+
+def test_worker_restarts_after_timeout_without_stale_output(moses, tmp_path):
+    worker = MosesWorker(moses, write_ini(tmp_path), timeout=0.3)
+    try:
+        with pytest.raises(ToolkitError, match="timed out"):
+            worker.decode("sleep please")
+        # The replacement process answers this sentence, not the abandoned one.
+        assert worker.decode("next") == "NEXT"
+        assert worker.restarts == 1
+    finally:
+        worker.stop()
+
+
+def test_worker_restarts_after_crash_and_reports_stderr(moses, tmp_path):
+    worker = MosesWorker(moses, write_ini(tmp_path), timeout=5.0)
+    try:
+        with pytest.raises(ToolkitError, match="exited unexpectedly") as info:
+            worker.decode("die now")
+        assert "segfault in search" in str(info.value)
+        assert worker.decode("after") == "AFTER"
+        assert worker.restarts == 1
+    finally:
+        worker.stop()
+
+
+def test_stderr_is_drained_while_decoding(moses, tmp_path):
+    # A megabyte of logging would fill the pipe and stall the decoder if nothing read it.
+    worker = MosesWorker(moses, write_ini(tmp_path), timeout=5.0)
+    try:
+        assert worker.decode("spam") == "SPAM"
+        assert worker.decode("quiet") == "QUIET"
+    finally:
+        worker.stop()
+
+
+def test_crashing_decoder_restarts_with_backoff(moses, tmp_path):
+    worker = MosesWorker(moses, write_ini(tmp_path, "crash"), timeout=5.0, backoff=0.3)
+    try:
+        for _ in range(10):
+            with pytest.raises(ToolkitError):
+                worker.decode("hello")
+        # One immediate restart, then the backoff holds off further starts instead of respawning per call.
+        assert worker.restarts == 2
+        with pytest.raises(ToolkitError, match="next start in"):
+            worker.decode("hello")
+        time.sleep(0.35)
+        with pytest.raises(ToolkitError):
+            worker.decode("hello")
+        assert worker.restarts == 3
+
+        write_ini(tmp_path, "ok")
+        time.sleep(0.65)
+        assert worker.decode("fixed") == "FIXED"
+        assert worker._failures == 0
+    finally:
+        worker.stop()
+
+
+@pytest.fixture
+def pool_factory(moses, tmp_path, monkeypatch):
+    monkeypatch.setenv("SMT_DATA_DIR", str(tmp_path))
+    cfg = AppConfig.from_env()
+    (tmp_path / "models").mkdir()
+    write_ini(tmp_path / "models", name="moses.hi.ini")
+    pools = []
+
+    def make(**kwargs):
+        pool = MosesDecoderPool(moses, cfg, **kwargs)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+def test_pool_rejects_requests_beyond_workers_and_queue(pool_factory):
+    pool = pool_factory(workers=1, queue_size=0, timeout=0.5)
+    busy = threading.Thread(target=lambda: pytest.raises(ToolkitError, pool.decode, "sleep", "hi"))
+    busy.start()
+    time.sleep(0.1)
+    with pytest.raises(MosesPoolBusy, match="queue for 'hi' is full"):
+        pool.decode("hello", "hi")
+    busy.join()
+
+
+def test_pool_queues_requests_up_to_the_limit(pool_factory):
+    pool = pool_factory(workers=1, queue_size=4, timeout=5.0)
+    results = []
+    threads = [threading.Thread(target=lambda i=i: results.append(pool.decode(f"s{i}", "hi"))) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == [f"S{i}" for i in range(5)]
+    assert pool.health_check()["hi"]["decoded"] == 5
+
+
+def test_pool_without_configuration_fails(pool_factory):
+    with pytest.raises(ToolkitError, match="No Moses configuration for 'bn'"):
+        pool_factory().decode("hello", "bn")
+
+
+def test_health_check_replaces_dead_idle_workers(pool_factory):
+    pool = pool_factory(workers=2, timeout=5.0)
+    assert pool.decode("hello", "hi") == "HELLO"
+    pool.start_health_checks(interval=0.05)
+    for worker in pool._pools["hi"].workers:
+        worker._proc.kill()
+        worker._proc.wait()
+    deadline = time.monotonic() + 5.0
+    while pool.health_check()["hi"]["alive"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    report = pool.health_check()["hi"]
+    assert report["alive"] == 2 and report["restarts"] == 2
+    assert pool.decode("again", "hi") == "AGAIN"
@@ -0,0 +1,60 @@
+from collections import Counter
+
+import pytest
+
+from smt.phrase_table import NULL_WORD, build_phrase_table, word_translation_tables
+
+CORPUS = [
+    ("the cat sat", "billi baithi", "1-0 2-1"),
+    ("the dog", "kutta", "1-0"),
+    ("a cat", "ek billi", "0-0 1-1"),
+    ("the cat", "billi ye", "1-0"),
+]
+
+
+def write_corpus(tmp_path):
+    corpus = tmp_path / "corpus.txt"
+    alignment = tmp_path / "sym.align"
+    corpus.write_text("".join(f"{src} ||| {tgt}\n" for src, tgt, _ in CORPUS), encoding="utf-8")
+    alignment.write_text("".join(f"{links}\n" for _, _, links in CORPUS), encoding="utf-8")
+    return corpus, alignment
+
+
+def reference_tables():
+    # The direct count-and-divide definition the sorted table must reproduce.
+    pairs, src_counts, tgt_counts = Counter(), Counter(), Counter()
+    for src, tgt, links in CORPUS:
+        s_words, t_words = src.split(), tgt.split()
+        points = [tuple(map(int, item.split("-"))) for item in links.split()]
+        occurrences = [(s_words[si], t_words[ti]) for si, ti in points]
+        occurrences += [(s, NULL_WORD) for si, s in enumerate(s_words) if si not in {p[0] for p in points}]
+        occurrences += [(NULL_WORD, t) for ti, t in enumerate(t_words) if ti not in {p[1] for p in points}]
+        for s, t in occurrences:
+            pairs[(s, t)] += 1
+            src_counts[s] += 1
+            tgt_counts[t] += 1
+    return {k: c / src_counts[k[0]] for k, c in pairs.items()}, {k: c / tgt_counts[k[1]] for k, c in pairs.items()}
+
+
+@pytest.mark.parametrize("budget", [0, 1 << 20])
+def test_lexical_table_matches_direct_counts(tmp_path, budget):
+    # Budget 0 spills every 64 KiB buffer; the counts must not depend on how the sort ran.
+    corpus, alignment = write_corpus(tmp_path)
+    (tmp_path / "lex").mkdir()
+    table = word_translation_tables(corpus, alignment, tmp_path / "lex", budget)
+    t_given_s, s_given_t = reference_tables()
+    assert len(table) == len(t_given_s)
+    for (s, t), p in t_given_s.items():
+        assert table.t_given_s(s, t) == p
+        assert table.s_given_t(s, t) == s_given_t[(s, t)]
+    assert table.t_given_s("cat", "kutta") == 0.0
+    assert table.s_given_t("unseen", "billi") == 0.0
+
+
+def test_build_charges_lexical_table_to_budget(tmp_path):
+    corpus, alignment = write_corpus(tmp_path)
+    stats = build_phrase_table(corpus, alignment, tmp_path / "phrase-table.txt", memory_budget_mb=1)
+    assert stats["lexical_pairs"] == len(reference_tables()[0])
+    assert 0 < stats["lexical_bytes"] < 1024 * 1024
+    lines = (tmp_path / "phrase-table.txt").read_text(encoding="utf-8").splitlines()
+    assert "cat ||| billi ||| 0.6 1 0.75 1 ||| 0-0 ||| 5 4 3" in lines
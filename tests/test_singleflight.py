@@ -0,0 +1,159 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from smt.singleflight import AsyncSingleFlight, CoalescingSentenceTranslator, SingleFlight
+
+CALLERS = 8
+
+
+def run_concurrently(target, n: int = CALLERS) -> list:
+    # Runs target(i) on n threads at once; returns each one's result or exception. The calls under
+    # test take 0.2 s, ample time for every thread to join the flight.
+    outcomes = [None] * n
+
+    def worker(i):
+        try:
+            outcomes[i] = target(i)
+        except Exception as exc:
+            outcomes[i] = exc
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+
+class SlowCall:
+    # Counts executions.
+    def __init__(self, result="done", error: Exception | None = None) -> None:
+        self.calls = 0
+        self.result = result
+        self.error = error
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(0.2)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_concurrent_callers_share_one_call():
+    flight: SingleFlight[str] = SingleFlight("test")
+    fn = SlowCall()
+    outcomes = run_concurrently(lambda i: flight.do("key", fn))
+    assert fn.calls == 1
+    assert sorted(shared for _, shared in outcomes) == [False] + [True] * (CALLERS - 1)
+    assert {result for result, _ in outcomes} == {"done"}
+
+
+def test_leader_error_reaches_every_follower():
+    flight: SingleFlight[str] = SingleFlight("test")
+    error = ValueError("backend down")
+    fn = SlowCall(error=error)
+    outcomes = run_concurrently(lambda i: flight.do("key", fn))
+    assert fn.calls == 1
+    assert all(outcome is error for outcome in outcomes)
+
+
+def test_key_is_released_after_completion():
+    flight: SingleFlight[str] = SingleFlight("test")
+    fn = SlowCall()
+    assert flight.do("key", fn) == ("done", False)
+    assert flight.in_flight() == 0
+    assert flight.do("key", fn) == ("done", False)
+    assert fn.calls == 2
+    with pytest.raises(ValueError):
+        flight.do("key", SlowCall(error=ValueError("boom")))
+    assert flight.in_flight() == 0
+
+
+class CountingTranslator:
+    source_language = "en"
+    backend = "counting"
+
+    def __init__(self) -> None:
+        self.calls = []
+
+    def translate(self, sentence: str, target_language: str) -> str:
+        self.calls.append((sentence, target_language))
+        time.sleep(0.2)
+        return f"{target_language}:{sentence.strip()}"
+
+
+def test_coalescing_translator_shares_identical_normalized_calls():
+    backend = CountingTranslator()
+    translator = CoalescingSentenceTranslator(backend)
+    variants = ["hello  world", " hello world", "hello world "]
+    outcomes = run_concurrently(lambda i: translator.translate(variants[i % 3], "hi"))
+    assert len(backend.calls) == 1
+    assert len(set(outcomes)) == 1
+    assert translator.translate("hello world", "bn") == "bn:hello world"
+    assert len(backend.calls) == 2
+
+
+class AsyncSlowCall:
+    def __init__(self, error: Exception | None = None) -> None:
+        self.calls = 0
+        self.finished = 0
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        self.finished += 1
+        if self.error is not None:
+            raise self.error
+        return "done"
+
+
+def test_async_concurrent_callers_share_one_call():
+    async def main():
+        flight: AsyncSingleFlight[str] = AsyncSingleFlight("test")
+        fn = AsyncSlowCall()
+        outcomes = await asyncio.gather(*(flight.do("key", fn) for _ in range(CALLERS)))
+        assert fn.calls == 1
+        assert outcomes == [("done", False)] + [("done", True)] * (CALLERS - 1)
+        assert flight.in_flight() == 0
+        assert await flight.do("key", fn) == ("done", False)
+        assert fn.calls == 2
+
+    asyncio.run(main())
+
+
+def test_async_leader_error_reaches_every_follower():
+    async def main():
+        flight: AsyncSingleFlight[str] = AsyncSingleFlight("test")
+        error = ValueError("backend down")
+        fn = AsyncSlowCall(error=error)
+        outcomes = await asyncio.gather(*(flight.do("key", fn) for _ in range(CALLERS)), return_exceptions=True)
+        assert fn.calls == 1
+        assert all(outcome is error for outcome in outcomes)
+        assert flight.in_flight() == 0
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("cancelled", ["follower", "leader"])
+def test_async_cancelled_caller_does_not_cancel_the_shared_call(cancelled):
+    async def main():
+        flight: AsyncSingleFlight[str] = AsyncSingleFlight("test")
+        fn = AsyncSlowCall()
+        leader = asyncio.ensure_future(flight.do("key", fn))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("key", fn))
+        await asyncio.sleep(0.01)
+        gone, stays = (follower, leader) if cancelled == "follower" else (leader, follower)
+        gone.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await gone
+        assert (await stays)[0] == "done"
+        assert fn.calls == 1 and fn.finished == 1
+        assert flight.in_flight() == 0
+
+    asyncio.run(main())
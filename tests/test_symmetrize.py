@@ -0,0 +1,38 @@
+import os
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from smt.symmetrize import format_pharaoh, links_from_pairs, symmetrize, symmetrize_files
+
+FIXTURES = Path(__file__).parent / "fixtures" / "symmetrize"
+GROW_HEURISTICS = ("grow-diag", "grow-diag-final", "grow-diag-final-and")
+
+
+def test_grow_follows_atools_neighbour_order():
+    # Raster-scanning the union would add 2-1 here; atools grows 1-1 and 0-1 out of 1-2 first.
+    forward = links_from_pairs([(0, 0), (0, 6), (1, 2), (1, 7), (2, 1), (2, 3), (2, 4), (2, 5)])
+    reverse = links_from_pairs([(0, 1), (1, 1), (2, 5)])
+    assert format_pharaoh(symmetrize(forward, reverse, "grow-diag-final-and")) == "0-0 0-1 1-1 1-2 2-3 2-4 2-5"
+    assert format_pharaoh(symmetrize(forward, reverse, "grow-diag-final")) == "0-0 0-1 0-6 1-1 1-2 1-7 2-3 2-4 2-5"
+
+
+@pytest.mark.parametrize("heuristic", GROW_HEURISTICS)
+def test_matches_golden_output(tmp_path, heuristic):
+    out = tmp_path / "sym.align"
+    symmetrize_files(FIXTURES / "forward.align", FIXTURES / "reverse.align", out, heuristic)
+    assert out.read_bytes() == (FIXTURES / f"{heuristic}.align").read_bytes()
+
+
+@pytest.mark.skipif(not os.environ.get("ATOOLS_BIN"), reason="ATOOLS_BIN not set")
+@pytest.mark.parametrize("heuristic", GROW_HEURISTICS)
+def test_matches_atools(tmp_path, heuristic):
+    out = tmp_path / "sym.align"
+    symmetrize_files(FIXTURES / "forward.align", FIXTURES / "reverse.align", out, heuristic)
+    expected = subprocess.run(
+        [os.environ["ATOOLS_BIN"], "-i", str(FIXTURES / "forward.align"), "-j", str(FIXTURES / "reverse.align"), "-c", heuristic],
+        capture_output=True,
+        check=True,
+    ).stdout
+    assert out.read_bytes() == expected